@@ -1,9 +1,25 @@
 # Main Flask application
-from flask import Flask, render_template, request, jsonify
+from flask import (Flask, Response, before_render_template, g, render_template, request, jsonify, send_file,
+                   template_rendered)
+from datetime import datetime, timedelta, timezone
+import json
 import logging
 import os
-from data_parser import get_cached_stories, refresh_story_cache
-from translator import translator_service
+import threading
+import time
+from urllib.parse import urlencode
+from story_cache import (story_cache, feed_caches, feed_refresher, get_cached_stories, refresh_story_cache,
+                         find_story, stories_by_author, stories_from_domain)
+from translator import DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES, translator_service
+from http_cache import CachedPayload, PageCache, payload_response
+from history_store import history_store
+from story_timeseries import story_timeseries
+from search_index import search_index
+from comments import comment_cache, render_page
+from users import USERNAME_RE, user_cache
+from hn_api import ApiIngester
+from metrics import registry, request_count, request_latency, stage_latency
+from profiling import redact_access_logs, request_profiler
 
 # Configure logging
 logging.basicConfig(
@@ -18,35 +34,274 @@ app = Flask(__name__)
 # App configuration
 app.config.update(
     SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production'),
-    DEBUG=os.environ.get('FLASK_DEBUG', 'True').lower() == 'true',
-    TEMPLATES_AUTO_RELOAD=True
+    # Off unless asked for, so no deployment ends up on the debugger by accident
+    DEBUG=os.environ.get('FLASK_DEBUG', 'False').lower() == 'true',
+    TEMPLATES_AUTO_RELOAD=True,
+    STORY_REFRESH_INTERVAL=int(os.environ.get('STORY_REFRESH_INTERVAL', 300)),
+    STORY_REFRESH_ENABLED=os.environ.get('STORY_REFRESH_ENABLED', 'True').lower() == 'true',
+    # 'thread' runs the refresher in a background thread; asgi.py sets 'asyncio' and drives it from its event loop
+    STORY_REFRESH_DRIVER=os.environ.get('STORY_REFRESH_DRIVER', 'thread'),
+    STORY_FEED_PAGES=int(os.environ.get('STORY_FEED_PAGES', 2)),
+    FEED_FETCH_WORKERS=int(os.environ.get('FEED_FETCH_WORKERS', 4)),
+    PAGE_CACHE_ENABLED=os.environ.get('PAGE_CACHE_ENABLED', 'True').lower() == 'true',
+    SSE_KEEPALIVE_SECONDS=int(os.environ.get('SSE_KEEPALIVE_SECONDS', 15)),
+    SSE_MAX_STREAM_SECONDS=int(os.environ.get('SSE_MAX_STREAM_SECONDS', 300)),
+    HISTORY_ENABLED=os.environ.get('HISTORY_ENABLED', 'true').lower() == 'true',
+    SEARCH_INCLUDE_HISTORY=os.environ.get('SEARCH_INCLUDE_HISTORY', 'true').lower() == 'true',
+    SEARCH_INCLUDE_TRANSLATIONS=os.environ.get('SEARCH_INCLUDE_TRANSLATIONS', 'true').lower() == 'true',
+    PREWARM_LANGUAGES=[lang for lang in os.environ.get('PREWARM_LANGUAGES', 'zh-CN').split(',') if lang],
+    COMMENTS_PER_PAGE=int(os.environ.get('COMMENTS_PER_PAGE', 100)),
+    COMMENT_MAX_DEPTH=int(os.environ.get('COMMENT_MAX_DEPTH', 10)),
+    COMMENT_FETCH_TIMEOUT=float(os.environ.get('COMMENT_FETCH_TIMEOUT', 5)),
+    USER_FETCH_TIMEOUT=float(os.environ.get('USER_FETCH_TIMEOUT', 5)),
+    # 'html' scrapes the listing pages, 'api' reads the HN JSON API
+    INGEST_MODE=os.environ.get('INGEST_MODE', 'html'),
+    API_FETCH_WORKERS=int(os.environ.get('API_FETCH_WORKERS', 10)),
+    METRICS_ENABLED=os.environ.get('METRICS_ENABLED', 'true').lower() == 'true',
+    # /health reports 'stale' once upstream hasn't been checked for this long
+    HEALTH_STALE_SECONDS=int(os.environ.get('HEALTH_STALE_SECONDS', 900)),
+    # Requests sending this token (X-Profile header or ?_profile=) are profiled; empty disables it
+    PROFILE_TOKEN=os.environ.get('PROFILE_TOKEN', ''),
+    PROFILE_SAMPLE_PERCENT=float(os.environ.get('PROFILE_SAMPLE_PERCENT', 0)),
+    PROFILE_DIR=os.environ.get('PROFILE_DIR', 'instance/profiles'),
+    PROFILE_KEEP=int(os.environ.get('PROFILE_KEEP', 50))
 )
 
+# Keep every feed's story snapshot fresh in the background
+feed_refresher.interval = app.config['STORY_REFRESH_INTERVAL']
+feed_refresher.pages = app.config['STORY_FEED_PAGES']
+feed_refresher.max_workers = app.config['FEED_FETCH_WORKERS']
+if app.config['INGEST_MODE'] == 'api':
+    feed_refresher.ingester = ApiIngester(max_workers=app.config['API_FETCH_WORKERS'])
+
+# Opt-in request profiling
+request_profiler.token = app.config['PROFILE_TOKEN']
+request_profiler.sample_percent = app.config['PROFILE_SAMPLE_PERCENT']
+request_profiler.profile_dir = app.config['PROFILE_DIR']
+request_profiler.keep = app.config['PROFILE_KEEP']
+redact_access_logs()
+
+# Rendered homepage variants, rebuilt when the snapshot or translations change
+page_cache = PageCache()
+
+def prewarm_translations(snapshot):
+    """
+    Translate each new homepage snapshot in the background
+
+    Unchanged stories already carry their translations over from the previous
+    snapshot, so only new or edited titles are queued, in rank order, for the
+    configured languages and any language a reader has asked for.
+    """
+    languages = [lang for lang in app.config['PREWARM_LANGUAGES'] if lang in SUPPORTED_LANGUAGES]
+    languages += [lang for lang in translator_service.languages() if lang not in languages]
+    if languages:
+        translator_service.prewarm(snapshot.stories, languages)
+
+story_cache.add_listener(prewarm_translations)
+
+# Points/rank samples for velocity metrics; only the front page has meaningful ranks
+for feed_name, cache in feed_caches.items():
+    cache.add_listener(lambda snapshot, feed=feed_name:
+                       story_timeseries.record(snapshot.stories, snapshot.fetched_at, ranked=feed == 'news'))
+
+# Every story any feed shows becomes searchable as soon as its snapshot lands
+for cache in feed_caches.values():
+    cache.add_listener(lambda snapshot: search_index.add_stories(snapshot.stories, snapshot.fetched_at))
+
+if app.config['SEARCH_INCLUDE_TRANSLATIONS']:
+    translator_service.add_listener(lambda story, lang, translated:
+                                    search_index.add_translation(story.id, lang, translated))
+
+def backfill_search_index():
+    """Load every story from the history store into the search index"""
+    started = time.time()
+    count = 0
+    for story, seen_at in history_store.iter_stories():
+        search_index.add(story, seen_at)
+        count += 1
+    logger.info(f"Indexed {count} historical stories for search in {time.time() - started:.2f}s")
+
+if app.config['HISTORY_ENABLED']:
+    # Every new snapshot goes to the history writer, which batches them to disk
+    for feed_name, cache in feed_caches.items():
+        cache.add_listener(lambda snapshot, feed=feed_name:
+                           history_store.record(snapshot.stories, snapshot.fetched_at, feed))
+
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_tasks():
+    """
+    Start work that only a serving process needs; safe to call more than once
+
+    Called by serve.py, the ASGI lifespan and app.run, not on import, so
+    tests and scripts that import the app don't scrape HN or open the
+    history database.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    if app.config['STORY_REFRESH_ENABLED'] and app.config['STORY_REFRESH_DRIVER'] == 'thread':
+        feed_refresher.start()
+    if app.config['HISTORY_ENABLED'] and app.config['SEARCH_INCLUDE_HISTORY']:
+        threading.Thread(target=backfill_search_index, name='search-backfill', daemon=True).start()
+
+def profile_token():
+    """Profiling token sent with the current request, if any"""
+    return request.headers.get('X-Profile') or request.args.get('_profile')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if request_profiler.enabled and not request.path.startswith('/admin/'):
+        g.profile = request_profiler.start(profile_token())
+
+@app.after_request
+def record_request_metrics(response):
+    """Per-route latency and status counts; streamed bodies are timed up to the first byte"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_latency.observe(elapsed, route, request.method)
+        request_count.inc(route, request.method, str(response.status_code))
+        if request_profiler.enabled and not request.path.startswith('/admin/'):
+            # The token stays out of logs and the admin listing
+            query = urlencode([(key, value) for key, value in request.args.items(multi=True) if key != '_profile'])
+            request_profiler.record(request.method, request.path + ('?' + query if query else ''),
+                                    response.status_code, elapsed, g.pop('profile', None))
+    return response
+
+@app.teardown_request
+def stop_unfinished_profile(error=None):
+    """Don't leave a profiler running on this thread when a request failed before after_request"""
+    active = g.pop('profile', None)
+    if active is not None:
+        active.stop()
+
+# Template rendering is timed through Flask's signals, so every render_template call is covered
+_render_started = threading.local()
+
+def start_render_timer(sender, template, context, **extra):
+    _render_started.value = time.perf_counter()
+
+def record_render_time(sender, template, context, **extra):
+    started = getattr(_render_started, 'value', None)
+    if started is not None:
+        stage_latency.observe(time.perf_counter() - started, 'render')
+        _render_started.value = None
+
+before_render_template.connect(start_render_timer, app)
+template_rendered.connect(record_render_time, app)
+
+# State that already lives in the caches, read when /metrics is scraped
+registry.callback('hn_translation_cache_lookups_total', 'Translation cache lookups by result',
+                  lambda: {(result,): translator_service.cache.stats()[f"{result}s"]
+                           for result in ('memory_hit', 'disk_hit', 'miss')},
+                  ['result'], type='counter')
+registry.callback('hn_translation_cache_hit_ratio', 'Share of translation lookups answered from the cache',
+                  lambda: translator_service.cache.stats()['hit_ratio'])
+registry.callback('hn_translation_queue_depth', 'Stories waiting to be translated, per language',
+                  lambda: {(lang,): translator_service.queue_depth(lang) for lang in translator_service.languages()},
+                  ['lang'])
+registry.callback('hn_feed_snapshot_age_seconds', 'Seconds since the current snapshot was fetched',
+                  lambda: {(feed,): cache.snapshot.age() for feed, cache in feed_caches.items() if cache.snapshot},
+                  ['feed'])
+registry.callback('hn_feed_checked_age_seconds', 'Seconds since upstream was last checked, per feed',
+                  lambda: {(feed,): time.time() - cache.snapshot.checked_at
+                           for feed, cache in feed_caches.items() if cache.snapshot},
+                  ['feed'])
+registry.callback('hn_feed_stories', 'Stories in the current snapshot, per feed',
+                  lambda: {(feed,): len(cache.snapshot.stories) if cache.snapshot else 0
+                           for feed, cache in feed_caches.items()},
+                  ['feed'])
+registry.callback('hn_user_cache_lookups_total', 'User profile cache lookups by result',
+                  lambda: {(result,): user_cache.stats()[result] for result in ('hits', 'misses', 'coalesced')},
+                  ['result'], type='counter')
+registry.callback('hn_comment_cache_bytes', 'Approximate memory held by cached comment trees',
+                  lambda: comment_cache.stats()['bytes'])
+registry.callback('hn_search_index_documents', 'Stories in the search index',
+                  lambda: search_index.stats()['documents'])
+
+@app.context_processor
+def inject_languages():
+    """Language choices for the translation controls in base.html"""
+    return {'languages': SUPPORTED_LANGUAGES}
+
+def requested_language(default=None):
+    """
+    Target language of the current request
+
+    ?lang=<code> selects a language; the older ?translate=true means
+    Simplified Chinese. Returns default when neither is given and None for
+    unsupported codes.
+    """
+    return resolve_language(request.args.get('lang'), request.args.get('translate'), default)
+
+def resolve_language(lang, translate=None, default=None):
+    """requested_language for raw query values, shared with the ASGI routes"""
+    if lang is None and (translate or 'false').lower() == 'true':
+        lang = DEFAULT_LANGUAGE
+    if lang is None:
+        return default
+    return lang if lang in SUPPORTED_LANGUAGES else None
+
 @app.route('/')
 def index():
     """Homepage with story list"""
     try:
         stories = get_cached_stories()
         # Check if translation is requested
-        translate = request.args.get('translate', 'false').lower() == 'true'
-        logger.info(f"Serving homepage with {len(stories)} stories (translate: {translate})")
-        return render_template('index.html', stories=stories, translate=translate)
+        lang = requested_language()
+        logger.info(f"Serving homepage with {len(stories)} stories (lang: {lang})")
+
+        snapshot = story_cache.snapshot
+        if snapshot is None or not app.config['PAGE_CACHE_ENABLED']:
+            return render_template('index.html', stories=stories, lang=lang)
+
+        # Untranslated pages don't depend on translation state
+        key = (snapshot.version, translator_service.language_version(lang) if lang else 0)
+        payload = page_cache.get(('index', lang), key, lambda: CachedPayload.build(
+            render_template('index.html', stories=snapshot.stories, lang=lang),
+            mimetype='text/html'))
+        return payload_response(payload)
     except Exception as e:
         logger.error(f"Error loading homepage: {e}")
         return render_template('error.html', 
                              error_message="Unable to load stories at this time."), 500
 
+def comment_thread(story_id, root=None):
+    """
+    Requested page (?p=, ?collapsed=) of a story's comments, or None if they aren't available
+
+    Waits at most COMMENT_FETCH_TIMEOUT for a cold thread; comment_cache.loading()
+    tells a thread still being fetched apart from one that failed.
+    """
+    if not story_id.isdigit():
+        return None
+    tree = comment_cache.get(story_id, timeout=app.config['COMMENT_FETCH_TIMEOUT'])
+    if tree is None:
+        return None
+    collapsed = {int(c) for c in request.args.get('collapsed', '').split(',') if c.isdigit()}
+    return render_page(tree, request.args.get('p', 1, type=int), app.config['COMMENTS_PER_PAGE'],
+                       root, collapsed, app.config['COMMENT_MAX_DEPTH'])
+
 @app.route('/item/<story_id>')
 def story(story_id):
-    """Individual story page (placeholder)"""
+    """Individual story page with its comment thread"""
     try:
-        # Find the story by ID
-        stories = get_cached_stories()
-        story = next((s for s in stories if s.id == story_id), None)
+        # Make sure the homepage snapshot is loaded, then use the id index
+        get_cached_stories()
+        story = find_story(story_id)
         
         if story:
             logger.info(f"Serving story page for ID: {story_id}")
-            return render_template('story.html', story=story)
+            thread = comment_thread(story_id) if story.comment_count else None
+            return render_template('story.html', story=story, thread=thread,
+                                 comments_loading=thread is None and comment_cache.loading(story_id),
+                                 trend=story_timeseries.velocity(story_id))
         else:
             logger.warning(f"Story not found: {story_id}")
             return render_template('error.html', 
@@ -58,57 +313,125 @@ def story(story_id):
 
 @app.route('/user/<username>')
 def user(username):
-    """User profile page (placeholder)"""
+    """User profile page: fetched profile plus submissions from the local story caches"""
     try:
-        logger.info(f"Serving user profile for: {username}")
-        return render_template('user.html', username=username)
+        if not USERNAME_RE.match(username):
+            return render_template('error.html', error_message="No such user."), 404
+        submissions = stories_by_author(username)
+        profile = user_cache.get(username, timeout=app.config['USER_FETCH_TIMEOUT'])
+        if profile is not None and not profile.exists and not submissions:
+            return render_template('error.html', error_message="No such user."), 404
+        logger.info(f"Serving user profile for: {username} ({len(submissions)} cached submissions, "
+                    f"profile {'loaded' if profile else 'unavailable'})")
+        return render_template('user.html', username=username, submissions=submissions,
+                             profile=profile if profile is not None and profile.exists else None)
     except Exception as e:
         logger.error(f"Error loading user profile {username}: {e}")
         return render_template('error.html', 
                              error_message="Unable to load user profile at this time."), 500
 
-# Navigation routes (placeholders)
+@app.route('/from')
+def from_site():
+    """Stories from one site, answered from the domain index"""
+    site = request.args.get('site', '').strip()
+    if not site:
+        return render_template('error.html',
+                             error_message="No site given."), 400
+    stories = stories_from_domain(site)
+    logger.info(f"Serving {len(stories)} stories from site: {site}")
+    return render_template('index.html', stories=stories, lang=None,
+                         page_title=f"Stories from {site}")
+
+def render_feed(feed, page_title):
+    """Render a feed's story list with the homepage template"""
+    try:
+        stories = get_cached_stories(feed)
+        logger.info(f"Serving {feed} feed with {len(stories)} stories")
+        return render_template('index.html', stories=stories, lang=None,
+                             page_title=page_title)
+    except Exception as e:
+        logger.error(f"Error loading {feed} feed: {e}")
+        return render_template('error.html',
+                             error_message="Unable to load stories at this time."), 500
+
+# Navigation routes
 @app.route('/new')
 def new():
-    """New stories page (placeholder)"""
-    return render_template('placeholder.html', 
-                         page_title="New Stories", 
-                         message="New stories page coming soon!")
+    """Newest stories page"""
+    return render_feed('newest', "New Stories")
 
 @app.route('/past')
 def past():
-    """Past stories page (placeholder)"""
-    return render_template('placeholder.html', 
-                         page_title="Past Stories", 
-                         message="Past stories page coming soon!")
+    """Top front page stories of one UTC day (?day=YYYY-MM-DD, default yesterday)"""
+    day_param = request.args.get('day')
+    try:
+        if day_param:
+            day = datetime.strptime(day_param, '%Y-%m-%d').date()
+        else:
+            day = datetime.now(timezone.utc).date() - timedelta(days=1)
+    except ValueError:
+        return render_template('error.html',
+                             error_message="Day must be in YYYY-MM-DD format."), 400
+
+    stories = history_store.top_stories(day.isoformat()) if app.config['HISTORY_ENABLED'] else []
+    logger.info(f"Serving {len(stories)} past stories for {day}")
+    return render_template('index.html', stories=stories, lang=None,
+                         page_title=f"Stories from {day.strftime('%B %d, %Y')}",
+                         past_nav={'day': day.isoformat(),
+                                   'previous': (day - timedelta(days=1)).isoformat(),
+                                   'next': (day + timedelta(days=1)).isoformat()})
+
+@app.route('/search')
+def search():
+    """Search results page for ?q="""
+    query = request.args.get('q', '').strip()
+    stories = []
+    if query:
+        stories = [doc.to_story(rank) for rank, (doc, _) in enumerate(search_index.search(query), start=1)]
+    logger.info(f"Search for '{query}' returned {len(stories)} stories")
+    return render_template('index.html', stories=stories, lang=None, search_query=query,
+                         page_title=f"Search: {query}" if query else "Search")
 
 @app.route('/comments')
 def comments():
-    """Comments page (placeholder)"""
-    return render_template('placeholder.html', 
-                         page_title="Comments", 
-                         message="Comments page coming soon!")
+    """Comment thread of ?id= (or the subtree under ?root=), else the most discussed stories"""
+    story_id = request.args.get('id', '').strip()
+    if not story_id:
+        stories = sorted(get_cached_stories(), key=lambda story: story.comment_count, reverse=True)
+        return render_template('index.html', stories=stories, lang=None, page_title="Most discussed")
+
+    try:
+        root = request.args.get('root', type=int)
+        thread = comment_thread(story_id, root)
+    except Exception as e:
+        logger.error(f"Error loading comments for {story_id}: {e}")
+        thread = None
+    story = find_story(story_id)
+    if thread is None and comment_cache.loading(story_id):
+        logger.info(f"Comments for story {story_id} still loading")
+        return render_template('comments.html', thread=None, story=story,
+                             page_title=story.title if story else f"Item {story_id}")
+    if thread is None:
+        return render_template('error.html',
+                             error_message=f"Comments for {story_id} not found."), 404
+    logger.info(f"Serving {len(thread.rows)} of {thread.total} comments for story {story_id}")
+    return render_template('comments.html', thread=thread, story=story,
+                         page_title=(story.title if story else thread.title) or f"Item {story_id}")
 
 @app.route('/ask')
 def ask():
-    """Ask HN page (placeholder)"""
-    return render_template('placeholder.html', 
-                         page_title="Ask HN", 
-                         message="Ask HN page coming soon!")
+    """Ask HN page"""
+    return render_feed('ask', "Ask HN")
 
 @app.route('/show')
 def show():
-    """Show HN page (placeholder)"""
-    return render_template('placeholder.html', 
-                         page_title="Show HN", 
-                         message="Show HN page coming soon!")
+    """Show HN page"""
+    return render_feed('show', "Show HN")
 
 @app.route('/jobs')
 def jobs():
-    """Jobs page (placeholder)"""
-    return render_template('placeholder.html', 
-                         page_title="Jobs", 
-                         message="Jobs page coming soon!")
+    """Jobs page"""
+    return render_feed('jobs', "Jobs")
 
 @app.route('/submit')
 def submit():
@@ -125,34 +448,128 @@ def login():
                          message="Login page coming soon!")
 
 # API routes
+def build_stories_payload(snapshot):
+    """Serialize a snapshot for /api/stories; runs once per snapshot"""
+    stories_data = [story.to_dict() for story in snapshot.stories]
+    body = app.json.dumps({
+        'success': True,
+        'count': len(stories_data),
+        'stories': stories_data
+    })
+    logger.info(f"Built /api/stories payload for snapshot v{snapshot.version} ({len(body)} bytes)")
+    return CachedPayload.build(body)
+
 @app.route('/api/stories')
 def api_stories():
-    """API endpoint to get stories as JSON"""
+    """API endpoint to get stories as JSON, served from a per-snapshot payload cache"""
     try:
-        stories = get_cached_stories()
-        stories_data = [story.to_dict() for story in stories]
+        get_cached_stories()
+        snapshot = story_cache.snapshot
+        if snapshot is None:
+            return jsonify({
+                'success': True,
+                'count': 0,
+                'stories': []
+            })
+        return payload_response(snapshot.memo('api_stories', build_stories_payload))
+    except Exception as e:
+        logger.error(f"Error in API stories endpoint: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Unable to fetch stories'
+        }), 500
+
+@app.route('/api/item/<story_id>/trend')
+def api_story_trend(story_id):
+    """API endpoint for one story's samples and velocity (?window=<seconds>, default 3600)"""
+    try:
+        window = request.args.get('window', 3600, type=int)
+        samples = story_timeseries.samples(story_id)
+        if not samples:
+            return jsonify({
+                'success': False,
+                'error': f'No samples for story {story_id}'
+            }), 404
         return jsonify({
             'success': True,
-            'count': len(stories_data),
-            'stories': stories_data
+            'story_id': story_id,
+            'velocity': story_timeseries.velocity(story_id, window),
+            'samples': samples
         })
     except Exception as e:
-        logger.error(f"Error in API stories endpoint: {e}")
+        logger.error(f"Error getting trend for story {story_id}: {e}")
         return jsonify({
             'success': False,
-            'error': 'Unable to fetch stories'
+            'error': 'Unable to get story trend'
+        }), 500
+
+@app.route('/api/rising')
+def api_rising():
+    """API endpoint for the stories gaining points fastest"""
+    try:
+        limit = min(request.args.get('limit', 30, type=int), 500)
+        window = request.args.get('window', 3600, type=int)
+        rising = story_timeseries.rising(limit, window)
+        for entry in rising:
+            story = find_story(entry['story_id'])
+            entry['title'] = story.title if story else None
+        return jsonify({
+            'success': True,
+            'count': len(rising),
+            'stories': rising
+        })
+    except Exception as e:
+        logger.error(f"Error getting rising stories: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Unable to get rising stories'
+        }), 500
+
+@app.route('/api/search')
+def api_search():
+    """API endpoint for full-text search (?q=, ?limit=)"""
+    try:
+        query = request.args.get('q', '').strip()
+        limit = min(request.args.get('limit', 30, type=int), 200)
+        started = time.perf_counter()
+        results = search_index.search(query, limit) if query else []
+        return jsonify({
+            'success': True,
+            'query': query,
+            'count': len(results),
+            'took_ms': round((time.perf_counter() - started) * 1000, 2),
+            'results': [{
+                'story_id': doc.story_id,
+                'title': doc.title,
+                'url': doc.url,
+                'domain': doc.domain,
+                'author': doc.author,
+                'points': doc.points,
+                'translations': doc.translations,
+                'score': round(score, 4)
+            } for doc, score in results]
+        })
+    except Exception as e:
+        logger.error(f"Error in search API: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Unable to search stories'
         }), 500
 
 @app.route('/api/refresh')
 def api_refresh():
-    """API endpoint to refresh story cache"""
+    """API endpoint to start a background refresh of the story cache"""
     try:
-        stories = refresh_story_cache()
-        logger.info("Story cache refreshed via API")
+        started = refresh_story_cache()
+        snapshot = story_cache.snapshot
+        logger.info(f"Story cache refresh requested via API (started: {started})")
         return jsonify({
             'success': True,
-            'message': f'Cache refreshed with {len(stories)} stories'
-        })
+            'message': 'Cache refresh started' if started else 'Cache refresh already in progress',
+            'started': started,
+            'snapshot_version': snapshot.version if snapshot else None,
+            'snapshot_age': round(snapshot.age(), 1) if snapshot else None
+        }), 202
     except Exception as e:
         logger.error(f"Error refreshing cache via API: {e}")
         return jsonify({
@@ -164,10 +581,13 @@ def api_refresh():
 def api_translate():
     """API endpoint to translate stories with priority loading"""
     try:
+        lang = requested_language(DEFAULT_LANGUAGE)
+        if lang is None:
+            return jsonify({'success': False, 'error': 'Unsupported language'}), 400
         stories = get_cached_stories()
         
         # Count already translated stories
-        already_translated = sum(1 for story in stories if story.translated_title)
+        already_translated, _ = translator_service.progress(stories, lang)
         
         if already_translated == len(stories):
             return jsonify({
@@ -176,25 +596,27 @@ def api_translate():
                 'priority_count': len(stories),
                 'background_count': 0,
                 'total_stories': len(stories),
-                'already_completed': True
+                'already_completed': True,
+                'lang': lang
             })
         
         # Start smart translation (now fully async for fast response)
-        translator_service.translate_stories_smart(stories, priority_count=3)
+        translator_service.translate_stories_smart(stories, priority_count=3, lang=lang)
         
         # Return immediately without waiting for translation to complete
         untranslated_count = len(stories) - already_translated
         priority_count = min(3, untranslated_count)
         remaining_count = max(0, untranslated_count - priority_count)
         
-        logger.info(f"Translation initiated: {priority_count} priority, {remaining_count} background")
+        logger.info(f"Translation into {lang} initiated: {priority_count} priority, {remaining_count} background")
         return jsonify({
             'success': True,
             'message': f'Translation started',
             'priority_count': priority_count,
             'background_count': remaining_count,
             'total_stories': len(stories),
-            'already_completed': False
+            'already_completed': False,
+            'lang': lang
         })
     except Exception as e:
         logger.error(f"Error in translation API: {e}")
@@ -207,15 +629,11 @@ def api_translate():
 def api_translation_status():
     """API endpoint to check translation status"""
     try:
-        stories = get_cached_stories()
-        translated_count = sum(1 for story in stories if story.translated_title)
-        
-        return jsonify({
-            'success': True,
-            'translated_count': translated_count,
-            'total_stories': len(stories),
-            'progress': round((translated_count / len(stories)) * 100, 1) if stories else 0
-        })
+        lang = requested_language(DEFAULT_LANGUAGE)
+        if lang is None:
+            return jsonify({'success': False, 'error': 'Unsupported language'}), 400
+        get_cached_stories()
+        return jsonify(translation_status(lang))
     except Exception as e:
         logger.error(f"Error checking translation status: {e}")
         return jsonify({
@@ -223,25 +641,67 @@ def api_translation_status():
             'error': 'Unable to check translation status'
         }), 500
 
-@app.route('/api/translations')
-def api_translations():
-    """API endpoint to get all translations for dynamic update"""
-    try:
-        stories = get_cached_stories()
-        translations = {}
-        
-        for story in stories:
-            if story.translated_title:
+def translation_status(lang):
+    """Body of /api/translation-status for the current homepage snapshot"""
+    return {
+        'success': True,
+        **translation_progress(lang),
+        'version': translator_service.version,
+        'lang': lang,
+        'queue_depth': translator_service.queue_depth(lang),
+        'cache': translator_service.cache.stats()
+    }
+
+def translations_since(since, lang):
+    """Body of /api/translations: translations after a version cursor, or all of them"""
+    version = translator_service.version
+    reset = True
+    translations = {}
+
+    if since.isdigit():
+        events, complete = translator_service.events_since(int(since), lang)
+        reset = not complete
+        for event in events:
+            translations[event['story_id']] = {
+                'original_title': event['original_title'],
+                'translated_title': event['translated_title']
+            }
+            version = max(version, event['version'])
+
+    if reset:
+        snapshot = story_cache.snapshot
+        for story in (snapshot.stories if snapshot else []):
+            translated = story.get_translation(lang)
+            if translated:
                 translations[story.id] = {
                     'original_title': story.title,
-                    'translated_title': story.translated_title
+                    'translated_title': translated
                 }
-        
-        return jsonify({
-            'success': True,
-            'translations': translations,
-            'count': len(translations)
-        })
+
+    return {
+        'success': True,
+        'translations': translations,
+        'count': len(translations),
+        'version': version,
+        'reset': reset,
+        'lang': lang
+    }
+
+@app.route('/api/translations')
+def api_translations():
+    """
+    API endpoint to get translations for dynamic update
+
+    With ?since=<version> only translations that landed after that version
+    are returned; 'reset' is true when the cursor is too old and the full
+    set was sent instead. ?lang=<code> picks the language (default zh-CN).
+    """
+    try:
+        lang = requested_language(DEFAULT_LANGUAGE)
+        if lang is None:
+            return jsonify({'success': False, 'error': 'Unsupported language'}), 400
+        get_cached_stories()
+        return jsonify(translations_since(request.args.get('since', ''), lang))
     except Exception as e:
         logger.error(f"Error getting translations: {e}")
         return jsonify({
@@ -249,6 +709,83 @@ def api_translations():
             'error': 'Unable to get translations'
         }), 500
 
+def format_sse(data, event=None, event_id=None):
+    """Format one Server-Sent Events message"""
+    message = ''
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    if event:
+        message += f"event: {event}\n"
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def translation_progress(lang=DEFAULT_LANGUAGE):
+    """Translated count and progress of the current homepage snapshot"""
+    snapshot = story_cache.snapshot
+    translated_count, total = translator_service.progress(snapshot.stories if snapshot else [], lang)
+    return {
+        'translated_count': translated_count,
+        'total_stories': total,
+        'progress': round((translated_count / total) * 100, 1) if total else 0
+    }
+
+def translation_stream_start(position, lang):
+    """Opening messages of a translation stream: (messages, pending events, cursor)"""
+    # Tell the browser how long to wait before reconnecting
+    messages = ["retry: 2000\n\n"]
+    events, complete = translator_service.events_since(position, lang)
+    if not complete:
+        # The resume point is no longer in the event log; resync from the stories
+        position = translator_service.version
+        snapshot = story_cache.snapshot
+        for story in (snapshot.stories if snapshot else []):
+            translated = story.get_translation(lang)
+            if translated:
+                messages.append(format_sse({'story_id': story.id, 'original_title': story.title,
+                                            'translated_title': translated}, event_id=position))
+        events = []
+    messages.append(format_sse(translation_progress(lang), event='progress'))
+    return messages, events, position
+
+def translation_stream_messages(events, lang):
+    """SSE messages for a batch of translation events, followed by a progress update"""
+    messages = [format_sse({key: event[key] for key in ('story_id', 'original_title', 'translated_title')},
+                           event_id=event['version'])
+                for event in events]
+    messages.append(format_sse(translation_progress(lang), event='progress'))
+    return messages
+
+@app.route('/api/translations/stream')
+def api_translations_stream():
+    """Server-Sent Events stream pushing each translation as soon as it lands"""
+    lang = requested_language(DEFAULT_LANGUAGE)
+    if lang is None:
+        return jsonify({'success': False, 'error': 'Unsupported language'}), 400
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id', '0'))
+    cursor = int(last_event_id) if last_event_id.isdigit() else 0
+    keepalive = app.config['SSE_KEEPALIVE_SECONDS']
+    max_duration = app.config['SSE_MAX_STREAM_SECONDS']
+
+    def generate():
+        messages, events, position = translation_stream_start(cursor, lang)
+        yield from messages
+
+        started = time.time()
+        while time.time() - started < max_duration:
+            if not events:
+                events, position = translator_service.wait_for_events(position, timeout=keepalive, lang=lang)
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+            position = max(position, events[-1]['version'])
+            yield from translation_stream_messages(events, lang)
+            events = []
+
+    logger.info(f"Translation stream opened (lang: {lang}, resume from: {cursor})")
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -264,23 +801,88 @@ def internal_error(error):
     return render_template('error.html', 
                          error_message="Internal server error."), 500
 
+def health_report():
+    """
+    Readiness and freshness of every feed, without fetching anything
+
+    Returns (payload, status code). Not ready (503) until the homepage
+    snapshot has loaded; after that the status is 'stale' when upstream
+    hasn't been checked for HEALTH_STALE_SECONDS, since old stories are
+    still served. Each feed carries the error of its last failed refresh,
+    cleared by the next successful one.
+    """
+    now = time.time()
+    feeds = {}
+    for feed, cache in feed_caches.items():
+        snapshot = cache.snapshot
+        if snapshot is None:
+            feeds[feed] = {'loaded': False, 'error': cache.last_error}
+        else:
+            feeds[feed] = {'loaded': True, 'stories': len(snapshot.stories), 'version': snapshot.version,
+                           'age': round(now - snapshot.fetched_at, 1),
+                           'checked_age': round(now - snapshot.checked_at, 1),
+                           'error': cache.last_error}
+    homepage = story_cache.snapshot
+    if homepage is None:
+        status = 'starting'
+    elif now - homepage.checked_at > app.config['HEALTH_STALE_SECONDS']:
+        status = 'stale'
+    else:
+        status = 'healthy'
+    return {
+        'status': status,
+        'stories_loaded': len(homepage.stories) if homepage else 0,
+        'feeds': feeds,
+        'translation_queue': translator_service.queue_depth()
+    }, 200 if homepage is not None else 503
+
 # Health check endpoint
 @app.route('/health')
 def health():
-    """Health check endpoint"""
+    """Readiness check; never waits on a fetch"""
+    payload, status = health_report()
+    return jsonify(payload), status
+
+@app.route('/admin/profiles')
+def admin_profiles():
+    """Slowest recent requests with links to their profiles; needs the profiling token"""
+    if not request_profiler.authorized(profile_token()):
+        return not_found(None)
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    profiled_only = request.args.get('profiled', 'false').lower() == 'true'
+    entries = []
+    for entry in request_profiler.slowest(limit, profiled_only):
+        data = entry.to_dict()
+        if entry.profile_id:
+            data['files'] = {fmt: f"/admin/profiles/{entry.profile_id}.{fmt}" for fmt in ('prof', 'folded')}
+        entries.append(data)
     return jsonify({
-        'status': 'healthy',
-        'stories_loaded': len(get_cached_stories())
+        'success': True,
+        'sample_percent': request_profiler.sample_percent,
+        'count': len(entries),
+        'requests': entries
     })
 
+@app.route('/admin/profiles/<profile_id>.<fmt>')
+def admin_profile_file(profile_id, fmt):
+    """One saved profile: .prof for pstats/snakeviz, .folded for flamegraph.pl/speedscope"""
+    if not request_profiler.authorized(profile_token()) or fmt not in ('prof', 'folded'):
+        return not_found(None)
+    path = request_profiler.profile_path(profile_id, '.' + fmt)
+    if path is None:
+        return not_found(None)
+    return send_file(os.path.abspath(path), as_attachment=True,
+                     mimetype='application/octet-stream' if fmt == 'prof' else 'text/plain')
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics"""
+    if not app.config['METRICS_ENABLED']:
+        return not_found(None)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    # Load stories on startup
-    try:
-        stories = get_cached_stories()
-        logger.info(f"Application started with {len(stories)} stories loaded")
-    except Exception as e:
-        logger.error(f"Error loading stories on startup: {e}")
-    
+    start_background_tasks()
     # Run the app
     app.run(
         debug=app.config['DEBUG'],
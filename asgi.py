@@ -0,0 +1,252 @@
+# ASGI entry point: async API and streaming routes, everything else through Flask
+#
+# Run with: python serve.py --mode async   (or: uvicorn asgi:application)
+#
+# The JSON API and the translation stream are served straight from the event
+# loop; they only read in-memory snapshots, so they never need a thread. A
+# translation stream waits on an asyncio event instead of holding a worker
+# thread, so thousands of open streams cost a few KB each. HTML pages and
+# every other route go to the Flask app through asgiref's WSGI adapter,
+# which runs them on its thread pool. The feed refresher is scheduled from
+# the event loop too.
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+
+# Must be set before app is imported so it doesn't start its own refresher thread
+os.environ.setdefault('STORY_REFRESH_DRIVER', 'asyncio')
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (app, build_stories_payload, health_report, resolve_language, start_background_tasks,
+                 translation_status, translations_since, translation_stream_start, translation_stream_messages)
+from http_cache import negotiate
+from metrics import request_count, request_latency
+from story_cache import feed_refresher, story_cache
+from translator import DEFAULT_LANGUAGE, translator_service
+
+logger = logging.getLogger(__name__)
+
+flask_application = WsgiToAsgi(app)
+
+class TranslationNotifier:
+    """
+    Wakes waiting coroutines when a translation lands
+
+    Translations land on translator worker threads; the listener hops onto
+    the event loop with call_soon_threadsafe and sets the current event,
+    replacing it with a fresh one for the next wait. A waiter takes the event
+    before checking for new translations, so one landing in between still
+    wakes it.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._event = None
+
+    def bind(self, loop):
+        """Attach to the serving event loop; call once, from that loop"""
+        if self._loop is not None:
+            return
+        self._loop = loop
+        self._event = asyncio.Event()
+        translator_service.add_listener(self._on_translation)
+
+    def _on_translation(self, story, lang, translated_title):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    def current(self) -> asyncio.Event:
+        """The event the next translation will set"""
+        if self._loop is None:
+            # Servers run without lifespan events still get notifications
+            self.bind(asyncio.get_running_loop())
+        return self._event
+
+notifier = TranslationNotifier()
+
+def query_params(scope):
+    """First value of each query string parameter"""
+    return {key: values[0] for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+
+def header(scope, name):
+    name = name.lower().encode('latin-1')
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+async def send_response(send, status, body=b'', headers=None):
+    raw_headers = [(key.lower().encode('latin-1'), str(value).encode('latin-1'))
+                   for key, value in (headers or {}).items()]
+    raw_headers.append((b'content-length', str(len(body)).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_json(send, data, status=200):
+    body = app.json.dumps(data, separators=(',', ':')).encode('utf-8')
+    await send_response(send, status, body, {'Content-Type': 'application/json'})
+
+async def api_stories(scope, receive, send):
+    """Async /api/stories: the per-snapshot payload, negotiated from raw headers"""
+    snapshot = story_cache.snapshot
+    if snapshot is None:
+        story_cache.refresh_async()
+        await send_json(send, {'success': True, 'count': 0, 'stories': []})
+        return
+    payload = snapshot.memo('api_stories', build_stories_payload)
+    status, headers, body = negotiate(payload, header(scope, 'accept-encoding'), header(scope, 'if-none-match'))
+    await send_response(send, status, body, headers)
+
+def language_or_error(params):
+    return resolve_language(params.get('lang'), params.get('translate'), DEFAULT_LANGUAGE)
+
+async def api_translation_status(scope, receive, send):
+    """Async /api/translation-status"""
+    lang = language_or_error(query_params(scope))
+    if lang is None:
+        await send_json(send, {'success': False, 'error': 'Unsupported language'}, 400)
+        return
+    await send_json(send, translation_status(lang))
+
+async def api_translations(scope, receive, send):
+    """Async /api/translations"""
+    params = query_params(scope)
+    lang = language_or_error(params)
+    if lang is None:
+        await send_json(send, {'success': False, 'error': 'Unsupported language'}, 400)
+        return
+    await send_json(send, translations_since(params.get('since', ''), lang))
+
+async def api_translations_stream(scope, receive, send):
+    """Async /api/translations/stream; same messages as the Flask route, no thread held"""
+    params = query_params(scope)
+    lang = language_or_error(params)
+    if lang is None:
+        await send_json(send, {'success': False, 'error': 'Unsupported language'}, 400)
+        return
+    last_event_id = header(scope, 'last-event-id') or params.get('last_event_id', '0')
+    cursor = int(last_event_id) if last_event_id.isdigit() else 0
+    keepalive = app.config['SSE_KEEPALIVE_SECONDS']
+    max_duration = app.config['SSE_MAX_STREAM_SECONDS']
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream; charset=utf-8'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+
+    async def emit(messages):
+        await send({'type': 'http.response.body', 'body': ''.join(messages).encode('utf-8'),
+                    'more_body': True})
+
+    try:
+        wake = notifier.current()
+        messages, events, position = translation_stream_start(cursor, lang)
+        await emit(messages)
+
+        started = time.time()
+        while time.time() - started < max_duration and not disconnected.is_set():
+            if not events:
+                # Same cursor rule as wait_for_events: other languages' events move it on too
+                latest = translator_service.version
+                events, _ = translator_service.events_since(position, lang)
+                events = [event for event in events if event['version'] <= latest]
+                position = latest
+            if not events:
+                waiter = asyncio.ensure_future(wake.wait())
+                await asyncio.wait({waiter, watcher}, timeout=keepalive, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if not wake.is_set() and not disconnected.is_set():
+                    await emit([": keep-alive\n\n"])
+                wake = notifier.current()
+                continue
+            position = max(position, events[-1]['version'])
+            await emit(translation_stream_messages(events, lang))
+            events = []
+    finally:
+        watcher.cancel()
+    if not disconnected.is_set():
+        await send({'type': 'http.response.body', 'body': b''})
+
+async def health(scope, receive, send):
+    """Async /health"""
+    payload, status = health_report()
+    await send_json(send, payload, status)
+
+ROUTES = {
+    '/api/stories': api_stories,
+    '/api/translation-status': api_translation_status,
+    '/api/translations': api_translations,
+    '/api/translations/stream': api_translations_stream,
+    '/health': health,
+}
+
+async def refresh_loop():
+    """Periodic feed refresh scheduled on the event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            # requests is blocking, so the fetch itself runs on the default executor
+            await loop.run_in_executor(None, feed_refresher.refresh_all)
+        except Exception as e:
+            logger.error(f"Feed refresh cycle failed: {e}")
+        cold = any(cache.snapshot is None for cache in feed_refresher.caches.values())
+        await asyncio.sleep(min(feed_refresher.interval, 30) if cold else feed_refresher.interval)
+
+async def lifespan(receive, send):
+    refresher = None
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            notifier.bind(asyncio.get_running_loop())
+            start_background_tasks()
+            if app.config['STORY_REFRESH_ENABLED'] and app.config['STORY_REFRESH_DRIVER'] == 'asyncio':
+                refresher = asyncio.ensure_future(refresh_loop())
+            logger.info("ASGI application started")
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if refresher is not None:
+                refresher.cancel()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    """The ASGI application"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+        handler = ROUTES.get(scope['path'])
+        if handler is not None:
+            started = time.perf_counter()
+
+            async def timed_send(message):
+                # Timed up to the response headers, like the Flask routes
+                if message['type'] == 'http.response.start':
+                    request_latency.observe(time.perf_counter() - started, scope['path'], scope['method'])
+                    request_count.inc(scope['path'], scope['method'], str(message['status']))
+                await send(message)
+
+            try:
+                await handler(scope, receive, timed_send)
+            except Exception as e:
+                logger.error(f"Error in async route {scope['path']}: {e}")
+                await send_json(timed_send, {'success': False, 'error': 'Internal server error'}, 500)
+            return
+    await flask_application(scope, receive, send)
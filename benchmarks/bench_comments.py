@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Benchmark comment thread parsing and rendering on a huge synthetic thread
+#
+# Usage: python benchmarks/bench_comments.py [--comments N] [--chunk BYTES]
+# Compares the streaming item page parser against parsing the whole page
+# into an lxml tree (time, and peak RSS of a fresh process for each), then
+# reports the size of the flat CommentTree and the time to render its pages.
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import html as lxml_html
+
+from comments import CommentTreeBuilder, render_page
+from data_parser import ItemPageParser
+from make_fixtures import synthetic_item_page
+
+def measure(variant, comments, chunk_size):
+    """Run one parse in a fresh process: (milliseconds, peak RSS growth in MB)"""
+    output = subprocess.run([sys.executable, __file__, '--variant', variant, '--comments', str(comments),
+                             '--chunk', str(chunk_size)], capture_output=True, text=True, check=True).stdout
+    elapsed, peak = output.split()
+    return float(elapsed), float(peak)
+
+def run_variant(variant, comments, chunk_size):
+    data = synthetic_item_page(7, comments=comments).encode('utf-8')
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if variant == 'full':
+        document = lxml_html.fromstring(data)
+    else:
+        tree = stream_parse(data, chunk_size)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print(f"{elapsed * 1000:.1f} {peak / 1024:.1f}")
+
+def stream_parse(data, chunk_size):
+    parser = ItemPageParser()
+    builder = CommentTreeBuilder('1')
+    for start in range(0, len(data), chunk_size):
+        for comment in parser.feed(data[start:start + chunk_size]):
+            builder.add(*comment)
+    for comment in parser.close():
+        builder.add(*comment)
+    return builder.build(parser.title)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark comment thread parsing')
+    parser.add_argument('--comments', type=int, default=5000)
+    parser.add_argument('--chunk', type=int, default=65536)
+    parser.add_argument('--variant', choices=('full', 'stream'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.variant:
+        run_variant(args.variant, args.comments, args.chunk)
+        return
+
+    data = synthetic_item_page(7, comments=args.comments).encode('utf-8')
+    print(f"Item page: {args.comments} comments, {len(data) / 1e6:.1f} MB")
+    for label, variant in (('full lxml document', 'full'), ('streaming parse + tree', 'stream')):
+        elapsed, peak = measure(variant, args.comments, args.chunk)
+        print(f"{label:<24} {elapsed:8.1f} ms   peak RSS +{peak:.1f} MB")
+
+    tree = stream_parse(data, args.chunk)
+    print(f"CommentTree: {len(tree)} comments, {tree.nbytes() / 1e6:.2f} MB")
+
+    timings = []
+    for page in range(1, 200):
+        started = time.perf_counter()
+        result = render_page(tree, page, per_page=100)
+        timings.append(time.perf_counter() - started)
+        if page >= result.page_count:
+            break
+    print(f"render_page x{len(timings)}: p50 {percentile(timings, 0.5) * 1000:.2f} ms, "
+          f"max {max(timings) * 1000:.2f} ms")
+
+if __name__ == '__main__':
+    main()
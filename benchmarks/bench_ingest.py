@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# Benchmark HTML scraping against JSON API ingestion, offline
+#
+# Usage: python benchmarks/bench_ingest.py [--latency MS] [--pages N] [--churn N] [--workers N]
+# Starts benchmarks/mock_hn.py with --latency per response, then times a
+# cold and a warm refresh cycle of every feed for each source:
+#   html: conditional fetch of N listing pages per feed, then parse the changed ones
+#   api:  id lists + updates.json, then only new or changed items
+# A last API cycle runs after --churn stories have changed upstream.
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_hn import start_server
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML scraping against API ingestion')
+    parser.add_argument('--latency', type=float, default=30, help='milliseconds added per response')
+    parser.add_argument('--pages', type=int, default=2, help='listing pages (30 stories each) per feed')
+    parser.add_argument('--churn', type=int, default=10, help='stories changed before the warm API cycle')
+    parser.add_argument('--workers', type=int, default=10, help='concurrent requests')
+    args = parser.parse_args()
+
+    server, mock = start_server(latency=args.latency / 1000)
+    base = f"http://127.0.0.1:{server.server_port}/"
+    os.environ['HN_BASE_URL'] = base
+    os.environ['HN_API_BASE_URL'] = base + 'v0/'
+
+    # Imported after the environment points them at the mock server
+    from hn_api import ApiIngester
+    from scraper import FEEDS, fetch_feeds
+    from story_cache import FeedRefresher
+
+    feeds = list(FEEDS)
+    # Builds feeds the way the refresher does, so an unchanged feed is None on both paths
+    refresher = FeedRefresher({}, pages=args.pages, max_workers=args.workers)
+
+    def html_cycle():
+        results = fetch_feeds(feeds, args.pages, args.workers)
+        return {feed: refresher._build_feed(feed, pages) for feed, pages in results.items()}
+
+    ingester = ApiIngester(max_workers=args.workers)
+
+    def api_cycle():
+        return ingester.load_feeds(feeds, args.pages * 30)
+
+    print(f"{len(feeds)} feeds x {args.pages * 30} stories, {args.latency:.0f} ms per response, "
+          f"{args.workers} concurrent requests")
+    for label, cycle, before in (('html cold', html_cycle, None), ('html warm', html_cycle, None),
+                                 ('api cold', api_cycle, None), ('api warm', api_cycle, None),
+                                 ('api churn', api_cycle, lambda: mock.churn(args.churn))):
+        if before:
+            before()
+        requests_before = mock.requests
+        started = time.perf_counter()
+        built = cycle()
+        elapsed = time.perf_counter() - started
+        stories = sum(len(stories) for stories in built.values() if stories)
+        unchanged = sum(1 for stories in built.values() if stories is None)
+        print(f"{label:<10} {elapsed * 1000:8.0f} ms   {mock.requests - requests_before:4d} requests   "
+              f"{stories:4d} stories built   {unchanged} feeds unchanged")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Benchmark Story construction, memory and template helpers at scale
+#
+# Usage: python benchmarks/bench_models.py [--count N] [--repeat N]
+# Builds N stories with the validating constructor and with the parser's
+# fast path, then reports build time, retained memory per story and the
+# cost of the helpers the templates and JSON API call for every story.
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import Story
+
+def story_fields(count):
+    """Parser-shaped field tuples; a mix of external links and self posts"""
+    rows = []
+    for i in range(count):
+        external = i % 5 != 0
+        rows.append((
+            str(40000000 + i), i % 30 + 1, f"Story title number {i} about something",
+            f"https://example{i % 500}.com/post/{i}" if external else f"/item/{40000000 + i}",
+            f"example{i % 500}.com" if external else "", i % 700, f"user{i % 3000}",
+            f"{i % 23 + 1} hours ago", i % 400,
+        ))
+    return rows
+
+def build_validated(rows):
+    return [Story(id=r[0], rank=r[1], title=r[2], url=r[3], domain=r[4], points=r[5],
+                  author=r[6], time_ago=r[7], comment_count=r[8]) for r in rows]
+
+def build_fast(rows):
+    return [Story.from_parsed(*r) for r in rows]
+
+def measure_build(build, rows):
+    started = time.perf_counter()
+    build(rows)
+    elapsed = time.perf_counter() - started
+
+    # Memory pass, measured separately so tracing doesn't skew timings
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    stories = build(rows)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return stories, elapsed, retained - before
+
+def render_pass(stories):
+    """What index.html touches for each story"""
+    for story in stories:
+        story.is_external_link()
+        story.get_story_link()
+        story.get_user_link()
+        story.get_comment_link()
+        story.comment_text
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark Story construction and helpers')
+    arg_parser.add_argument('--count', type=int, default=100000, help='stories to build')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='render/serialize passes')
+    args = arg_parser.parse_args()
+
+    rows = story_fields(args.count)
+    print(f"{args.count} stories, {args.repeat} render passes\n")
+
+    print(f"{'constructor':12} {'build s':>8} {'stories/s':>10} {'bytes/story':>12}")
+    results = {}
+    for name, build in (('validated', build_validated), ('from_parsed', build_fast)):
+        stories, elapsed, retained = measure_build(build, rows)
+        results[name] = stories
+        print(f"{name:12} {elapsed:8.3f} {args.count / elapsed:10.0f} {retained / args.count:12.0f}")
+
+    assert [s.to_dict() for s in results['validated'][:1000]] == \
+        [s.to_dict() for s in results['from_parsed'][:1000]], "constructors disagree"
+
+    stories = results['from_parsed']
+    print()
+    for name, work in (('render', render_pass),
+                       ('to_dict', lambda items: [story.to_dict() for story in items])):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            work(stories)
+        elapsed = time.perf_counter() - started
+        print(f"{name:12} {args.repeat * args.count / elapsed:10.0f} stories/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Benchmark the story parser backends over saved HN listing pages
+#
+# Usage: python benchmarks/bench_parser.py [--repeat N] [fixture.html ...]
+# Reports stories/sec and peak traced memory per backend, and checks that
+# every backend produces the same Story list.
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from data_parser import PARSER_BACKENDS
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+def load_fixtures(paths):
+    pages = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+def run_backend(parser, pages, repeat):
+    # Throughput pass
+    story_count = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            story_count += len(parser(page))
+    elapsed = time.perf_counter() - started
+
+    # Memory pass, measured separately so tracing doesn't skew timings
+    tracemalloc.start()
+    for page in pages:
+        parser(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return story_count, elapsed, peak
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark story parser backends')
+    arg_parser.add_argument('fixtures', nargs='*', help='HTML fixture files (default: benchmarks/fixtures/*.html)')
+    arg_parser.add_argument('--repeat', type=int, default=20, help='passes over the fixture set')
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    paths = args.fixtures or sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))
+    if not paths:
+        sys.exit("No fixtures found; run benchmarks/make_fixtures.py first")
+    pages = load_fixtures(paths)
+    print(f"{len(pages)} fixture pages, {args.repeat} passes\n")
+
+    # Every backend must agree with the reference bs4 parser
+    reference = [[s.to_dict() for s in PARSER_BACKENDS['bs4'](page)] for page in pages]
+    for name, parser in PARSER_BACKENDS.items():
+        result = [[s.to_dict() for s in parser(page)] for page in pages]
+        status = "identical" if result == reference else "MISMATCH"
+        print(f"{name:6} output: {status}")
+    print()
+
+    print(f"{'backend':8} {'stories':>8} {'seconds':>8} {'stories/s':>10} {'peak MiB':>9}")
+    for name, parser in PARSER_BACKENDS.items():
+        count, elapsed, peak = run_backend(parser, pages, args.repeat)
+        print(f"{name:8} {count:8d} {elapsed:8.3f} {count / elapsed:10.0f} {peak / 2**20:9.2f}")
+    print("\npeak MiB is the tracemalloc peak; it covers Python allocations only, "
+          "not memory held inside C parser trees")
+
+if __name__ == '__main__':
+    main()
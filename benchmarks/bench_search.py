@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Benchmark the search index at the scale of months of story history
+#
+# Usage: python benchmarks/bench_search.py [--count N] [--queries N]
+# Indexes N synthetic stories, then reports build time, index size and
+# uncached query latency percentiles for one-, two- and three-term queries
+# drawn from the 200 most common words, on a cold and a warm pass.
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import Story
+from search_index import SearchIndex
+
+COMMON = ('the a of to for in and on with is how why your from show hn ask new rust python database '
+          'postgres compiler kernel linux browser privacy security gpu llm startup design network '
+          'protocol memory cache latency open source hardware systems sqlite async').split()
+# Titles draw from a Zipf-like vocabulary: a few very common words and a long tail
+VOCABULARY = COMMON + [f"term{i}" for i in range(30000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+def make_stories(count, rng):
+    now = time.time()
+    for i in range(count):
+        title = ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=rng.randint(3, 10))).capitalize()
+        yield Story.from_parsed(id=str(30000000 + i), rank=0, title=title, url='', domain=f"site{i % 2000}.com",
+                                points=rng.randint(1, 1500), author=f"user{i % 20000}", time_ago='',
+                                comment_count=0), now - rng.random() * 90 * 86400
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark the search index')
+    arg_parser.add_argument('--count', type=int, default=300000, help='stories to index')
+    arg_parser.add_argument('--queries', type=int, default=200, help='queries per query length')
+    args = arg_parser.parse_args()
+    rng = random.Random(42)
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    for story, seen_at in make_stories(args.count, rng):
+        index.add(story, seen_at)
+    elapsed = time.perf_counter() - started
+    stats = index.stats()
+    print(f"Indexed {stats['documents']} stories ({stats['terms']} terms) in {elapsed:.2f}s\n")
+
+    # The first query for a common term builds its impact list; later ones reuse it
+    print(f"{'terms':>5} {'pass':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'avg hits':>9}")
+    for length in (1, 2, 3):
+        queries = [' '.join(rng.choices(VOCABULARY[:200], cum_weights=CUM_WEIGHTS[:200], k=length))
+                   for _ in range(args.queries)]
+        for label in ('cold', 'warm'):
+            timings = []
+            hits = 0
+            for query in queries:
+                started = time.perf_counter()
+                hits += len(index.search(query, now=time.time()))  # now= bypasses the result cache
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"{length:5d} {label:>5} {percentile(timings, 0.5):8.2f} {percentile(timings, 0.95):8.2f} "
+                  f"{max(timings):8.2f} {hits / args.queries:9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# Benchmark the translation pipeline offline against stub backends
+#
+# Usage: python benchmarks/bench_translation.py [--runs N] [--include-google]
+# Each run parses a fixture page into fresh stories, queues them the way
+# /api/translate does and waits for every title. Reports titles/sec,
+# p50/p99 time to first translated title and the store's cache hit ratio.
+# Fixture pages repeat across runs, so later runs measure warm-cache paths.
+
+import argparse
+import glob
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import translation_backends
+from data_parser import parse_stories
+from translation_backends import LocalStubBackend
+from translation_store import TranslationStore
+from translator import TokenBucket, TranslationService
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# name -> backend factory options
+SCENARIOS = {
+    'stub-fast': dict(latency=0.005),
+    'stub-50ms': dict(latency=0.05),
+    'stub-200ms': dict(latency=0.2, per_char_latency=0.00005),
+    'stub-flaky': dict(latency=0.05, failure_rate=0.2),
+}
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def run_scenario(name, backend_name, pages, runs, rate):
+    service = TranslationService(store=TranslationStore(':memory:'), backend=backend_name)
+    service.rate_limiter = TokenBucket(rate=rate, capacity=max(1, rate / 2))
+    first_title = []
+    cold_first_title = []
+    titles = 0
+    started = time.perf_counter()
+
+    for run in range(runs):
+        stories = parse_stories(pages[run % len(pages)])
+        version = service.version
+        run_started = time.perf_counter()
+        service.translate_stories_smart(stories, priority_count=3)
+        if service.wait_for_events(version, timeout=30)[0]:
+            first_title.append(time.perf_counter() - run_started)
+            if run < len(pages):
+                cold_first_title.append(first_title[-1])
+        service.wait_until_idle()
+        titles += len(stories)
+
+    elapsed = time.perf_counter() - started
+    stats = service.cache.stats()
+    return {
+        'name': name,
+        'titles_per_sec': titles / elapsed,
+        'p50': percentile(first_title, 0.5) if first_title else float('nan'),
+        'p99': percentile(first_title, 0.99) if first_title else float('nan'),
+        'cold_p50': percentile(cold_first_title, 0.5) if cold_first_title else float('nan'),
+        'hit_ratio': stats['hit_ratio'],
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark translation backends')
+    arg_parser.add_argument('--runs', type=int, default=20, help='pages translated per scenario')
+    arg_parser.add_argument('--rate', type=float, default=10, help='upstream requests per second')
+    arg_parser.add_argument('--include-google', action='store_true', help='also hit Google Translate (needs network)')
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))
+    if not paths:
+        sys.exit("No fixtures found; run benchmarks/make_fixtures.py first")
+    pages = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+
+    # Register each stub scenario as its own backend name
+    scenarios = []
+    for name, options in SCENARIOS.items():
+        translation_backends.BACKENDS[name] = (
+            lambda source, target, options=options: LocalStubBackend(source, target, **options))
+        scenarios.append((name, name))
+    if args.include_google:
+        scenarios.append(('google', 'google'))
+
+    print(f"{args.runs} pages per scenario, {args.rate:g} upstream requests/s\n")
+    print(f"{'backend':12} {'titles/s':>9} {'p50 first':>10} {'p99 first':>10} {'cold p50':>10} {'hit ratio':>10}")
+    for name, backend_name in scenarios:
+        result = run_scenario(name, backend_name, pages, args.runs, args.rate)
+        print(f"{result['name']:12} {result['titles_per_sec']:9.1f} {result['p50'] * 1000:8.0f}ms "
+              f"{result['p99'] * 1000:8.0f}ms {result['cold_p50'] * 1000:8.0f}ms {result['hit_ratio']:10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# Load test the server, or compare the async and sync serving modes
+#
+# Usage:
+#   python benchmarks/load_test.py --url http://127.0.0.1:5000 [--concurrency N] [--duration S] [--streams N]
+#   python benchmarks/load_test.py --compare [--concurrency N] [--duration S] [--streams N]
+#
+# Keeps --concurrency keep-alive connections busy with GET requests cycling
+# through --paths for --duration seconds and reports requests/sec and
+# p50/p95/p99 latency. --streams holds that many translation SSE streams open
+# during the run, as browsers on the homepage do.
+#
+# --compare starts benchmarks/mock_hn.py in place of news.ycombinator.com,
+# runs serve.py in each mode against it (stub translation backend,
+# temporary cache files) and prints both results.
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+from mock_hn import start_server
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+DEFAULT_PATHS = '/api/stories,/api/translation-status,/api/translations,/health'
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns the status code"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+async def client(host, port, paths, deadline, latencies, errors):
+    """One keep-alive connection sending requests back to back until the deadline"""
+    reader = writer = None
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n\r\n".encode())
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+async def hold_stream(host, port, deadline, opened):
+    """Keep one translation SSE stream open, draining it, until the deadline"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f"GET /api/translations/stream HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+        if (await reader.readline()).startswith(b'HTTP/1.1 200'):
+            opened.append(1)
+        while time.perf_counter() < deadline:
+            try:
+                if not await asyncio.wait_for(reader.read(4096), deadline - time.perf_counter()):
+                    break
+            except asyncio.TimeoutError:
+                break
+        writer.close()
+    except OSError:
+        pass
+
+async def run_load(url, paths, concurrency, duration, streams):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    deadline = time.perf_counter() + duration
+    latencies, errors, opened = [], [], []
+    stream_tasks = [asyncio.ensure_future(hold_stream(host, port, deadline + 1, opened)) for _ in range(streams)]
+    if streams:
+        await asyncio.sleep(0.5)  # Let the streams connect before measuring
+        deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, paths, deadline, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*stream_tasks)
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'errors': len(errors),
+        'streams': len(opened),
+    }
+
+def print_result(label, result):
+    print(f"{label:<8} {result['rps']:>9.0f} req/s   p50 {result['p50']:7.2f} ms   p95 {result['p95']:7.2f} ms   "
+          f"p99 {result['p99']:7.2f} ms   {result['requests']} requests, {result['errors']} errors, "
+          f"{result['streams']} streams open")
+
+def wait_until_loaded(url, timeout=60):
+    """Wait for the server to answer /health with stories loaded"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/health', timeout=2) as response:
+                if b'"stories_loaded":0' not in response.read().replace(b' ', b''):
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.3)
+    return False
+
+def compare(args):
+    fixture_server, _ = start_server()
+    workdir = tempfile.mkdtemp(prefix='hn-load-')
+    results = {}
+    try:
+        for offset, mode in enumerate(('sync', 'async')):
+            port = args.port + offset
+            env = dict(os.environ,
+                       HN_BASE_URL=f"http://127.0.0.1:{fixture_server.server_port}/",
+                       TRANSLATION_BACKEND='stub',
+                       TRANSLATION_CACHE_PATH=os.path.join(workdir, f"{mode}-translations.sqlite3"),
+                       HISTORY_PATH=os.path.join(workdir, f"{mode}-history.sqlite3"),
+                       SSE_KEEPALIVE_SECONDS='5')
+            server = subprocess.Popen([sys.executable, 'serve.py', '--mode', mode, '--port', str(port),
+                                       '--threads', str(args.threads), '--log-level', 'warning'],
+                                      cwd=ROOT, env=env)
+            try:
+                url = f"http://127.0.0.1:{port}"
+                if not wait_until_loaded(url):
+                    print(f"{mode}: server did not load stories, skipping")
+                    continue
+                results[mode] = asyncio.run(run_load(url, args.paths.split(','), args.concurrency,
+                                                     args.duration, args.streams))
+            finally:
+                server.terminate()
+                server.wait(10)
+    finally:
+        fixture_server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{args.concurrency} connections, {args.streams} SSE streams, {args.duration}s, "
+          f"sync threads: {args.threads}")
+    for mode, result in results.items():
+        print_result(mode, result)
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the HN clone server')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--paths', default=DEFAULT_PATHS, help='comma-separated paths to request')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--streams', type=int, default=0, help='SSE streams held open during the run')
+    parser.add_argument('--compare', action='store_true', help='start and compare both serving modes')
+    parser.add_argument('--port', type=int, default=5100, help='--compare: first port to use')
+    parser.add_argument('--threads', type=int, default=8, help='--compare: sync mode worker threads')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args)
+    else:
+        print_result('result', asyncio.run(run_load(args.url, args.paths.split(','), args.concurrency,
+                                                    args.duration, args.streams)))
+
+if __name__ == '__main__':
+    main()
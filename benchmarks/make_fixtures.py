@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# Build Hacker News listing page fixtures for the benchmarks and tests
+#
+# By default this writes synthetic pages that follow HN's listing markup
+# (athing/subtext row pairs, sitebit, hnuser, age, comment links), including
+# the awkward rows: Ask HN items with relative URLs, job posts without a
+# score or author, "discuss" links and HTML entities in titles.
+# It also writes a synthetic comment thread item page (item_1.html) in HN's
+# comtr markup, with nesting, deleted comments, links and code blocks, and
+# api_snapshot.json: the same stories as JSON API id lists and items, in
+# the format benchmarks/mock_hn.py serves and records.
+# With --fetch it saves the live front page and feeds instead.
+
+import argparse
+import json
+import os
+import random
+import sys
+from html import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+WORDS = ("rust python postgres compiler kernel latency cache startup open source "
+         "database browser gpu llm network protocol security privacy design "
+         "scaling distributed systems memory parser search hardware linux").split()
+DOMAINS = ["github.com", "nytimes.com", "arstechnica.com", "lwn.net", "blog.example.org",
+           "en.wikipedia.org", "theverge.com", "acm.org", "substack.com", "youtube.com"]
+USERS = ["pg", "dang", "tptacek", "patio11", "jacquesm", "simonw", "rayiner", "jgrahamc"]
+
+def story_rows(rng, story_id, rank):
+    kind = rng.choices(['link', 'ask', 'job', 'show'], weights=[80, 8, 4, 8])[0]
+    title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 10))).capitalize()
+    if rng.random() < 0.1:
+        title += ' & "quotes" – ünïcode'
+    if kind == 'ask':
+        title = 'Ask HN: ' + title + '?'
+    elif kind == 'show':
+        title = 'Show HN: ' + title
+
+    if kind in ('ask',):
+        url, sitebit = f"item?id={story_id}", ""
+    else:
+        domain = rng.choice(DOMAINS)
+        url = f"https://{'www.' if rng.random() < 0.3 else ''}{domain}/{story_id}/{title.split()[0].lower()}"
+        sitebit = (f'<span class="sitebit comhead"> (<a href="from?site={domain}">'
+                   f'<span class="sitestr">{domain}</span></a>)</span>')
+
+    athing = (
+        f'<tr class="athing submission" id="{story_id}">\n'
+        f'      <td align="right" valign="top" class="title"><span class="rank">{rank}.</span></td>'
+        f'      <td valign="top" class="votelinks"><center><a id="up_{story_id}" '
+        f'href="vote?id={story_id}&amp;how=up&amp;goto=news"><div class="votearrow" title="upvote"></div></a></center></td>'
+        f'<td class="title"><span class="titleline"><a href="{escape(url)}">{escape(title, quote=False)}</a>{sitebit}</span></td></tr>\n'
+    )
+
+    hours = rng.randint(1, 23)
+    age = (f'<span class="age" title="2024-08-12T10:00:00 1723456800">'
+           f'<a href="item?id={story_id}">{hours} hour{"s" if hours > 1 else ""} ago</a></span>')
+    if kind == 'job':
+        subline = f'{age} | <a href="hide?id={story_id}&amp;goto=news">hide</a>'
+    else:
+        points = rng.randint(1, 2000)
+        comments = rng.choice([0, 1, rng.randint(2, 900)])
+        comment_text = 'discuss' if comments == 0 else (
+            '1&nbsp;comment' if comments == 1 else f'{comments}&nbsp;comments')
+        subline = (f'<span class="score" id="score_{story_id}">{points} points</span> by '
+                   f'<a href="user?id={rng.choice(USERS)}" class="hnuser">{rng.choice(USERS)}</a> {age} '
+                   f'<span id="unv_{story_id}"></span> | <a href="hide?id={story_id}&amp;goto=news">hide</a> | '
+                   f'<a href="item?id={story_id}">{comment_text}</a>')
+    subtext = (f'<tr><td colspan="2"></td><td class="subtext"><span class="subline">\n'
+               f'          {subline}\n        </span>\n              </td></tr>\n'
+               f'      <tr class="spacer" style="height:5px"></tr>\n')
+    return athing + subtext
+
+def synthetic_page(seed, stories=30, first_rank=1):
+    rng = random.Random(seed)
+    rows = ''.join(story_rows(rng, 41000000 + seed * 1000 + i, first_rank + i) for i in range(stories))
+    return f"""<html lang="en" op="news"><head><meta name="referrer" content="origin">
+<link rel="stylesheet" type="text/css" href="news.css"><title>Hacker News</title></head><body>
+<center><table id="hnmain" border="0" cellpadding="0" cellspacing="0" width="85%" bgcolor="#f6f6ef">
+<tr><td bgcolor="#ff6600"><table border="0" cellpadding="0" cellspacing="0" width="100%" style="padding:2px">
+<tr><td><span class="pagetop"><b class="hnname"><a href="news">Hacker News</a></b>
+<a href="newest">new</a> | <a href="front">past</a> | <a href="newcomments">comments</a></span></td></tr></table></td></tr>
+<tr id="pagespace" title="" style="height:10px"></tr><tr><td><table border="0" cellpadding="0" cellspacing="0">
+{rows}<tr class="morespace" style="height:10px"></tr><tr><td colspan="2"></td>
+<td class="title"><a href="?p=2" class="morelink" rel="next">More</a></td></tr>
+</table></td></tr></table></center></body></html>
+"""
+
+def comment_rows(rng, story_id, first_id, count, max_depth=12):
+    """comtr rows of a random thread: each comment replies at most one level deeper"""
+    rows = []
+    depth = 0
+    for i in range(count):
+        comment_id = first_id + i
+        depth = rng.randint(0, min(depth + 1, max_depth)) if i else 0
+        if rng.random() < 0.03:
+            head, body = '[deleted]', '<div class="comment"><span class="commtext">[deleted]</span></div>'
+        else:
+            user = rng.choice(USERS)
+            hours = rng.randint(1, 23)
+            head = (f'<a href="user?id={user}" class="hnuser">{user}</a> '
+                    f'<span class="age" title="2024-08-12T10:00:00 1723456800"><a href="item?id={comment_id}">'
+                    f'{hours} hour{"s" if hours > 1 else ""} ago</a></span> <span id="unv_{comment_id}"></span>')
+            paragraphs = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+                          for _ in range(rng.randint(1, 3))]
+            text = paragraphs[0].capitalize() + ''.join(f'<p>{p}' for p in paragraphs[1:])
+            if rng.random() < 0.1:
+                text += f'<p><a href="https://{rng.choice(DOMAINS)}/{comment_id}" rel="nofollow">link</a>'
+            if rng.random() < 0.05:
+                text += '<p><pre><code>  fn main() { println!("&lt;hi&gt;"); }\n</code></pre>'
+            if rng.random() < 0.05:
+                text += '<p><i>&gt; quoted</i> &amp; <script>alert(1)</script>'
+            body = (f'<div class="comment"><div class="commtext c00">{text}</div>'
+                    f'<div class="reply"><p><font size="1"><u><a href="reply?id={comment_id}'
+                    f'&amp;goto=item%3Fid%3D{story_id}%23{comment_id}">reply</a></u></font></p></div></div>')
+        rows.append(
+            f'<tr class="athing comtr" id="{comment_id}"><td><table border="0"><tr>'
+            f'<td class="ind" indent="{depth}"><img src="s.gif" height="1" width="{depth * 40}"></td>'
+            f'<td valign="top" class="votelinks"><center><a id="up_{comment_id}" href="vote?id={comment_id}&amp;how=up">'
+            f'<div class="votearrow" title="upvote"></div></a></center></td><td class="default">'
+            f'<div style="margin-top:2px; margin-bottom:-10px;"><span class="comhead">{head}'
+            f'<span class="navs"> | <a class="togg clicky" id="{comment_id}" n="1" href="javascript:void(0)">[&ndash;]</a>'
+            f'</span></span></div><br>{body}</td></tr></table></td></tr>\n')
+    return ''.join(rows)
+
+def synthetic_item_page(seed, comments=200, first_id=None, more=False):
+    """One page of a story's item page with a synthetic comment thread"""
+    rng = random.Random(seed)
+    story_id = 42000000 + seed * 100000
+    more_link = (f'<tr class="morespace" style="height:10px"></tr><tr><td><a href="item?id={story_id}&amp;p=2" '
+                 f'class="morelink" rel="next">More</a></td></tr>') if more else ''
+    return f"""<html lang="en" op="item"><head><title>Thread {seed} | Hacker News</title></head><body>
+<center><table id="hnmain" border="0" cellpadding="0" cellspacing="0" width="85%" bgcolor="#f6f6ef">
+<tr id="pagespace" title="Thread {seed}" style="height:10px"></tr><tr><td>
+<table class="fatitem" border="0"><tr class="athing submission" id="{story_id}"><td class="title">
+<span class="titleline"><a href="https://example.com/{seed}">Thread {seed} &amp; friends</a></span></td></tr>
+<tr><td class="subtext"><span class="subline"><a href="user?id=pg" class="hnuser">pg</a></span></td></tr></table>
+<br><br><table border="0" class="comment-tree">
+{comment_rows(rng, story_id, first_id or story_id + 1, comments)}</table>
+{more_link}</td></tr></table></center></body></html>
+"""
+
+# Feed -> first fixture page, so each feed lists different stories
+FEED_OFFSETS = {'news': 0, 'newest': 1, 'ask': 2, 'show': 3, 'jobs': 4}
+API_LISTS = {'news': 'topstories', 'newest': 'newstories', 'ask': 'askstories',
+             'show': 'showstories', 'jobs': 'jobstories'}
+
+def fixture_number(feed, page, pages=5):
+    """Which frontpage_N.html fixture stands in for one page of a feed"""
+    return (FEED_OFFSETS.get(feed, 0) + page - 1) % pages + 1
+
+def synthetic_api_snapshot(pages=5):
+    """The listing fixtures as JSON API data: {'recorded_at', 'lists', 'items'}"""
+    import time
+    from data_parser import parse_stories
+    recorded_at = int(time.time())
+    parsed = {}
+    for page in range(1, pages + 1):
+        with open(os.path.join(FIXTURE_DIR, f'frontpage_{page}.html'), encoding='utf-8') as f:
+            parsed[page] = parse_stories(f.read())
+
+    items, lists = {}, {}
+    for feed, list_name in API_LISTS.items():
+        ids = []
+        for page in range(1, pages + 1):
+            for story in parsed[fixture_number(feed, page, pages)]:
+                if int(story.id) not in ids:
+                    ids.append(int(story.id))
+                if story.id in items:
+                    continue
+                age = int(story.time_ago.split()[0]) * 3600 if story.time_ago[:1].isdigit() else 0
+                item = {'id': int(story.id), 'time': recorded_at - age, 'title': story.title, 'kids': []}
+                if not story.author:
+                    item['type'] = 'job'
+                else:
+                    item.update(type='story', by=story.author, score=story.points,
+                                descendants=story.comment_count)
+                if story.url.startswith(('http://', 'https://')):
+                    item['url'] = story.url
+                items[story.id] = item
+        lists[list_name] = ids
+    return {'recorded_at': recorded_at, 'lists': lists, 'items': items}
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Build HN listing page fixtures')
+    arg_parser.add_argument('--pages', type=int, default=5, help='number of synthetic pages')
+    arg_parser.add_argument('--fetch', action='store_true', help='save live HN pages instead')
+    args = arg_parser.parse_args()
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    if args.fetch:
+        from scraper import get_hacker_news_html
+        html_content = get_hacker_news_html()
+        if not html_content:
+            sys.exit("Could not fetch the live front page")
+        pages = {'live_frontpage.html': html_content}
+    else:
+        pages = {f'frontpage_{i + 1}.html': synthetic_page(i + 1, first_rank=i * 30 + 1)
+                 for i in range(args.pages)}
+        pages['item_1.html'] = synthetic_item_page(1)
+
+    for name, content in pages.items():
+        with open(os.path.join(FIXTURE_DIR, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"Wrote {name} ({len(content)} bytes)")
+
+    if not args.fetch:
+        # Built from the listing pages just written
+        with open(os.path.join(FIXTURE_DIR, 'api_snapshot.json'), 'w', encoding='utf-8') as f:
+            json.dump(synthetic_api_snapshot(args.pages), f, ensure_ascii=False)
+        print("Wrote api_snapshot.json")
+
+if __name__ == '__main__':
+    main()
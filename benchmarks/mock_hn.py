@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# Local stand-in for news.ycombinator.com and the HN JSON API
+#
+# Usage:
+#   python benchmarks/mock_hn.py [--port N] [--latency MS] [--churn N] [--churn-interval S]
+#   python benchmarks/mock_hn.py --record [--count N]
+#
+# Serves the listing fixtures (/news, /newest, ... with ?p=N), the comment
+# thread fixture (/item) and the recorded API data in
+# fixtures/api_snapshot.json (/v0/topstories.json, /v0/item/<id>.json,
+# /v0/updates.json, ...). Point the app at it with
+#   HN_BASE_URL=http://127.0.0.1:PORT/ HN_API_BASE_URL=http://127.0.0.1:PORT/v0/
+# --latency adds a delay to every response, standing in for the round trip
+# to the real servers. --churn bumps the score of N random items every
+# --churn-interval seconds and lists them in updates.json, as HN does.
+# Item times are shifted by the age of the recording so stories stay as
+# fresh as when they were recorded.
+# --record saves the live API's lists and their first --count items instead.
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from make_fixtures import API_LISTS, FEED_OFFSETS, FIXTURE_DIR, fixture_number
+
+SNAPSHOT = os.path.join(FIXTURE_DIR, 'api_snapshot.json')
+ITEM_PATH_RE = re.compile(r'^/v0/item/(\d+)\.json$')
+
+class MockHN:
+    """Fixture pages and API data, with optional score churn"""
+
+    def __init__(self, snapshot_path=SNAPSHOT):
+        with open(snapshot_path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        shift = int(time.time()) - snapshot.get('recorded_at', int(time.time()))
+        self.items = {int(item_id): dict(item, time=item.get('time', 0) + shift)
+                      for item_id, item in snapshot['items'].items()}
+        self.lists = snapshot['lists']
+        self.updates = []
+        self.pages = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def page(self, name):
+        """Bytes of a fixture file, read once"""
+        if name not in self.pages:
+            with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+                self.pages[name] = f.read()
+        return self.pages[name]
+
+    def churn(self, count):
+        """Bump the score and comments of count random stories"""
+        with self._lock:
+            stories = [item for item in self.items.values() if item.get('type') == 'story']
+            changed = self._rng.sample(stories, min(count, len(stories)))
+            for item in changed:
+                item['score'] = item.get('score', 0) + self._rng.randint(1, 20)
+                item['descendants'] = item.get('descendants', 0) + self._rng.randint(0, 5)
+            self.updates = [item['id'] for item in changed]
+
+    def api(self, path):
+        """JSON-serializable body for an API path, or None for 404"""
+        with self._lock:
+            match = ITEM_PATH_RE.match(path)
+            if match:
+                item = self.items.get(int(match.group(1)))
+                return dict(item) if item is not None else None
+            name = path[len('/v0/'):-len('.json')] if path.startswith('/v0/') and path.endswith('.json') else ''
+            if name == 'updates':
+                return {'items': list(self.updates), 'profiles': []}
+            return self.lists.get(name)
+
+def make_handler(mock, latency=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, as the real servers do
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            mock.requests += 1
+            parts = urlsplit(self.path)
+            if parts.path.startswith('/v0/'):
+                data = mock.api(parts.path)
+                if data is None:
+                    return self.send_body(404, b'null', 'application/json')
+                return self.send_body(200, json.dumps(data).encode('utf-8'), 'application/json')
+            feed = parts.path.strip('/')
+            if feed == 'item':
+                return self.send_body(200, mock.page('item_1.html'), 'text/html; charset=utf-8')
+            page = int(parse_qs(parts.query).get('p', ['1'])[0])
+            if feed not in FEED_OFFSETS:
+                feed = 'news'
+            self.send_body(200, mock.page(f"frontpage_{fixture_number(feed, page)}.html"),
+                           'text/html; charset=utf-8')
+
+        def send_body(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_server(port=0, latency=0.0, churn=0, churn_interval=5.0, snapshot_path=SNAPSHOT):
+    """Serve in background threads; returns (server, mock). Stop with server.shutdown()"""
+    mock = MockHN(snapshot_path)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(mock, latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='mock-hn', daemon=True).start()
+    if churn:
+        def run_churn():
+            while True:
+                time.sleep(churn_interval)
+                mock.churn(churn)
+        threading.Thread(target=run_churn, name='mock-hn-churn', daemon=True).start()
+    return server, mock
+
+def record(count):
+    """Save the live API's id lists and their first count items as the snapshot"""
+    from hn_api import fetch_json
+    snapshot = {'recorded_at': int(time.time()), 'lists': {}, 'items': {}}
+    for list_name in API_LISTS.values():
+        ids = fetch_json(f"{list_name}.json")
+        if ids is None:
+            sys.exit(f"Could not fetch {list_name}")
+        snapshot['lists'][list_name] = ids[:count]
+        for item_id in ids[:count]:
+            if str(item_id) not in snapshot['items']:
+                item = fetch_json(f"item/{item_id}.json")
+                if item is not None:
+                    snapshot['items'][str(item_id)] = item
+    with open(SNAPSHOT, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    print(f"Recorded {len(snapshot['items'])} items to {SNAPSHOT}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve HN fixtures and recorded API data locally')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds added to every response')
+    parser.add_argument('--churn', type=int, default=0, help='stories changed every --churn-interval')
+    parser.add_argument('--churn-interval', type=float, default=5)
+    parser.add_argument('--record', action='store_true', help='record the live API instead of serving')
+    parser.add_argument('--count', type=int, default=150, help='--record: ids kept per list')
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.count)
+        return
+    server, _ = start_server(args.port, args.latency / 1000, args.churn, args.churn_interval)
+    print(f"Serving on http://127.0.0.1:{server.server_port}/ (API under /v0/)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+# Comment threads: compact flat trees, an LRU cache and paged rendering
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Set
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from data_parser import ItemPageParser
+from scraper import stream_item_page
+
+logger = logging.getLogger(__name__)
+
+class CommentTree:
+    """
+    One story's comment thread as parallel arrays in page (pre-order) order
+
+    Comment i has parent index parents[i] (-1 for top level), depth
+    depths[i], and its body is text[offsets[i]:offsets[i + 1]] in one shared
+    string. Authors and ages are indexes into a table of distinct strings.
+    ends[i] is the index just past comment i's last descendant, so a
+    subtree is the slice i:ends[i], and skipping or counting one is O(1).
+    A comment costs about 23 bytes of arrays plus its text, instead of an
+    object per comment.
+    """
+    __slots__ = ('story_id', 'title', 'ids', 'parents', 'depths', 'authors', 'ages',
+                 'offsets', 'ends', 'strings', 'text', 'fetched_at')
+
+    def __init__(self, story_id: str, title: Optional[str] = None):
+        self.story_id = story_id
+        self.title = title
+        self.ids = array('I')
+        self.parents = array('i')
+        self.depths = array('H')
+        self.authors = array('I')
+        self.ages = array('I')
+        self.offsets = array('I', [0])
+        self.ends = array('I')
+        self.strings: List[str] = []
+        self.text = ''
+        self.fetched_at = time.time()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def body(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def descendants(self, index: int) -> int:
+        return self.ends[index] - index - 1
+
+    def find(self, comment_id: int) -> Optional[int]:
+        """Index of a comment by id"""
+        try:
+            return self.ids.index(comment_id)
+        except ValueError:
+            return None
+
+    def page_starts(self, start: int, end: int, per_page: int) -> List[int]:
+        """
+        First index of every page of the slice start:end
+
+        Pages break between top-level subtrees where they can; a subtree
+        bigger than a page is split so no page exceeds per_page comments.
+        Only the top-level comments are visited.
+        """
+        starts = [start]
+        ends = self.ends
+        index = start
+        while index < end:
+            next_index = ends[index]
+            if next_index - starts[-1] > per_page:
+                if index > starts[-1]:
+                    starts.append(index)
+                while next_index - starts[-1] > per_page:
+                    starts.append(starts[-1] + per_page)
+            index = next_index
+        return starts
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays and text"""
+        arrays = (self.ids, self.parents, self.depths, self.authors, self.ages, self.offsets, self.ends)
+        return sum(column.itemsize * len(column) for column in arrays) + len(self.text)
+
+class CommentTreeBuilder:
+    """Appends parsed comments to a CommentTree, working out parents from depths"""
+
+    def __init__(self, story_id: str):
+        self.tree = CommentTree(story_id)
+        self._strings: Dict[str, int] = {}
+        self._chunks: List[str] = []
+        self._length = 0
+        self._stack: List[int] = []  # Index of the latest comment at each depth
+
+    def _intern(self, value: str) -> int:
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self.tree.strings)
+            self.tree.strings.append(value)
+        return index
+
+    def add(self, comment_id: int, depth: int, author: str, age: str, html: str):
+        tree = self.tree
+        # A reply can't be more than one level below the comment before it
+        depth = min(depth, len(self._stack))
+        del self._stack[depth:]
+        tree.parents.append(self._stack[-1] if self._stack else -1)
+        self._stack.append(len(tree.ids))
+        tree.ids.append(comment_id)
+        tree.depths.append(depth)
+        tree.authors.append(self._intern(author))
+        tree.ages.append(self._intern(age))
+        self._chunks.append(html)
+        self._length += len(html)
+        tree.offsets.append(self._length)
+
+    def build(self, title: Optional[str] = None) -> CommentTree:
+        tree = self.tree
+        tree.title = title
+        tree.text = ''.join(self._chunks)
+        self._chunks = []
+        # Children come after their parent, so one backwards pass gives every subtree end
+        ends = array('I', range(1, len(tree.ids) + 1))
+        parents = tree.parents
+        for index in range(len(ends) - 1, -1, -1):
+            parent = parents[index]
+            if parent >= 0 and ends[index] > ends[parent]:
+                ends[parent] = ends[index]
+        tree.ends = ends
+        tree.fetched_at = time.time()
+        return tree
+
+def load_comment_tree(story_id: str, max_pages: int = 5) -> Optional[CommentTree]:
+    """
+    Fetch and stream-parse a story's item pages into a CommentTree
+
+    Follows HN's "More" link for up to max_pages pages. Returns None if the
+    first page can't be fetched; a later page failing keeps what was read.
+    """
+    builder = CommentTreeBuilder(story_id)
+    title = None
+    started = time.time()
+    for page in range(1, max_pages + 1):
+        parser = ItemPageParser()
+        try:
+            for chunk in stream_item_page(story_id, page):
+                for comment in parser.feed(chunk):
+                    builder.add(*comment)
+            for comment in parser.close():
+                builder.add(*comment)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching comments for {story_id} (page {page}): {e}")
+            if page == 1:
+                return None
+            break
+        title = title or parser.title
+        if not parser.has_more:
+            break
+    tree = builder.build(title)
+    logger.info(f"Parsed {len(tree)} comments for story {story_id} in {time.time() - started:.2f}s")
+    return tree
+
+class CommentView(NamedTuple):
+    """One rendered comment row"""
+    id: int
+    depth: int
+    author: str
+    age: str
+    html: str
+    descendants: int
+    collapsed: bool
+    more: bool  # Cut off at the depth limit; link to the subtree instead
+
+@dataclass
+class ThreadPage:
+    """One page of a thread, ready for the template"""
+    story_id: str
+    rows: List[CommentView]
+    page: int
+    page_count: int
+    total: int
+    title: Optional[str] = None
+    root: Optional[int] = None
+    collapsed: Set[int] = field(default_factory=set)
+
+    def toggle(self, comment_id: Optional[int] = None) -> str:
+        """?collapsed= value for this page, with comment_id flipped if given"""
+        collapsed = self.collapsed ^ {comment_id} if comment_id is not None else self.collapsed
+        return ','.join(str(c) for c in sorted(collapsed))
+
+def render_page(tree: CommentTree, page: int = 1, per_page: int = 100, root: Optional[int] = None,
+                collapsed: Set[int] = frozenset(), max_depth: int = 10) -> Optional[ThreadPage]:
+    """
+    Build the rows of one page of a thread, or of the subtree under root
+
+    Work is bounded by per_page: collapsed subtrees and replies nested
+    deeper than max_depth below the page's base are skipped in O(1) each
+    and shown as a single row with their reply count. Returns None if root
+    isn't in the tree.
+    """
+    if root is None:
+        start, end, base = 0, len(tree), 0
+    else:
+        start = tree.find(root)
+        if start is None:
+            return None
+        end, base = tree.ends[start], tree.depths[start]
+
+    starts = tree.page_starts(start, end, per_page) if end > start else [start]
+    page = min(max(page, 1), len(starts))
+    index = starts[page - 1]
+    stop = starts[page] if page < len(starts) else end
+
+    ids, depths, ends, strings = tree.ids, tree.depths, tree.ends, tree.strings
+    rows = []
+    while index < stop:
+        depth = depths[index] - base
+        folded = ids[index] in collapsed
+        too_deep = depth > max_depth
+        rows.append(CommentView(
+            id=ids[index], depth=depth, author=strings[tree.authors[index]],
+            age=strings[tree.ages[index]], html='' if too_deep else tree.body(index),
+            descendants=tree.descendants(index), collapsed=folded, more=too_deep))
+        index = ends[index] if folded or too_deep else index + 1
+
+    return ThreadPage(story_id=tree.story_id, rows=rows, page=page, page_count=len(starts),
+                      total=end - start, title=tree.title, root=root, collapsed=set(collapsed))
+
+class CommentCache:
+    """
+    Parsed comment trees per story, least recently used evicted first
+
+    The cache is bounded by the total number of comments held as well as
+    the number of trees, so a few giant threads can't crowd out memory.
+    A tree older than ttl is still served while one background reload
+    replaces it. A missing tree is loaded once in the background however
+    many requests ask for it at the same time, and each request waits at
+    most `timeout` for it, so a slow upstream can't hold a page open.
+    Loads run on a pool of max_loads threads and no more than max_loads
+    are in flight, so crawling ids can't pile up threads or upstream
+    requests; a story whose comments couldn't be fetched isn't tried again
+    for missing_ttl seconds.
+    """
+
+    def __init__(self, loader=load_comment_tree, max_trees: int = 200,
+                 max_comments: int = 200000, ttl: float = 120,
+                 max_loads: int = 4, missing_ttl: float = 60):
+        self._loader = loader
+        self.max_trees = max_trees
+        self.max_comments = max_comments
+        self.ttl = ttl
+        self.max_loads = max_loads
+        self.missing_ttl = missing_ttl
+        self._trees: OrderedDict = OrderedDict()
+        self._comment_total = 0
+        self._loading: Dict[str, threading.Event] = {}
+        self._failed: OrderedDict = OrderedDict()  # story id -> time its load failed
+        self._executor = ThreadPoolExecutor(max_workers=max_loads, thread_name_prefix='comment-fetch')
+        self._lock = threading.Lock()
+
+    def _store(self, tree: CommentTree):
+        with self._lock:
+            old = self._trees.pop(tree.story_id, None)
+            if old is not None:
+                self._comment_total -= len(old)
+            self._trees[tree.story_id] = tree
+            self._comment_total += len(tree)
+            # Always keep the tree just loaded
+            while len(self._trees) > 1 and (len(self._trees) > self.max_trees
+                                            or self._comment_total > self.max_comments):
+                _, evicted = self._trees.popitem(last=False)
+                self._comment_total -= len(evicted)
+
+    def _load(self, story_id: str, event: threading.Event):
+        tree = None
+        try:
+            tree = self._loader(story_id)
+            if tree is not None:
+                self._store(tree)
+        except Exception as e:
+            logger.error(f"Comment load failed for {story_id}: {e}")
+        finally:
+            with self._lock:
+                self._loading.pop(story_id, None)
+                if tree is None:
+                    self._failed[story_id] = time.time()
+                    self._failed.move_to_end(story_id)
+                    while len(self._failed) > self.max_trees:
+                        self._failed.popitem(last=False)
+                else:
+                    self._failed.pop(story_id, None)
+            event.set()
+
+    def _recently_failed(self, story_id: str) -> bool:
+        failed_at = self._failed.get(story_id)
+        return failed_at is not None and time.time() - failed_at < self.missing_ttl
+
+    def get(self, story_id: str, timeout: float = 5) -> Optional[CommentTree]:
+        """Comment tree of a story, loading it if needed; None if it isn't available in time"""
+        with self._lock:
+            tree = self._trees.get(story_id)
+            if tree is not None:
+                self._trees.move_to_end(story_id)
+            event = self._loading.get(story_id)
+            if (event is None and (tree is None or time.time() - tree.fetched_at > self.ttl)
+                    and not self._recently_failed(story_id)):
+                if len(self._loading) >= self.max_loads:
+                    logger.warning(f"Comment loads at capacity, not fetching {story_id}")
+                else:
+                    event = self._loading[story_id] = threading.Event()
+                    self._executor.submit(self._load, story_id, event)
+            if tree is not None or event is None:
+                return tree
+
+        event.wait(timeout)
+        with self._lock:
+            return self._trees.get(story_id)
+
+    def loading(self, story_id: str) -> bool:
+        """Whether a load of this story's comments is still in flight"""
+        with self._lock:
+            return story_id in self._loading
+
+    def stats(self) -> dict:
+        """Cached trees, comments and approximate memory"""
+        with self._lock:
+            trees = list(self._trees.values())
+        return {'trees': len(trees), 'comments': sum(len(tree) for tree in trees),
+                'bytes': sum(tree.nbytes() for tree in trees)}
+
+# Global comment cache
+comment_cache = CommentCache(
+    loader=lambda story_id: load_comment_tree(story_id, int(os.environ.get('COMMENT_MAX_PAGES', 5))),
+    max_trees=int(os.environ.get('COMMENT_CACHE_MAX_TREES', 200)),
+    max_comments=int(os.environ.get('COMMENT_CACHE_MAX_COMMENTS', 200000)),
+    ttl=float(os.environ.get('COMMENT_CACHE_TTL', 120)),
+    max_loads=int(os.environ.get('COMMENT_FETCH_WORKERS', 4)))
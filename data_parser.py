@@ -1,47 +1,98 @@
 # HTML parsing and data extraction
 from bs4 import BeautifulSoup
+from html import escape
 from urllib.parse import urlparse
-from models import Story
+from metrics import stage_latency
+from models import ABSOLUTE_URL_RE, Story, UserProfile
 from scraper import get_hacker_news_html
 import re
+import os
 import logging
+import time
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml is optional, bs4 is always available
+    etree = lxml_html = None
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Numbers in score and comment link text, e.g. "123 points", "45 comments"
+NUMBER_RE = re.compile(r'(\d+)')
+
 def parse_html_data():
     """Parse the Hacker News HTML and extract story information"""
     html_content = get_hacker_news_html()
     if not html_content:
         logger.error("No HTML content to parse.")
         return []
+    return parse_stories(html_content)
+
+def merge_feed_pages(page_stories):
+    """
+    Merge the parsed pages of one feed into a single story list
+
+    Stories that moved between pages while they were being fetched are kept
+    only once, at their first position.
+    """
+    stories = []
+    seen = set()
+    for page in page_stories:
+        for story in page:
+            if story.id not in seen:
+                seen.add(story.id)
+                stories.append(story)
+    return stories
+
+def parse_stories(html_content, backend=None):
+    """
+    Parse story rows out of a Hacker News listing page
+
+    Args:
+        html_content: Raw HTML of a front page or feed page
+        backend: Parser backend name (default: PARSER_BACKEND)
+
+    Returns:
+        List of valid Story objects in page order
+    """
+    backend = backend or PARSER_BACKEND
+    parser = PARSER_BACKENDS.get(backend)
+    if parser is None:
+        logger.warning(f"Unknown parser backend '{backend}', falling back to bs4")
+        parser = parse_stories_bs4
 
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        stories = []
-        
-        # Find all story rows - they have class "athing submission"
-        story_rows = soup.find_all('tr', class_='athing submission')
-        
-        for story_row in story_rows:
-            try:
-                story = extract_story_info(story_row)
-                if story and story.validate():
-                    stories.append(story)
-                else:
-                    logger.warning(f"Invalid story data extracted: {story}")
-            except Exception as e:
-                logger.error(f"Error extracting story from row: {e}")
-                continue
-        
-        logger.info(f"Successfully parsed {len(stories)} stories")
+        with stage_latency.time('parse'):
+            stories = parser(html_content)
+        logger.info(f"Successfully parsed {len(stories)} stories ({backend})")
         return stories
-        
     except Exception as e:
         logger.error(f"Error parsing HTML content: {e}")
         return []
 
+def parse_stories_bs4(html_content):
+    """Parse stories with BeautifulSoup's pure-Python html.parser"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    stories = []
+
+    # Find all story rows - they have class "athing submission"
+    story_rows = soup.find_all('tr', class_='athing submission')
+
+    for story_row in story_rows:
+        try:
+            story = extract_story_info(story_row)
+            if story and story.validate():
+                stories.append(story)
+            else:
+                logger.warning(f"Invalid story data extracted: {story}")
+        except Exception as e:
+            logger.error(f"Error extracting story from row: {e}")
+            continue
+
+    return stories
+
 def extract_story_info(story_row):
     """Extract individual story details from HTML element"""
     try:
@@ -93,7 +144,7 @@ def extract_story_info(story_row):
         score_span = subtext.find('span', class_='score')
         if score_span:
             score_text = score_span.get_text(strip=True)
-            points_match = re.search(r'(\d+)', score_text)
+            points_match = NUMBER_RE.search(score_text)
             if points_match:
                 points = int(points_match.group(1))
         
@@ -122,7 +173,7 @@ def extract_story_info(story_row):
             if 'comment' in link_text.lower() or link_text == 'discuss':
                 comment_text = link_text
                 # Extract number from comment text
-                comment_match = re.search(r'(\d+)', link_text)
+                comment_match = NUMBER_RE.search(link_text)
                 if comment_match:
                     comment_count = int(comment_match.group(1))
                 break
@@ -146,6 +197,281 @@ def extract_story_info(story_row):
         logger.error(f"Error extracting story info: {e}")
         return None
 
+def _class_test(name):
+    """XPath predicate matching one token of the class attribute, like bs4's class_"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+if etree is not None:
+    # Compiled once; each story row then costs a handful of C-level lookups
+    _XP_STORY_ROWS = etree.XPath(f'//tr[{_class_test("athing")} and {_class_test("submission")}]')
+    _XP_RANK = etree.XPath(f'.//span[{_class_test("rank")}]')
+    _XP_TITLELINE = etree.XPath(f'.//span[{_class_test("titleline")}]')
+    _XP_TITLE_LINK = etree.XPath('.//a')
+    _XP_SITESTR = etree.XPath(f'.//span[{_class_test("sitebit")}]//span[{_class_test("sitestr")}]')
+    _XP_NEXT_ROW = etree.XPath('following-sibling::tr[1]')
+    _XP_SUBTEXT = etree.XPath(f'.//td[{_class_test("subtext")}]')
+    _XP_SCORE = etree.XPath(f'.//span[{_class_test("score")}]')
+    _XP_AUTHOR = etree.XPath(f'.//a[{_class_test("hnuser")}]')
+    _XP_AGE_LINK = etree.XPath(f'.//span[{_class_test("age")}]//a')
+    _XP_LINKS = etree.XPath('.//a')
+
+def _text(element):
+    """Equivalent of bs4's get_text(strip=True) for an lxml element"""
+    return ''.join(part.strip() for part in element.itertext())
+
+def _first(xpath, element):
+    matches = xpath(element)
+    return matches[0] if matches else None
+
+def parse_stories_lxml(html_content):
+    """Parse stories with lxml, pairing each athing row with its subtext row in one pass"""
+    if lxml_html is None:
+        raise RuntimeError("lxml is not installed")
+
+    document = lxml_html.fromstring(html_content)
+    stories = []
+
+    for story_row in _XP_STORY_ROWS(document):
+        try:
+            story = extract_story_info_lxml(story_row)
+            if story and story.validate():
+                stories.append(story)
+            else:
+                logger.warning(f"Invalid story data extracted: {story}")
+        except Exception as e:
+            logger.error(f"Error extracting story from row: {e}")
+            continue
+
+    return stories
+
+def extract_story_info_lxml(story_row):
+    """Extract story details from an lxml athing row; mirrors extract_story_info"""
+    story_id = story_row.get('id', '')
+
+    rank = 0
+    rank_span = _first(_XP_RANK, story_row)
+    if rank_span is not None:
+        rank_text = _text(rank_span).replace('.', '')
+        rank = int(rank_text) if rank_text.isdigit() else 0
+
+    titleline = _first(_XP_TITLELINE, story_row)
+    if titleline is None:
+        return None
+    title_link = _first(_XP_TITLE_LINK, titleline)
+    if title_link is None:
+        return None
+
+    title = _text(title_link)
+    url = title_link.get('href', '').strip()
+
+    domain = ""
+    sitestr = _first(_XP_SITESTR, titleline)
+    if sitestr is not None:
+        domain = _text(sitestr)
+    if not domain and url:
+        domain = extract_domain(url)
+
+    subtext_row = _first(_XP_NEXT_ROW, story_row)
+    if subtext_row is None:
+        return None
+    subtext = _first(_XP_SUBTEXT, subtext_row)
+    if subtext is None:
+        return None
+
+    points = 0
+    score_span = _first(_XP_SCORE, subtext)
+    if score_span is not None:
+        points_match = NUMBER_RE.search(_text(score_span))
+        if points_match:
+            points = int(points_match.group(1))
+
+    author_link = _first(_XP_AUTHOR, subtext)
+    author = _text(author_link) if author_link is not None else ""
+
+    age_link = _first(_XP_AGE_LINK, subtext)
+    time_ago = _text(age_link) if age_link is not None else ""
+
+    comment_count = 0
+    for link in reversed(_XP_LINKS(subtext)):
+        link_text = _text(link)
+        if 'comment' in link_text.lower() or link_text == 'discuss':
+            comment_match = NUMBER_RE.search(link_text)
+            if comment_match:
+                comment_count = int(comment_match.group(1))
+            break
+
+    # Every value above is already clean, so skip Story's validation pass
+    return Story.from_parsed(
+        id=story_id.strip(),
+        rank=rank,
+        title=title,
+        url=url,
+        domain=domain,
+        points=points,
+        author=author,
+        time_ago=time_ago,
+        comment_count=comment_count
+    )
+
+# Markup kept in comment bodies; everything else is reduced to its text
+COMMENT_TAGS = {'p', 'i', 'em', 'b', 'strong', 'pre', 'code'}
+
+def comment_html(element):
+    """
+    Safe HTML of a comment body
+
+    Only COMMENT_TAGS and absolute http(s) links survive, every text node is
+    re-escaped, and reply links are dropped.
+    """
+    out = []
+
+    def walk(node):
+        if node.text:
+            out.append(escape(node.text, quote=False))
+        for child in node:
+            tag = child.tag if isinstance(child.tag, str) else None
+            if tag in ('script', 'style') or 'reply' in child.get('class', '').split():
+                pass
+            elif tag in COMMENT_TAGS:
+                out.append(f'<{tag}>')
+                walk(child)
+                out.append(f'</{tag}>')
+            elif tag == 'a' and child.get('href', '').startswith(('http://', 'https://')):
+                out.append(f'<a href="{escape(child.get("href"))}" rel="nofollow noreferrer">')
+                walk(child)
+                out.append('</a>')
+            elif tag is not None:
+                walk(child)
+            if child.tail:
+                out.append(escape(child.tail, quote=False))
+
+    walk(element)
+    return ''.join(out).strip()
+
+class ItemPageParser:
+    """
+    Incremental parser for the comment thread on an HN item page
+
+    Feed it the page in chunks as they arrive; feed() returns the comments
+    completed so far as (id, depth, author, age, html) tuples in page
+    order. Each comment row is dropped from the tree once it has been read,
+    so memory stays flat however long the thread is. After close(), title
+    holds the story title and has_more tells whether HN split the thread
+    onto another page.
+    """
+
+    def __init__(self):
+        if etree is None:
+            raise RuntimeError("lxml is not installed")
+        self._parser = etree.HTMLPullParser(events=('end',), tag=('tr', 'a'))
+        self.title = None
+        self.has_more = False
+
+    def feed(self, chunk):
+        self._parser.feed(chunk)
+        return self._read()
+
+    def close(self):
+        self._parser.close()
+        return self._read()
+
+    def _read(self):
+        comments = []
+        for _, element in self._parser.read_events():
+            classes = element.get('class', '').split()
+            if element.tag == 'a':
+                if 'morelink' in classes:
+                    self.has_more = True
+                continue
+            if 'comtr' in classes:
+                try:
+                    comments.append(self._extract(element))
+                except Exception as e:
+                    logger.error(f"Error extracting comment {element.get('id')}: {e}")
+                # Drop this row and every row before it
+                element.clear(keep_tail=True)
+                parent = element.getparent()
+                while element.getprevious() is not None:
+                    del parent[0]
+            elif 'submission' in classes and self.title is None:
+                titleline = _first(_XP_TITLELINE, element)
+                title_link = _first(_XP_TITLE_LINK, titleline) if titleline is not None else None
+                if title_link is not None:
+                    self.title = _text(title_link)
+        return comments
+
+    @staticmethod
+    def _extract(row):
+        # One walk over the row's elements; per-field XPath queries cost several times more here
+        indent = author = age = body = marker = None
+        for node in row.iter():
+            value = node.get('class')
+            if not value:
+                continue
+            classes = value.split()
+            if 'ind' in classes:
+                indent = node
+            elif 'hnuser' in classes:
+                author = _text(node)
+            elif 'age' in classes:
+                age_link = node.find('a')
+                age = _text(age_link) if age_link is not None else ''
+            elif 'commtext' in classes:
+                body = node
+                break
+            elif 'comment' in classes:
+                marker = node  # Deleted and flagged comments have no commtext, just a marker
+
+        depth = 0
+        if indent is not None:
+            value = indent.get('indent')
+            if value is None:
+                # Older markup only has a spacer image, 40px per level
+                image = indent.find('img')
+                value = int(image.get('width', 0)) // 40 if image is not None else 0
+            depth = int(value)
+        if body is None:
+            body = marker
+        return (int(row.get('id')), depth, author or '', age or '',
+                comment_html(body) if body is not None else '')
+
+def parse_user_profile(html_content, username):
+    """
+    Parse the label/value table of an HN user page into a UserProfile
+
+    Returns a profile with exists=False for HN's "No such user." page.
+    """
+    if lxml_html is None:
+        raise RuntimeError("lxml is not installed")
+    document = lxml_html.fromstring(html_content)
+    profile = UserProfile(username=username, exists=False)
+    for row in document.iter('tr'):
+        cells = [cell for cell in row if cell.tag == 'td']
+        if len(cells) != 2:
+            continue
+        label = _text(cells[0]).rstrip(':').lower()
+        value = cells[1]
+        if label == 'user':
+            profile.exists = True
+            profile.username = _text(value) or username
+            timestamp = value.get('timestamp', '')
+            profile.created_at = int(timestamp) if timestamp.isdigit() else None
+        elif label == 'created':
+            profile.created = _text(value)
+        elif label == 'karma':
+            karma = NUMBER_RE.search(_text(value).replace(',', ''))
+            profile.karma = int(karma.group(1)) if karma else 0
+        elif label == 'about':
+            profile.about = comment_html(value)
+    return profile
+
+# Available parser backends, selectable with the PARSER_BACKEND env var
+PARSER_BACKENDS = {'bs4': parse_stories_bs4}
+if lxml_html is not None:
+    PARSER_BACKENDS['lxml'] = parse_stories_lxml
+
+PARSER_BACKEND = os.environ.get('PARSER_BACKEND', 'lxml' if 'lxml' in PARSER_BACKENDS else 'bs4')
+
 def format_relative_time(time_string):
     """Convert timestamps to relative time format"""
     if not time_string:
@@ -169,19 +495,23 @@ def format_relative_time(time_string):
     
     return time_string
 
+def time_ago_from_timestamp(timestamp, now=None):
+    """HN-style relative time ("5 minutes ago", "1 day ago") for a Unix timestamp"""
+    seconds = max(0, int((now or time.time()) - timestamp))
+    for unit, size in (('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= size or unit == 'minute':
+            count = max(1, seconds // size)
+            return f"{count} {unit}{'s' if count != 1 else ''} ago"
+
 def extract_domain(url):
     """Extract domain from URL"""
     if not url:
         return ""
     try:
-        # Handle relative URLs
-        if url.startswith('/'):
+        # Relative links (item?id=, /item) point at HN itself
+        if not ABSOLUTE_URL_RE.match(url):
             return ""
         
-        # Handle URLs without protocol
-        if not url.startswith(('http://', 'https://')):
-            url = 'http://' + url
-        
         parsed = urlparse(url)
         domain = parsed.netloc
         
@@ -193,16 +523,3 @@ def extract_domain(url):
     except Exception as e:
         logger.error(f"Error extracting domain from URL {url}: {e}")
         return ""
-
-def get_cached_stories():
-    """Get cached stories to avoid re-parsing on every request"""
-    # Simple in-memory cache - in production, you might use Redis or similar
-    if not hasattr(get_cached_stories, '_cache'):
-        get_cached_stories._cache = parse_html_data()
-    return get_cached_stories._cache
-
-def refresh_story_cache():
-    """Refresh the story cache"""
-    if hasattr(get_cached_stories, '_cache'):
-        delattr(get_cached_stories, '_cache')
-    return get_cached_stories()
\ No newline at end of file
@@ -0,0 +1,233 @@
+# Historical story snapshots for /past
+from datetime import datetime, timezone
+from typing import List, Optional
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from models import Story
+
+logger = logging.getLogger(__name__)
+
+def day_of(timestamp: float) -> str:
+    """UTC calendar day (YYYY-MM-DD) a timestamp falls in"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d')
+
+class HistoryStore:
+    """
+    Append-only history of story snapshots in SQLite
+
+    Every recorded snapshot adds one row per story to snapshot_stories, and
+    a per-day rollup (daily_stories) keeps each story's best rank and
+    highest points and comment counts for that UTC day. The rollup is indexed
+    by (day, points), so a day's top stories come from an index range scan
+    however much history has piled up; snapshot_stories is indexed by story
+    id for per-story history.
+
+    record() only queues the snapshot. A single writer thread drains the
+    queue and writes everything waiting in one transaction, so refreshes and
+    requests never wait on disk. Like TranslationStore, the file runs in WAL
+    mode so readers aren't blocked by the writer.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.snapshots_written = 0
+
+    def _connect(self):
+        """
+        One connection per thread; sqlite3 connections aren't shareable
+
+        Nothing touches disk until the first connection, so importing the
+        global store doesn't create a database nobody uses.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            if self.path != ':memory:':
+                conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._create_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _create_schema(conn):
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                feed TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                day TEXT NOT NULL,
+                story_count INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_snapshots_day ON snapshots (day);
+
+            CREATE TABLE IF NOT EXISTS snapshot_stories (
+                snapshot_id INTEGER NOT NULL,
+                story_id TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                points INTEGER NOT NULL,
+                comment_count INTEGER NOT NULL,
+                PRIMARY KEY (snapshot_id, story_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_snapshot_stories_story ON snapshot_stories (story_id);
+
+            CREATE TABLE IF NOT EXISTS daily_stories (
+                day TEXT NOT NULL,
+                story_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                author TEXT NOT NULL,
+                points INTEGER NOT NULL,
+                comment_count INTEGER NOT NULL,
+                best_rank INTEGER NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (day, story_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_daily_stories_points ON daily_stories (day, points DESC);
+            CREATE INDEX IF NOT EXISTS idx_daily_stories_story ON daily_stories (story_id);
+            CREATE INDEX IF NOT EXISTS idx_daily_stories_domain ON daily_stories (domain, day);
+        ''')
+
+    def record(self, stories: List[Story], fetched_at: Optional[float] = None, feed: str = 'news'):
+        """Queue a snapshot for the writer thread; returns immediately"""
+        if not stories:
+            return
+        rows = [(story.id, story.rank, story.title, story.url, story.domain.lower(), story.author,
+                 story.points, story.comment_count) for story in stories]
+        self._pending.put((feed, fetched_at or time.time(), rows))
+        self._ensure_writer()
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            # Let a burst of refreshes (one per feed) land in the same transaction
+            time.sleep(self.flush_interval)
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} snapshots to history: {e}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def _write(self, batch):
+        conn = self._connect()
+        conn.execute('BEGIN')
+        try:
+            for feed, fetched_at, rows in batch:
+                day = day_of(fetched_at)
+                snapshot_id = conn.execute(
+                    'INSERT INTO snapshots (feed, fetched_at, day, story_count) VALUES (?, ?, ?, ?)',
+                    (feed, fetched_at, day, len(rows))).lastrowid
+                conn.executemany(
+                    'INSERT OR REPLACE INTO snapshot_stories (snapshot_id, story_id, rank, points, comment_count) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    [(snapshot_id, row[0], row[1], row[6], row[7]) for row in rows])
+                if feed != 'news':
+                    continue
+                # Only the front page decides what was "top" on a day
+                conn.executemany('''
+                    INSERT INTO daily_stories (day, story_id, title, url, domain, author, points,
+                                               comment_count, best_rank, first_seen, last_seen)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (day, story_id) DO UPDATE SET
+                        title = excluded.title,
+                        url = excluded.url,
+                        domain = excluded.domain,
+                        points = MAX(points, excluded.points),
+                        comment_count = MAX(comment_count, excluded.comment_count),
+                        best_rank = MIN(best_rank, excluded.best_rank),
+                        last_seen = excluded.last_seen
+                ''', [(day, row[0], row[2], row[3], row[4], row[5], row[6], row[7], row[1],
+                       fetched_at, fetched_at) for row in rows])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self.snapshots_written += len(batch)
+        logger.info(f"Wrote {len(batch)} snapshots to history")
+
+    def flush(self):
+        """Block until every queued snapshot has been written"""
+        self._pending.join()
+
+    def top_stories(self, day: str, limit: int = 30) -> List[Story]:
+        """Highest-scoring front page stories of a UTC day, ranked 1..limit"""
+        try:
+            rows = self._connect().execute(
+                'SELECT story_id, title, url, domain, author, points, comment_count FROM daily_stories '
+                'WHERE day = ? ORDER BY points DESC LIMIT ?', (day, limit)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"History read failed: {e}")
+            return []
+        return [Story.from_parsed(id=row[0], rank=rank, title=row[1], url=row[2], domain=row[3],
+                                  points=row[5], author=row[4], time_ago=day,
+                                  comment_count=row[6])
+                for rank, row in enumerate(rows, start=1)]
+
+    def iter_stories(self, batch_size: int = 1000):
+        """Every story ever on the front page with its best points, newest sighting last"""
+        cursor = self._connect().execute(
+            'SELECT story_id, title, url, domain, author, MAX(points), MAX(comment_count), MAX(last_seen) '
+            'FROM daily_stories GROUP BY story_id ORDER BY MAX(last_seen)')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield (Story.from_parsed(id=row[0], rank=0, title=row[1], url=row[2], domain=row[3],
+                                         points=row[5], author=row[4], time_ago='',
+                                         comment_count=row[6]), row[7])
+
+    def story_days(self, story_id: str) -> List[str]:
+        """Days a story was seen on the front page"""
+        rows = self._connect().execute(
+            'SELECT day FROM daily_stories WHERE story_id = ? ORDER BY day', (story_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def days_for_domain(self, domain: str, limit: int = 30) -> List[str]:
+        """Most recent days a domain had a story on the front page"""
+        rows = self._connect().execute(
+            'SELECT DISTINCT day FROM daily_stories WHERE domain = ? ORDER BY day DESC LIMIT ?',
+            (domain.lower(), limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> dict:
+        """Row counts and writer backlog"""
+        conn = self._connect()
+        return {
+            'snapshots': conn.execute('SELECT COALESCE(MAX(id), 0) FROM snapshots').fetchone()[0],
+            'days': conn.execute('SELECT COUNT(DISTINCT day) FROM snapshots').fetchone()[0],
+            'pending': self._pending.qsize(),
+            'written': self.snapshots_written
+        }
+
+# Global history store
+history_store = HistoryStore(os.environ.get('HISTORY_PATH', 'instance/history.sqlite3'))
@@ -0,0 +1,151 @@
+# Story ingestion from the Hacker News JSON API
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from data_parser import extract_domain, time_ago_from_timestamp
+from models import Story
+from scraper import http_get
+
+logger = logging.getLogger(__name__)
+
+# Overridable so benchmarks can point at benchmarks/mock_hn.py
+HN_API_BASE_URL = os.environ.get('HN_API_BASE_URL', "https://hacker-news.firebaseio.com/v0/")
+
+# Feed name -> id list endpoint
+FEED_LISTS = {
+    'news': 'topstories',
+    'newest': 'newstories',
+    'ask': 'askstories',
+    'show': 'showstories',
+    'jobs': 'jobstories',
+}
+
+def fetch_json(path):
+    """GET one API path and decode it, or None on failure"""
+    url = HN_API_BASE_URL + path
+    try:
+        response = http_get(url)
+        response.raise_for_status()
+        return response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Error fetching {url}: {e}")
+        return None
+
+def item_fields(item: dict) -> Optional[tuple]:
+    """
+    The Story fields of an API item, minus rank and time_ago
+
+    Mirrors what the HTML parser sees: text posts link to their own item
+    page, and job posts have no score or author. Deleted and dead items
+    give None.
+    """
+    if item.get('deleted') or item.get('dead') or not item.get('title'):
+        return None
+    item_id = str(item['id'])
+    url = (item.get('url') or f"item?id={item_id}").strip()
+    is_job = item.get('type') == 'job'
+    return (item_id, item['title'].strip(), url, extract_domain(url) if item.get('url') else "",
+            0 if is_job else item.get('score', 0), "" if is_job else item.get('by', ""),
+            item.get('time', 0), item.get('descendants', 0))
+
+def story_from_fields(fields: tuple, rank: int, now: Optional[float] = None) -> Story:
+    item_id, title, url, domain, points, author, timestamp, comment_count = fields
+    return Story.from_parsed(id=item_id, rank=rank, title=title, url=url, domain=domain,
+                             points=points, author=author,
+                             time_ago=time_ago_from_timestamp(timestamp, now),
+                             comment_count=comment_count)
+
+class ApiIngester:
+    """
+    Builds feed story lists from the id lists and items of the JSON API
+
+    Each cycle reads every feed's id list, then fetches only the items that
+    are new, listed in updates.json (the API's feed of recently changed
+    items), or older than max_age in case an update was missed. Those are
+    fetched concurrently on a bounded thread pool through the shared
+    session; every other item comes from the per-item cache. A feed whose
+    ids, items and displayed ages are all unchanged comes back as None,
+    like an unchanged HTML page, so its snapshot is left alone. Cached
+    items are dropped once no feed's last list mentions them.
+    """
+
+    def __init__(self, max_workers: int = 10, max_age: float = 900):
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self._items: Dict[int, Tuple[Optional[tuple], float]] = {}  # id -> (fields, fetched_at)
+        self._lists: Dict[str, List[int]] = {}
+        self._ages: Dict[str, List[str]] = {}  # feed -> time_ago strings of its last build
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _fetch_item(self, item_id: int):
+        return item_id, fetch_json(f"item/{item_id}.json")
+
+    def load_feeds(self, feeds: List[str], count: int = 30, force: bool = False) -> Dict[str, Optional[List[Story]]]:
+        """
+        Fetch and build several feeds; feed -> stories, None if unchanged (unless force)
+
+        A feed whose id list can't be read gets an empty list, which the
+        caller treats as a failed fetch.
+        """
+        with self._lock:
+            started = time.time()
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='api-fetch') as executor:
+                listed = dict(zip(feeds, executor.map(
+                    lambda feed: fetch_json(f"{FEED_LISTS[feed]}.json"), feeds)))
+                updates = fetch_json("updates.json") or {}
+                self.requests += len(feeds) + 1
+
+                ids = {feed: [int(item_id) for item_id in (listed[feed] or [])[:count]] for feed in feeds}
+                wanted = {item_id for feed_ids in ids.values() for item_id in feed_ids}
+                updated = set(updates.get('items', ())) & wanted
+                stale = [item_id for item_id in wanted
+                         if item_id not in self._items or item_id in updated
+                         or started - self._items[item_id][1] > self.max_age]
+
+                changed = set()
+                for item_id, item in executor.map(self._fetch_item, stale):
+                    if item is None:
+                        continue  # Keep the cached copy, if any
+                    fields = item_fields(item)
+                    previous = self._items.get(item_id)
+                    if previous is None or previous[0] != fields:
+                        changed.add(item_id)
+                    self._items[item_id] = (fields, started)
+                self.requests += len(stale)
+
+            built = {}
+            for feed in feeds:
+                if listed[feed] is None:
+                    built[feed] = []
+                    continue
+                entries = [fields for fields in (self._items.get(item_id, (None, 0))[0] for item_id in ids[feed])
+                           if fields is not None]
+                # Ages are derived from each item's time, so a quiet feed still shows them advancing
+                ages = [time_ago_from_timestamp(fields[6], started) for fields in entries]
+                if (not force and ids[feed] == self._lists.get(feed) and not changed.intersection(ids[feed])
+                        and ages == self._ages.get(feed)):
+                    built[feed] = None
+                    continue
+                self._lists[feed] = ids[feed]
+                self._ages[feed] = ages
+                built[feed] = [story_from_fields(fields, rank, started) for rank, fields in enumerate(entries, 1)]
+
+            # Keep every item some feed's last list still refers to, not just this call's feeds
+            referenced = wanted.union(*self._lists.values())
+            for item_id in [item_id for item_id in self._items if item_id not in referenced]:
+                del self._items[item_id]
+
+            logger.info(f"API ingest: {len(wanted)} items listed, {len(stale)} fetched "
+                        f"({len(updated)} from updates), {len(changed)} changed in {time.time() - started:.2f}s")
+            return built
+
+    def stats(self) -> dict:
+        """Cached items and requests made"""
+        return {'items': len(self._items), 'requests': self.requests}
@@ -0,0 +1,172 @@
+# Precomputed HTTP response bodies with ETag and compression support
+from dataclasses import dataclass
+from typing import Optional
+import gzip
+import hashlib
+import logging
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+@dataclass
+class CachedPayload:
+    """A response body serialized once, with compressed copies and a strong ETag"""
+    body: bytes
+    mimetype: str
+    etag: str
+    gzip_body: Optional[bytes] = None
+    br_body: Optional[bytes] = None
+
+    @classmethod
+    def build(cls, body, mimetype='application/json'):
+        """Serialize-once constructor: hash and compress the body up front"""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        gzip_body = br_body = None
+        if len(body) >= MIN_COMPRESS_SIZE:
+            gzip_body = gzip.compress(body, compresslevel=6)
+            if brotli is not None:
+                br_body = brotli.compress(body, quality=5)
+        return cls(body=body, mimetype=mimetype, etag=etag,
+                   gzip_body=gzip_body, br_body=br_body)
+
+    def variant(self, accept_encodings):
+        """Pick the best encoding the client accepts: (encoding, body)"""
+        if self.br_body is not None and accept_encodings['br']:
+            return 'br', self.br_body
+        if self.gzip_body is not None and accept_encodings['gzip']:
+            return 'gzip', self.gzip_body
+        return None, self.body
+
+def variant_etag(etag, encoding):
+    """Each encoding is a different representation, so it gets its own strong ETag"""
+    return f"{etag}-{encoding}" if encoding else etag
+
+def payload_response(payload: CachedPayload, cache_control='no-cache'):
+    """
+    Serve a CachedPayload for the current request
+
+    Answers 304 when If-None-Match matches any encoding of the payload, so a
+    client that switched encodings still revalidates without a new body.
+    """
+    encoding, body = payload.variant(request.accept_encodings)
+    etag = variant_etag(payload.etag, encoding)
+    headers = {
+        'ETag': f'"{etag}"',
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': cache_control,
+    }
+
+    known = (variant_etag(payload.etag, e) for e in (None, 'gzip', 'br'))
+    if any(request.if_none_match.contains(tag) for tag in known):
+        return Response(status=304, headers=headers)
+
+    response = Response(body, mimetype=payload.mimetype, headers=headers)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def _accepted_encodings(header: str) -> set:
+    """Codings named in a raw Accept-Encoding header, minus any with q=0"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def negotiate(payload: CachedPayload, accept_encoding: str = '', if_none_match: str = '',
+              cache_control='no-cache'):
+    """
+    Framework-free payload_response for servers without a Flask request
+
+    Takes the raw Accept-Encoding and If-None-Match header values and
+    returns (status, headers, body), with the same encoding choice and 304
+    handling as payload_response.
+    """
+    accepted = _accepted_encodings(accept_encoding)
+    encoding, body = payload.variant({'br': 'br' in accepted, 'gzip': 'gzip' in accepted})
+    etag = variant_etag(payload.etag, encoding)
+    headers = {
+        'ETag': f'"{etag}"',
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': cache_control,
+    }
+
+    known = {variant_etag(payload.etag, e) for e in (None, 'gzip', 'br')}
+    tags = {tag.strip().removeprefix('W/').strip('"') for tag in if_none_match.split(',')}
+    if '*' in tags or tags & known:
+        return 304, headers, b''
+
+    headers['Content-Type'] = payload.mimetype
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return 200, headers, body
+
+class PageCache:
+    """
+    Rendered pages keyed by the state they were rendered from
+
+    Each slot (e.g. homepage with or without translations) holds one entry.
+    When a request arrives with a different key, such as a new snapshot
+    version or translation version, the entry is rebuilt and replaced, so
+    stale pages are dropped as soon as their inputs change. Each slot has
+    its own build lock, so a slow render only holds up requests for the
+    same page.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._slot_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _slot_lock(self, slot) -> threading.Lock:
+        lock = self._slot_locks.get(slot)
+        if lock is None:
+            with self._lock:
+                lock = self._slot_locks.setdefault(slot, threading.Lock())
+        return lock
+
+    def get(self, slot, key, build) -> CachedPayload:
+        """Return the cached payload for slot if it was built for key, else build it"""
+        entry = self._entries.get(slot)
+        if entry is not None and entry[0] == key:
+            self._count(hit=True)
+            return entry[1]
+
+        # One render per key even when many requests miss at once
+        with self._slot_lock(slot):
+            entry = self._entries.get(slot)
+            if entry is not None and entry[0] == key:
+                self._count(hit=True)
+                return entry[1]
+            payload = build()
+            self._entries[slot] = (key, payload)
+            self._count(hit=False)
+            return payload
+
+    def _count(self, hit: bool):
+        # += isn't atomic across threads, so the counters share the cache lock
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        """Drop every rendered page"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,218 @@
+# In-process metrics in the Prometheus text format
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+import threading
+import time
+
+# Request and pipeline latencies: 1ms to 30s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """{name="value",...} with Prometheus escaping, or '' without labels"""
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class ShardedMetric(ABC):
+    """
+    Base for metrics updated without a lock on the hot path
+
+    Every thread writes to its own dict of label values -> value, created
+    the first time that thread records anything; no other thread ever
+    writes to it, so an update is a plain dict operation. Collection copies
+    each shard (one C-level call under the GIL) and adds them up. Shards of
+    threads that have exited are folded into a retired total, so short-lived
+    pool threads don't pile up.
+    """
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    @abstractmethod
+    def _add(self, total, value):
+        """Merge one shard's value into a running total (None when there is none yet)"""
+
+    def collect(self) -> Dict[tuple, object]:
+        """Label values -> value, summed over every thread"""
+        with self._shards_lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    for key, value in shard.copy().items():
+                        self._retired[key] = self._add(self._retired.get(key), value)
+            self._shards = live
+            totals = {key: self._add(None, value) for key, value in self._retired.items()}
+            shards = [shard.copy() for _, shard in live]
+        for shard in shards:
+            for key, value in shard.items():
+                totals[key] = self._add(totals.get(key), value)
+        return totals
+
+class Counter(ShardedMetric):
+    """A monotonically increasing count"""
+    type = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _add(self, total, value):
+        return (total or 0) + value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+                for key, value in sorted(self.collect().items())]
+
+class Histogram(ShardedMetric):
+    """Observation counts per bucket, plus their sum"""
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # One slot per bucket, one for +Inf, then the sum
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the duration of a with block, in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _add(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, counts in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {cumulative}")
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """
+    A value read from elsewhere when metrics are collected
+
+    callback returns a number, or a dict of label values -> number. Used
+    for state that already lives somewhere, like cache counters and queue
+    depths, so the hot path pays nothing for it.
+    """
+
+    def __init__(self, name: str, help: str, callback: Callable, labels: Sequence[str] = (),
+                 type: str = 'gauge'):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labels = tuple(labels)
+        self.type = type
+
+    def render(self) -> List[str]:
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{format_labels(self.labels, key if isinstance(key, tuple) else (key,))} "
+                f"{format_value(value)}" for key, value in sorted(values.items()) if value is not None]
+
+class Registry:
+    """Named metrics, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, callback: Callable, labels: Sequence[str] = (),
+                 type: str = 'gauge') -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, callback, labels, type))
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = metric.render()
+            except Exception as e:
+                # One broken callback shouldn't take the whole scrape down
+                lines.append(f"# {metric.name} failed: {escape_label(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+# Global metrics registry
+registry = Registry()
+
+# Per-route latency up to the response headers, shared by the Flask and ASGI routes
+request_latency = registry.histogram(
+    'hn_http_request_duration_seconds', 'Time to build a response, per route', ['route', 'method'])
+request_count = registry.counter(
+    'hn_http_requests_total', 'Responses sent, per route and status', ['route', 'method', 'status'])
+
+# Time spent in each stage of the story pipeline: fetch, parse, render, translate
+stage_latency = registry.histogram(
+    'hn_stage_duration_seconds', 'Time spent in one pipeline stage', ['stage'])
@@ -1,12 +1,24 @@
 # Data models and structures
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Dict, Optional
 from urllib.parse import urlparse
 import re
 
-@dataclass
+# Links with a scheme or protocol-relative; anything else (item?id=, /x) is an HN page
+ABSOLUTE_URL_RE = re.compile(r'^(?:[A-Za-z][A-Za-z0-9+.-]*:)?//')
+
+@dataclass(slots=True)
 class Story:
-    """Data model for a Hacker News story"""
+    """
+    Data model for a Hacker News story
+
+    Slotted, so an instance has no per-object __dict__, and the display
+    strings (comment text and links) are built on first use and then kept.
+    Parsers hand over already-clean values through from_parsed(), which
+    skips the coercion done by the regular constructor. Treat the fields
+    as read-only once a story is built; the derived strings aren't
+    recomputed if they change.
+    """
     id: str
     rank: int
     title: str
@@ -16,11 +28,15 @@ class Story:
     author: str
     time_ago: str
     comment_count: int
-    comment_text: str = field(init=False)  # Auto-generated from comment_count
-    translated_title: Optional[str] = field(default=None, init=False)  # Translated title cache
+    # Translated titles by language, created on first translation
+    translations: Optional[Dict[str, str]] = field(default=None, init=False)
+    # Lazily derived display strings
+    _comment_text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _story_link: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _user_link: Optional[str] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
-        """Set default values, validate data, and format comment text"""
+        """Set default values and validate data"""
         # Validate and clean data
         self.id = str(self.id).strip()
         self.rank = max(0, int(self.rank)) if self.rank is not None else 0
@@ -34,9 +50,38 @@ class Story:
         # Auto-extract domain if not provided
         if not self.domain and self.url:
             self.domain = self.extract_domain(self.url)
-        
-        # Format comment text
-        self.comment_text = self.format_comment_text()
+
+    @classmethod
+    def from_parsed(cls, id: str, rank: int, title: str, url: str, domain: str, points: int,
+                    author: str, time_ago: str, comment_count: int) -> 'Story':
+        """
+        Fast constructor for trusted parser output
+
+        The values must already be stripped strings and non-negative ints,
+        with the domain worked out; nothing is checked or coerced.
+        """
+        story = object.__new__(cls)
+        story.id = id
+        story.rank = rank
+        story.title = title
+        story.url = url
+        story.domain = domain
+        story.points = points
+        story.author = author
+        story.time_ago = time_ago
+        story.comment_count = comment_count
+        story.translations = None
+        story._comment_text = None
+        story._story_link = None
+        story._user_link = None
+        return story
+
+    @property
+    def comment_text(self) -> str:
+        """Display text for the comment count"""
+        if self._comment_text is None:
+            self._comment_text = self.format_comment_text()
+        return self._comment_text
     
     def format_comment_text(self) -> str:
         """Format comment count into display text"""
@@ -53,9 +98,9 @@ class Story:
         if not url:
             return ""
         try:
-            # Handle URLs without protocol
-            if not url.startswith(('http://', 'https://')):
-                url = 'http://' + url
+            # Relative links point at HN itself and have no domain to show
+            if not ABSOLUTE_URL_RE.match(url):
+                return ""
             
             parsed = urlparse(url)
             domain = parsed.netloc
@@ -74,10 +119,9 @@ class Story:
     
     def get_story_link(self) -> str:
         """Get the appropriate link for the story"""
-        if self.is_external_link():
-            return self.url
-        else:
-            return f"/item/{self.id}"
+        if self._story_link is None:
+            self._story_link = self.url if self.is_external_link() else self.get_comment_link()
+        return self._story_link
     
     def get_comment_link(self) -> str:
         """Get link to story comments"""
@@ -85,21 +129,33 @@ class Story:
     
     def get_user_link(self) -> str:
         """Get link to user profile"""
-        return f"/user/{self.author}"
+        if self._user_link is None:
+            self._user_link = f"/user/{self.author}"
+        return self._user_link
     
-    def get_display_title(self, use_translation: bool = False) -> str:
+    @property
+    def translated_title(self) -> Optional[str]:
+        """Simplified Chinese title, the original translation target"""
+        return self.get_translation('zh-CN')
+    
+    def get_translation(self, lang: str) -> Optional[str]:
+        """Get the title translated to a language, if available"""
+        return self.translations.get(lang) if self.translations else None
+    
+    def get_display_title(self, use_translation: bool = False, lang: str = 'zh-CN') -> str:
         """Get title for display, optionally translated"""
-        if use_translation and self.translated_title:
-            return self.translated_title
-        return self.title
+        translated = self.get_translation(lang) if use_translation else None
+        return translated or self.title
     
-    def set_translated_title(self, translated_title: str):
-        """Set the translated title"""
-        self.translated_title = translated_title
+    def set_translated_title(self, translated_title: str, lang: str = 'zh-CN'):
+        """Set the translated title for a language"""
+        if self.translations is None:
+            self.translations = {}
+        self.translations[lang] = translated_title
     
     def validate(self) -> bool:
-        """Validate story data integrity"""
-        required_fields = [self.id, self.title, self.author]
+        """Validate story data integrity (job posts have no author)"""
+        required_fields = [self.id, self.title]
         return all(field.strip() for field in required_fields)
     
     def to_dict(self) -> dict:
@@ -119,4 +175,25 @@ class Story:
             'story_link': self.get_story_link(),
             'comment_link': self.get_comment_link(),
             'user_link': self.get_user_link()
-        }
\ No newline at end of file
+        }
+
+@dataclass(slots=True)
+class UserProfile:
+    """A Hacker News user's public profile"""
+    username: str
+    karma: int = 0
+    created: str = ""  # As HN displays it, e.g. "October 9, 2006"
+    created_at: Optional[int] = None  # Unix timestamp, when the page gives one
+    about: str = ""  # Sanitized HTML
+    exists: bool = True  # False when HN answered "No such user."
+    fetched_at: float = 0.0
+
+    def to_dict(self) -> dict:
+        """Convert profile to dictionary for JSON serialization"""
+        return {
+            'username': self.username,
+            'karma': self.karma,
+            'created': self.created,
+            'created_at': self.created_at,
+            'about': self.about
+        }
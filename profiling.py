@@ -0,0 +1,218 @@
+# On-demand and sampled request profiling, written out for flame graphs
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Paths below this many microseconds are left out of collapsed stacks
+MIN_STACK_MICROSECONDS = 1
+
+# The ?_profile= token as it appears in a logged request line
+PROFILE_TOKEN_RE = re.compile(r'([?&]_profile=)[^&\s"]*')
+
+def redact_token(text: str) -> str:
+    return PROFILE_TOKEN_RE.sub(r'\1<redacted>', text)
+
+class TokenRedactingFilter(logging.Filter):
+    """Hides the ?_profile= token in access log lines; the record's arguments keep their types"""
+
+    def filter(self, record):
+        if isinstance(record.msg, str):
+            record.msg = redact_token(record.msg)
+        if isinstance(record.args, tuple):
+            record.args = tuple(redact_token(arg) if isinstance(arg, str) else arg for arg in record.args)
+        return True
+
+def redact_access_logs(logger_names=('werkzeug', 'uvicorn.access')):
+    """Keep the profiling token out of the dev server's and uvicorn's access logs"""
+    for name in logger_names:
+        access_logger = logging.getLogger(name)
+        if not any(isinstance(f, TokenRedactingFilter) for f in access_logger.filters):
+            access_logger.addFilter(TokenRedactingFilter())
+
+def function_label(func) -> str:
+    filename, line, name = func
+    return f"{os.path.basename(filename)}:{line}({name})" if line else name
+
+def collapsed_stacks(stats: pstats.Stats, max_depth: int = 64) -> str:
+    """
+    cProfile results as collapsed stacks ("outer;...;inner microseconds")
+
+    The input format of flamegraph.pl and speedscope. cProfile records
+    caller -> callee edges rather than whole stacks, so each function's time
+    is split between its callers in proportion to the time each edge
+    accounts for, walking down from the functions nobody profiled called.
+    That is exact for the tree-shaped calls that make up most of a request
+    and an estimate where a function is shared by several callers.
+    """
+    entries = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in entries.items() if not any(caller in entries for caller in entry[4])]
+
+    lines = Counter()
+
+    def walk(func, path, on_path, share):
+        _, _, own, cumulative, _ = entries[func]
+        if cumulative * share * 1e6 < MIN_STACK_MICROSECONDS or len(path) > max_depth:
+            return
+        path = path + [function_label(func)]
+        lines[';'.join(path)] += own * share * 1e6
+        for callee, edge_cumulative in callees.get(func, ()):
+            callee_cumulative = entries[callee][3]
+            if callee not in on_path and callee_cumulative > 0:
+                walk(callee, path, on_path | {callee}, share * edge_cumulative / callee_cumulative)
+
+    for root in roots:
+        walk(root, [], {root}, 1.0)
+    return ''.join(f"{stack} {round(micros)}\n" for stack, micros in lines.most_common() if round(micros))
+
+@dataclass
+class ProfiledRequest:
+    """One finished request; profile_id is set when it was profiled"""
+    method: str
+    path: str
+    status: int
+    duration: float
+    started_at: float
+    profile_id: Optional[str] = None
+    trigger: Optional[str] = None  # 'token' or 'sample'
+    top_functions: List[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['duration_ms'] = round(data.pop('duration') * 1000, 2)
+        return data
+
+class ActiveProfile:
+    """cProfile running for the current request"""
+
+    def __init__(self, trigger: str):
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()  # Raises ValueError if another profiler owns the hook (Python 3.12+)
+
+    def stop(self):
+        self.profiler.disable()
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and keeps the recent slow ones
+
+    A request is profiled when it carries the configured token (X-Profile
+    header or ?_profile=) or, with sample_percent set, at random. Up to
+    Python 3.11 cProfile only sees the request's own thread, so work handed
+    to background threads (translator workers, fetch pools) shows up as the
+    wait for it. From 3.12 cProfile hooks sys.monitoring, which is process
+    wide: a profile also picks up whatever other threads ran meanwhile, and
+    only one can run at a time, so a request that would overlap another
+    profiled one is served unprofiled with a warning. Each profile is
+    written to profile_dir as <id>.prof (load with pstats or snakeviz) and
+    <id>.folded (collapsed stacks for flamegraph.pl or speedscope); only the
+    newest keep profiles are kept on disk. While profiling is enabled every
+    request's timing also goes into a bounded recent list, so the slowest
+    recent requests can be listed whether or not they were profiled.
+    """
+
+    def __init__(self, token: str = '', sample_percent: float = 0, profile_dir: str = 'instance/profiles',
+                 keep: int = 50, recent: int = 1000):
+        self.token = token
+        self.sample_percent = sample_percent
+        self.profile_dir = profile_dir
+        self.keep = keep
+        self._recent = deque(maxlen=recent)
+        self._profiles = deque()  # profile ids on disk, oldest first
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token) or self.sample_percent > 0
+
+    def authorized(self, supplied: Optional[str]) -> bool:
+        """Whether a supplied token matches the configured one; never without a token set"""
+        return bool(self.token) and bool(supplied) and hmac.compare_digest(supplied, self.token)
+
+    def start(self, supplied_token: Optional[str] = None) -> Optional[ActiveProfile]:
+        """Begin profiling the current request if it asked for it or was sampled"""
+        if self.authorized(supplied_token):
+            trigger = 'token'
+        elif self.sample_percent > 0 and random.random() * 100 < self.sample_percent:
+            trigger = 'sample'
+        else:
+            return None
+        try:
+            return ActiveProfile(trigger)
+        except ValueError as e:
+            logger.warning(f"Request not profiled: {e}")
+            return None
+
+    def record(self, method: str, path: str, status: int, duration: float,
+               active: Optional[ActiveProfile] = None):
+        """Add a finished request to the recent list, saving its profile if it had one"""
+        entry = ProfiledRequest(method=method, path=path, status=status, duration=duration,
+                                started_at=time.time() - duration)
+        if active is not None:
+            active.stop()
+            entry.trigger = active.trigger
+            try:
+                entry.profile_id, entry.top_functions = self._save(active, method, path)
+            except OSError as e:
+                logger.error(f"Could not write profile for {method} {path}: {e}")
+        self._recent.append(entry)
+
+    def _save(self, active: ActiveProfile, method: str, path: str):
+        profile_id = f"{int(active.started_at)}-{next(self._ids)}"
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, profile_id)
+        active.profiler.dump_stats(base + '.prof')
+        stats = pstats.Stats(active.profiler, stream=io.StringIO())
+        with open(base + '.folded', 'w', encoding='utf-8') as f:
+            f.write(collapsed_stacks(stats))
+
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:10]
+        top_functions = [{'function': function_label(func), 'calls': calls,
+                          'own_ms': round(own * 1000, 2), 'cumulative_ms': round(cumulative * 1000, 2)}
+                         for func, (_, calls, own, cumulative, _) in top]
+
+        with self._lock:
+            self._profiles.append(profile_id)
+            expired = [self._profiles.popleft() for _ in range(max(0, len(self._profiles) - self.keep))]
+        for old in expired:
+            for suffix in ('.prof', '.folded'):
+                try:
+                    os.remove(os.path.join(self.profile_dir, old + suffix))
+                except OSError:
+                    pass
+        logger.info(f"Profiled {method} {path} ({active.trigger}) -> {base}.prof")
+        return profile_id, top_functions
+
+    def slowest(self, limit: int = 20, profiled_only: bool = False) -> List[ProfiledRequest]:
+        """Slowest of the recent requests, slowest first"""
+        entries = [entry for entry in list(self._recent) if entry.profile_id or not profiled_only]
+        return sorted(entries, key=lambda entry: entry.duration, reverse=True)[:limit]
+
+    def profile_path(self, profile_id: str, suffix: str) -> Optional[str]:
+        """Path of a kept profile file, or None for unknown ids"""
+        with self._lock:
+            known = profile_id in self._profiles
+        path = os.path.join(self.profile_dir, profile_id + suffix)
+        return path if known and os.path.exists(path) else None
+
+# Global request profiler, configured by app.py
+request_profiler = RequestProfiler()
@@ -1,21 +1,213 @@
 import requests
+import hashlib
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+
+from metrics import stage_latency
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_hacker_news_html():
-    """Fetch the HTML content from the Hacker News homepage."""
-    url = "https://news.ycombinator.com/"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+# Overridable so benchmarks and load tests can point at a local mirror
+HN_BASE_URL = os.environ.get('HN_BASE_URL', "https://news.ycombinator.com/")
+
+# Feed name -> path on news.ycombinator.com
+FEEDS = {
+    'news': 'news',
+    'newest': 'newest',
+    'ask': 'ask',
+    'show': 'show',
+    'jobs': 'jobs',
+}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+REQUEST_TIMEOUT = 10
+POOL_SIZE = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+# URL -> validators from the last successful fetch (ETag, Last-Modified, body digest)
+_validators: Dict[str, dict] = {}
+_validators_lock = threading.Lock()
+
+@dataclass
+class PageResult:
+    """Outcome of fetching one feed page"""
+    html: Optional[str] = None
+    unchanged: bool = False  # 304, or same body as the previous fetch
+
+    @property
+    def ok(self) -> bool:
+        return self.unchanged or self.html is not None
+
+def get_session():
+    """Shared keep-alive session so repeated fetches reuse pooled connections"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(HEADERS)
+                _session = session
+    return _session
+
+def http_get(url, **kwargs):
+    """GET through the shared session, timed as the 'fetch' stage (up to the response headers when streaming)"""
+    with stage_latency.time('fetch'):
+        return get_session().get(url, timeout=REQUEST_TIMEOUT, **kwargs)
+
+def feed_url(feed='news', page=1):
+    """Build the URL for one page of a feed"""
+    url = HN_BASE_URL + FEEDS[feed]
+    if page > 1:
+        url += f"?p={page}"
+    return url
+
+def fetch_page(feed='news', page=1):
+    """Fetch one page of a Hacker News feed, or None on failure"""
+    url = feed_url(feed, page)
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_get(url)
         response.raise_for_status()  # Raise an exception for bad status codes
         logger.info(f"Successfully fetched HTML from {url}")
         return response.text
     except requests.exceptions.RequestException as e:
         logger.error(f"Error fetching HTML from {url}: {e}")
         return None
+
+def item_url(item_id, page=1):
+    """Build the URL for one page of an item's comment thread"""
+    url = f"{HN_BASE_URL}item?id={item_id}"
+    if page > 1:
+        url += f"&p={page}"
+    return url
+
+def stream_item_page(item_id, page=1, chunk_size=65536):
+    """
+    Yield the raw body of an item page in chunks as it downloads
+
+    Large threads are several hundred KB, so callers parse as the bytes
+    arrive instead of holding the whole page. Request errors are raised.
+    """
+    url = item_url(item_id, page)
+    with http_get(url, stream=True) as response:
+        response.raise_for_status()
+        yield from response.iter_content(chunk_size)
+    logger.info(f"Successfully fetched HTML from {url}")
+
+def user_url(username):
+    """Build the URL of a user's profile page"""
+    return f"{HN_BASE_URL}user?id={username}"
+
+def fetch_user_page(username):
+    """Fetch a user's profile page, or None on failure"""
+    url = user_url(username)
+    try:
+        response = http_get(url)
+        response.raise_for_status()
+        logger.info(f"Successfully fetched HTML from {url}")
+        return response.text
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching HTML from {url}: {e}")
+        return None
+
+def fetch_page_conditional(feed='news', page=1) -> PageResult:
+    """
+    Fetch one page of a feed, skipping work when it has not changed
+
+    Sends If-None-Match / If-Modified-Since from the previous fetch and also
+    compares a digest of the body, since HN does not always honour
+    conditional requests. Unchanged pages come back with unchanged=True and
+    no HTML, so callers can reuse what they parsed last time.
+    """
+    url = feed_url(feed, page)
+    with _validators_lock:
+        previous = dict(_validators.get(url, {}))
+
+    headers = {}
+    if previous.get('etag'):
+        headers['If-None-Match'] = previous['etag']
+    if previous.get('last_modified'):
+        headers['If-Modified-Since'] = previous['last_modified']
+
+    try:
+        response = http_get(url, headers=headers)
+        if response.status_code == 304:
+            logger.info(f"Not modified: {url}")
+            return PageResult(unchanged=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching HTML from {url}: {e}")
+        return PageResult()
+
+    digest = hashlib.sha256(response.content).hexdigest()
+    with _validators_lock:
+        _validators[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'digest': digest,
+        }
+
+    if digest == previous.get('digest'):
+        logger.info(f"Body unchanged: {url}")
+        return PageResult(unchanged=True)
+
+    logger.info(f"Successfully fetched HTML from {url}")
+    return PageResult(html=response.text)
+
+def reset_validators():
+    """Forget conditional-request state so the next fetch downloads everything"""
+    with _validators_lock:
+        _validators.clear()
+
+def get_hacker_news_html():
+    """Fetch the HTML content from the Hacker News homepage."""
+    return fetch_page('news', 1)
+
+def fetch_feeds(feeds: List[str], pages: int = 1, max_workers: int = 4) -> Dict[str, List[PageResult]]:
+    """
+    Conditionally fetch several pages of several feeds concurrently
+
+    Args:
+        feeds: Feed names from FEEDS
+        pages: Number of pages to fetch per feed
+        max_workers: Maximum number of requests in flight at once
+
+    Returns:
+        Dict of feed name -> list of PageResult, one per page
+    """
+    jobs = [(feed, page) for feed in feeds for page in range(1, pages + 1)]
+    results = {feed: [None] * pages for feed in feeds}
+    latency = {feed: 0.0 for feed in feeds}
+
+    def fetch(job):
+        feed, page = job
+        started = time.perf_counter()
+        result = fetch_page_conditional(feed, page)
+        return feed, page, result, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feed-fetch') as executor:
+        for feed, page, result, elapsed in executor.map(fetch, jobs):
+            results[feed][page - 1] = result
+            latency[feed] = max(latency[feed], elapsed)
+
+    for feed in feeds:
+        fetched = sum(1 for result in results[feed] if result.html is not None)
+        unchanged = sum(1 for result in results[feed] if result.unchanged)
+        logger.info(f"Feed '{feed}': {fetched} changed, {unchanged} unchanged of {pages} pages, "
+                    f"slowest page {latency[feed] * 1000:.0f}ms")
+    return results
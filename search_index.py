@@ -0,0 +1,299 @@
+# In-memory full-text search over story titles, domains, authors and translations
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+
+from models import Story
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'[^\W_]+')
+# Han, kana and Hangul have no spaces between words, so they are indexed as bigrams
+CJK_RE = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+)')
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, with runs of CJK characters split into bigrams"""
+    if not text:
+        return []
+    tokens = []
+    for word in WORD_RE.findall(unicodedata.normalize('NFKC', text).casefold()):
+        for index, part in enumerate(CJK_RE.split(word)):
+            if not part:
+                continue
+            if index % 2 == 0:
+                tokens.append(part)
+            elif len(part) == 1:
+                tokens.append(part)
+            else:
+                tokens.extend(part[i:i + 2] for i in range(len(part) - 1))
+    return tokens
+
+class SearchDoc:
+    """What the index keeps about one story"""
+    __slots__ = ('story_id', 'title', 'url', 'domain', 'author', 'points', 'comment_count',
+                 'seen_at', 'translations', 'length', 'popularity')
+
+    def __init__(self, story_id):
+        self.story_id = story_id
+        self.translations = {}
+        self.length = 0
+
+    def terms(self) -> List[str]:
+        tokens = tokenize(self.title) + tokenize(self.domain)
+        if self.author:
+            tokens.append(self.author.casefold())
+        for translated in self.translations.values():
+            tokens.extend(tokenize(translated))
+        return tokens
+
+    def to_story(self, rank: int) -> Story:
+        return Story.from_parsed(id=self.story_id, rank=rank, title=self.title, url=self.url,
+                                 domain=self.domain, points=self.points, author=self.author,
+                                 time_ago=time.strftime('%Y-%m-%d', time.gmtime(self.seen_at)),
+                                 comment_count=self.comment_count)
+
+class SearchIndex:
+    """
+    Inverted index with BM25 ranking, boosted by points and recency
+
+    Postings map each term to {doc number: term frequency}. A query takes
+    the documents containing every query term, starting from the rarest
+    term's postings, so its cost depends on how many stories match rather
+    than on the size of the index. The final score is
+
+        bm25 * (1 + points_weight * log1p(points)) * (0.5 + 0.5 * 2^(-age / half_life))
+
+    so popular and recent stories rise, while an old story keeps at least half
+    its text relevance.
+
+    Common terms get two shortcuts so they don't make a query touch most of
+    the index. Once the index is large, terms found in more than max_df of
+    all stories ("the", "hn", ...) are left out of multi-term queries; they
+    barely change the ranking. A single common term is answered from an
+    impact-ordered copy of its postings (best possible score first), which
+    stops as soon as no remaining story can beat the current top results.
+    Results are also cached per query until the index next changes.
+    """
+
+    # Terms with at least this many stories get an impact-ordered posting list
+    IMPACT_MIN_DF = 2000
+    # Rebuild an impact list after this many story updates since it was built
+    IMPACT_REBUILD = 5000
+    # Headroom on impact bounds for average length drift since the build
+    IMPACT_SLACK = 1.1
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, points_weight: float = 0.15,
+                 half_life_hours: float = 72, max_df: float = 0.1, cache_size: int = 256):
+        self.k1 = k1
+        self.b = b
+        self.points_weight = points_weight
+        self.half_life = half_life_hours * 3600
+        self.max_df = max_df
+        self.cache_size = cache_size
+        self._results = OrderedDict()
+        self._version = 0
+        self._docs: Dict[int, SearchDoc] = {}
+        self._numbers: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0
+        self._updates: List[int] = []  # Doc numbers in update order, for impact lists
+        self._impacts: Dict[str, Tuple[int, float, list]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _unindex(self, number: int, doc: SearchDoc):
+        for term in set(doc.terms()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(number, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= doc.length
+
+    def _index(self, number: int, doc: SearchDoc):
+        terms = doc.terms()
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[number] = count
+        doc.length = len(terms)
+        self._total_length += doc.length
+
+    def add(self, story, seen_at: Optional[float] = None):
+        """Index a story, or refresh its points and reindex it if its text changed"""
+        self.add_stories([story], seen_at)
+
+    def add_stories(self, stories, seen_at: Optional[float] = None):
+        """Index many stories under one lock acquisition"""
+        seen_at = seen_at or time.time()
+        with self._lock:
+            for story in stories:
+                number = self._numbers.get(story.id)
+                doc = self._docs.get(number) if number is not None else None
+                translations = dict(story.translations) if story.translations else {}
+                if doc is None:
+                    number = self._numbers[story.id] = len(self._numbers)
+                    doc = self._docs[number] = SearchDoc(story.id)
+                    changed = True
+                elif seen_at < doc.seen_at:
+                    continue  # Older data, e.g. a history backfill racing a live refresh
+                else:
+                    changed = (doc.title != story.title or doc.domain != story.domain
+                               or doc.author != story.author
+                               or any(doc.translations.get(lang) != text for lang, text in translations.items()))
+                    if changed:
+                        self._unindex(number, doc)
+                    if doc.title == story.title:
+                        # Translations of an edited title no longer apply
+                        translations = {**doc.translations, **translations}
+                doc.title = story.title
+                doc.url = story.url
+                doc.domain = story.domain
+                doc.author = story.author
+                doc.points = story.points
+                doc.popularity = 1 + self.points_weight * math.log1p(story.points)
+                doc.comment_count = story.comment_count
+                doc.seen_at = seen_at
+                doc.translations = translations
+                if changed:
+                    self._index(number, doc)
+                self._updates.append(number)
+            self._version += 1
+            if len(self._updates) > 50 * self.IMPACT_REBUILD:
+                self._updates.clear()
+                self._impacts.clear()
+
+    def add_translation(self, story_id: str, lang: str, translated: str):
+        """Make a translated title searchable"""
+        with self._lock:
+            number = self._numbers.get(story_id)
+            doc = self._docs.get(number) if number is not None else None
+            if doc is None or doc.translations.get(lang) == translated:
+                return
+            self._unindex(number, doc)
+            doc.translations[lang] = translated
+            self._index(number, doc)
+            self._updates.append(number)
+            self._version += 1
+
+    def search(self, query: str, limit: int = 30, now: Optional[float] = None) -> List[Tuple[SearchDoc, float]]:
+        """Best matches for every term of query, as (doc, score), highest first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        cache_key = (tuple(terms), limit)
+        with self._lock:
+            cached = self._results.get(cache_key)
+            if cached is not None and cached[0] == self._version and now is None:
+                self._results.move_to_end(cache_key)
+                return cached[1]
+
+            entries = [(term, self._postings.get(term)) for term in terms]
+            if not all(postings for _, postings in entries):
+                return []
+            entries.sort(key=lambda entry: len(entry[1]))
+            doc_count = len(self._docs)
+            if doc_count >= 1000:
+                # Keep the rarest term even if everything is common
+                entries = entries[:1] + [e for e in entries[1:] if len(e[1]) <= self.max_df * doc_count]
+            postings = [term_postings for _, term_postings in entries]
+
+            average_length = self._total_length / doc_count if doc_count else 1
+            idf = [math.log(1 + (doc_count - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+            k1, b = self.k1, self.b
+            scale = k1 * b / average_length
+            base = k1 * (1 - b)
+            k1_plus = k1 + 1
+            decay = -1 / self.half_life
+            current = now or time.time()
+            docs = self._docs
+
+            def score(number):
+                doc = docs[number]
+                norm = base + scale * doc.length
+                bm25 = 0.0
+                for weight, term_postings in zip(idf, postings):
+                    tf = term_postings[number]
+                    bm25 += weight * tf * k1_plus / (tf + norm)
+                age = current - doc.seen_at
+                recency = 0.5 + 0.5 * 2 ** (decay * age) if age > 0 else 1.0
+                return bm25 * doc.popularity * recency
+
+            if len(postings) == 1 and len(postings[0]) >= self.IMPACT_MIN_DF:
+                best = self._search_impacts(entries[0][0], postings[0], idf[0], score, limit,
+                                            base, scale, k1_plus, current)
+            else:
+                candidates = postings[0].keys()
+                for other in postings[1:]:
+                    candidates = candidates & other.keys()
+                best = heapq.nlargest(limit, ((score(number), number) for number in candidates))
+
+            results = [(docs[number], value) for value, number in best]
+            if now is None:
+                self._results[cache_key] = (self._version, results)
+                while len(self._results) > self.cache_size:
+                    self._results.popitem(last=False)
+            return results
+
+    def _search_impacts(self, term, term_postings, idf, score, limit, base, scale, k1_plus, current):
+        """
+        Top (score, number) pairs for one common term, stopping once nothing left can win
+
+        Each bound includes recency as of the build. Stories only get older
+        after that, so the bound holds until the story itself is updated, and
+        updated stories are scored separately.
+        """
+        built_at, built_time, order = self._impacts.get(term, (None, None, None))
+        if (order is None or len(self._updates) - built_at > self.IMPACT_REBUILD
+                or current - built_time > self.half_life / 4):
+            docs = self._docs
+            decay = -1 / self.half_life
+            order = []
+            for number, tf in term_postings.items():
+                doc = docs[number]
+                age = current - doc.seen_at
+                recency = 0.5 + 0.5 * 2 ** (decay * age) if age > 0 else 1.0
+                order.append((tf * k1_plus / (tf + base + scale * doc.length) * doc.popularity * recency, number))
+            order.sort(reverse=True)
+            built_at, built_time = len(self._updates), current
+            self._impacts[term] = (built_at, built_time, order)
+
+        top = []  # min-heap of the best `limit` so far
+        seen = set()
+
+        def consider(number):
+            if number in seen or number not in term_postings:
+                return
+            seen.add(number)
+            entry = (score(number), number)
+            if len(top) < limit:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
+
+        # Stories changed since the list was built may have outgrown their bounds
+        for number in self._updates[built_at:]:
+            consider(number)
+        ceiling = idf * self.IMPACT_SLACK
+        for bound, number in order:
+            if len(top) >= limit and bound * ceiling <= top[0][0]:
+                break
+            consider(number)
+        return sorted(top, reverse=True)
+
+    def stats(self) -> dict:
+        """Document and term counts"""
+        return {'documents': len(self._docs), 'terms': len(self._postings),
+                'cached_queries': len(self._results)}
+
+# Global search index
+search_index = SearchIndex()
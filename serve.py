@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# Production server entry point
+#
+# Usage: python serve.py [--mode async|sync] [--host HOST] [--port PORT] [--workers N] [--threads N]
+#
+# async: uvicorn serving asgi.application. The JSON API, translation stream and
+#        feed refresh run on the event loop; pages go through Flask on a thread pool.
+# sync:  waitress serving the Flask app on a fixed pool of worker threads.
+
+import argparse
+import logging
+import os
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the HN clone')
+    parser.add_argument('--mode', choices=('async', 'sync'), default=os.environ.get('SERVE_MODE', 'async'))
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=1,
+                        help='async mode: processes (each runs its own refresher and caches)')
+    parser.add_argument('--threads', type=int, default=8, help='sync mode: worker threads')
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    if args.mode == 'async':
+        import uvicorn
+        os.environ.setdefault('STORY_REFRESH_DRIVER', 'asyncio')
+        uvicorn.run('asgi:application', host=args.host, port=args.port, workers=args.workers,
+                    log_level=args.log_level, access_log=False, timeout_graceful_shutdown=5)
+    else:
+        import waitress
+        from app import app, start_background_tasks
+        start_background_tasks()
+        waitress.serve(app, host=args.host, port=args.port, threads=args.threads)
+
+if __name__ == '__main__':
+    main()
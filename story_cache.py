@@ -0,0 +1,375 @@
+# Story cache with a background refresher
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import logging
+import threading
+import time
+
+from data_parser import merge_feed_pages, parse_stories
+from models import Story
+from scraper import FEEDS, fetch_feeds, fetch_page
+
+logger = logging.getLogger(__name__)
+
+# Stories on one page of an HN listing
+STORIES_PER_PAGE = 30
+
+def carry_translations(previous: Optional['StorySnapshot'], stories: List[Story]) -> int:
+    """
+    Copy translations from the previous snapshot onto unchanged stories
+
+    A story is unchanged when the previous snapshot has one with the same id
+    and title; edited titles start untranslated. Returns how many stories
+    still need translating.
+    """
+    if previous is None:
+        return len(stories)
+    remaining = 0
+    for story in stories:
+        old = previous.by_id.get(story.id)
+        if old is not None and old is not story and old.title == story.title and old.translations:
+            story.translations = dict(old.translations)
+        elif old is None or old.title != story.title:
+            remaining += 1
+    return remaining
+
+@dataclass
+class StorySnapshot:
+    """
+    An immutable view of one successful story fetch
+
+    Lookup indexes are built once when the snapshot is created, before it is
+    swapped in, so readers never see a story list and indexes out of step.
+    """
+    stories: List[Story]
+    version: int
+    fetched_at: float = field(default_factory=time.time)
+    checked_at: float = field(default_factory=time.time)  # last time upstream was confirmed unchanged
+    by_id: Dict[str, Story] = field(init=False, repr=False)
+    by_author: Dict[str, List[Story]] = field(init=False, repr=False)
+    by_domain: Dict[str, List[Story]] = field(init=False, repr=False)
+    _memo: dict = field(init=False, repr=False, default_factory=dict)
+    _memo_lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self.by_id = {}
+        self.by_author = {}
+        self.by_domain = {}
+        for story in self.stories:
+            self.by_id.setdefault(story.id, story)
+            if story.author:
+                self.by_author.setdefault(story.author, []).append(story)
+            if story.domain:
+                self.by_domain.setdefault(story.domain.lower(), []).append(story)
+
+    def age(self) -> float:
+        """Seconds since this snapshot was fetched"""
+        return time.time() - self.fetched_at
+
+    def memo(self, key, build):
+        """Compute a value derived from this snapshot once, e.g. a serialized payload"""
+        value = self._memo.get(key)
+        if value is None:
+            with self._memo_lock:
+                value = self._memo.get(key)
+                if value is None:
+                    value = build(self)
+                    self._memo[key] = value
+        return value
+
+class StoryCache:
+    """
+    Holds the latest story snapshot of one feed.
+
+    Readers always get the last good snapshot. A refresh builds the new story
+    list off the request path and swaps it in with a single assignment, so
+    requests never wait on a fetch once the first snapshot is loaded. Failed or
+    empty fetches leave the current snapshot in place.
+    """
+
+    def __init__(self, loader: Callable[[], List[Story]], initial_wait: float = 15,
+                 name: str = 'news'):
+        self._loader = loader
+        self.name = name
+        self.initial_wait = initial_wait
+        self._snapshot: Optional[StorySnapshot] = None
+        self._version = 0
+        self._refresh_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._refresh_pending = False
+        self._ready = threading.Event()
+        self._listeners: List[Callable[[StorySnapshot], None]] = []
+        self.last_error = None
+
+    @property
+    def snapshot(self) -> Optional[StorySnapshot]:
+        """Current snapshot, or None if nothing has loaded yet"""
+        return self._snapshot
+
+    def get_stories(self) -> List[Story]:
+        """Return the current story list, loading it once if the cache is cold"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh_async()
+            self._ready.wait(self.initial_wait)
+            snapshot = self._snapshot
+        return snapshot.stories if snapshot else []
+
+    def refresh(self) -> bool:
+        """
+        Fetch and parse a new story list and swap it in.
+
+        Returns True if a new snapshot was installed. If another refresh is
+        already running this call waits for it instead of fetching again.
+        """
+        with self._refresh_lock:
+            started = time.time()
+            try:
+                stories = self._loader()
+            except Exception as e:
+                stories = []
+                logger.error(f"Story refresh failed: {e}")
+                self.last_error = str(e)
+            return self._install(stories, started)
+
+    def install(self, stories: List[Story]) -> bool:
+        """Swap in a story list that was fetched elsewhere, e.g. by FeedRefresher"""
+        with self._refresh_lock:
+            return self._install(stories, time.time())
+
+    def add_listener(self, callback: Callable[[StorySnapshot], None]):
+        """Call callback with each new snapshot right after it is swapped in"""
+        self._listeners.append(callback)
+
+    def touch(self):
+        """Record that upstream was checked and still matches the current snapshot"""
+        self.last_error = None
+        snapshot = self._snapshot
+        if snapshot is not None:
+            snapshot.checked_at = time.time()
+
+    def _install(self, stories, started):
+        if not stories:
+            # Loaders and FeedRefresher report failures as an empty list; keep a raised error's message
+            if self.last_error is None:
+                self.last_error = "Refresh returned no stories"
+            if self._snapshot is not None:
+                logger.warning(f"[{self.name}] Refresh returned no stories, keeping snapshot v{self._snapshot.version}")
+            else:
+                logger.warning(f"[{self.name}] Refresh returned no stories and no snapshot is loaded yet")
+            self._ready.set()
+            return False
+
+        # Before the swap, so a refresh never shows a translated title untranslated
+        changed = carry_translations(self._snapshot, stories)
+        self._version += 1
+        self._snapshot = StorySnapshot(stories=stories, version=self._version)
+        self.last_error = None
+        self._ready.set()
+        logger.info(f"[{self.name}] Story snapshot v{self._version} installed with {len(stories)} stories "
+                    f"in {time.time() - started:.2f}s ({changed} new or edited)")
+        for callback in self._listeners:
+            try:
+                callback(self._snapshot)
+            except Exception as e:
+                logger.error(f"[{self.name}] Snapshot listener failed: {e}")
+        return True
+
+    def refresh_async(self) -> bool:
+        """Start a refresh in the background; returns False if one is already running"""
+        with self._state_lock:
+            if self._refresh_pending or self._refresh_lock.locked():
+                return False
+            self._refresh_pending = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refresh_pending = False
+
+        thread = threading.Thread(target=run, name='story-refresh', daemon=True)
+        thread.start()
+        return True
+
+class FeedRefresher:
+    """
+    Periodically refreshes every feed cache in one concurrent fetch.
+
+    All pages of all feeds are fetched together through the pooled session in
+    scraper.fetch_feeds, then each feed is parsed and installed into its own
+    StoryCache. Pages are fetched conditionally; the parsed stories of each
+    page are kept so an unchanged page is never parsed twice, and a feed with
+    no changed pages keeps its current snapshot untouched. With an ingester
+    set, feeds come from the JSON API instead, with the same unchanged-feed
+    behaviour.
+    """
+
+    def __init__(self, caches: Dict[str, StoryCache], pages: int = 1,
+                 max_workers: int = 4, interval: float = 300, ingester=None):
+        self.caches = caches
+        self.pages = pages
+        self.max_workers = max_workers
+        self.interval = interval
+        # Optional hn_api.ApiIngester; feeds are scraped from HTML when unset
+        self.ingester = ingester
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._refresh_pending = False
+        self._page_stories: Dict[tuple, List[Story]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _build_feed(self, feed, page_results) -> Optional[List[Story]]:
+        """
+        Turn fetched pages into a story list, reusing parses of unchanged pages
+
+        Returns None when no page changed, and an empty list when a page is
+        missing so the caller never installs a partial feed.
+        """
+        if not all(result.ok for result in page_results):
+            logger.error(f"[{feed}] Feed pages missing, not parsing a partial feed")
+            return []
+
+        changed = False
+        page_stories = []
+        for page, result in enumerate(page_results, 1):
+            key = (feed, page)
+            if result.unchanged and key in self._page_stories:
+                page_stories.append(self._page_stories[key])
+                continue
+
+            html_content = result.html
+            if html_content is None:
+                # Unchanged upstream but never parsed here, fetch it in full
+                html_content = fetch_page(feed, page)
+                if html_content is None:
+                    return []
+            stories = parse_stories(html_content)
+            self._page_stories[key] = stories
+            page_stories.append(stories)
+            changed = True
+
+        if not changed:
+            logger.info(f"[{feed}] No pages changed, skipping parse")
+            return None
+        return merge_feed_pages(page_stories)
+
+    def refresh_all(self) -> Dict[str, bool]:
+        """Fetch and install all feeds; returns feed -> whether a new snapshot was installed"""
+        with self._lock:
+            if self.ingester is not None:
+                built = self.ingester.load_feeds(list(self.caches), self.pages * STORIES_PER_PAGE)
+            else:
+                results = fetch_feeds(list(self.caches), self.pages, self.max_workers)
+                built = {feed: self._build_feed(feed, page_results)
+                         for feed, page_results in results.items()}
+
+        installed = {}
+        for feed, stories in built.items():
+            if stories is None:
+                self.caches[feed].touch()
+                installed[feed] = False
+            else:
+                installed[feed] = self.caches[feed].install(stories)
+        return installed
+
+    def load_feed(self, feed) -> List[Story]:
+        """Fetch and build one feed on its own, e.g. for a cold cache"""
+        with self._lock:
+            if self.ingester is not None:
+                return self.ingester.load_feeds([feed], self.pages * STORIES_PER_PAGE, force=True)[feed]
+            page_results = fetch_feeds([feed], self.pages, self.max_workers)[feed]
+            stories = self._build_feed(feed, page_results)
+            if stories is None:
+                stories = merge_feed_pages(self._page_stories[(feed, page)]
+                                           for page in range(1, self.pages + 1))
+            return stories
+
+    def refresh_async(self) -> bool:
+        """Start a refresh of all feeds in the background; False if one is running"""
+        with self._state_lock:
+            if self._refresh_pending or self._lock.locked():
+                return False
+            self._refresh_pending = True
+
+        def run():
+            try:
+                self.refresh_all()
+            finally:
+                self._refresh_pending = False
+
+        thread = threading.Thread(target=run, name='feed-refresh', daemon=True)
+        thread.start()
+        return True
+
+    def start(self):
+        """Start the periodic refresher thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='feed-refresher', daemon=True)
+        self._thread.start()
+        logger.info(f"Feed refresher started for {', '.join(self.caches)} "
+                    f"({self.pages} pages each, interval: {self.interval}s)")
+
+    def stop(self):
+        """Stop the periodic refresher thread"""
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_all()
+            except Exception as e:
+                logger.error(f"Feed refresh cycle failed: {e}")
+            # Retry sooner while some feed has nothing to serve
+            cold = any(cache.snapshot is None for cache in self.caches.values())
+            self._stop.wait(min(self.interval, 30) if cold else self.interval)
+
+def _feed_loader(feed):
+    """Loader used when a single feed cache is cold and refreshed on its own"""
+    def load():
+        return feed_refresher.load_feed(feed)
+    return load
+
+# One story cache per feed
+feed_caches = {feed: StoryCache(_feed_loader(feed), name=feed) for feed in FEEDS}
+feed_refresher = FeedRefresher(feed_caches)
+
+# The homepage cache, kept under its old name
+story_cache = feed_caches['news']
+
+def find_story(story_id) -> Optional[Story]:
+    """Look a story up by id across all feed snapshots"""
+    for cache in feed_caches.values():
+        snapshot = cache.snapshot
+        if snapshot is not None and story_id in snapshot.by_id:
+            return snapshot.by_id[story_id]
+    return None
+
+def _collect(index_name, key) -> List[Story]:
+    """Gather stories from one index of every feed snapshot, once per id"""
+    stories = {}
+    for cache in feed_caches.values():
+        snapshot = cache.snapshot
+        if snapshot is not None:
+            for story in getattr(snapshot, index_name).get(key, ()):
+                stories.setdefault(story.id, story)
+    return list(stories.values())
+
+def stories_by_author(author) -> List[Story]:
+    """All cached stories submitted by a user, highest points first"""
+    return sorted(_collect('by_author', author), key=lambda story: story.points, reverse=True)
+
+def stories_from_domain(domain) -> List[Story]:
+    """All cached stories linking to a site, highest points first"""
+    return sorted(_collect('by_domain', domain.lower()), key=lambda story: story.points, reverse=True)
+
+def get_cached_stories(feed='news'):
+    """Get the current story snapshot of a feed without blocking on a refetch"""
+    return feed_caches[feed].get_stories()
+
+def refresh_story_cache():
+    """Start a background refresh of all feed caches"""
+    return feed_refresher.refresh_async()
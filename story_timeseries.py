@@ -0,0 +1,154 @@
+# Per-story points, rank and comment time series
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Sample times are stored as unsigned 32-bit seconds since this instant (2020-01-01 UTC)
+EPOCH = 1577836800
+
+class StorySeries:
+    """
+    Samples for one story in parallel typed arrays
+
+    Times are whole seconds since EPOCH, so a sample costs 14
+    bytes (4 time + 4 points + 2 rank + 4 comments) instead of a tuple of
+    Python ints. Rank 0 means the story wasn't on a ranked feed.
+    """
+    __slots__ = ('times', 'points', 'ranks', 'comments')
+
+    def __init__(self):
+        self.times = array('I')
+        self.points = array('I')
+        self.ranks = array('H')
+        self.comments = array('I')
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, t: int, points: int, rank: int, comments: int):
+        if self.times and t <= self.times[-1]:
+            # Same refresh seen through another feed: merge into the last sample
+            self.points[-1] = max(self.points[-1], points)
+            self.comments[-1] = max(self.comments[-1], comments)
+            if rank:
+                self.ranks[-1] = rank
+            return
+        self.times.append(t)
+        self.points.append(points)
+        self.ranks.append(rank)
+        self.comments.append(comments)
+
+    def downsample(self):
+        """Halve the resolution of the older half; recent samples stay exact"""
+        half = len(self.times) // 2
+        for name in self.__slots__:
+            column = getattr(self, name)
+            setattr(self, name, column[0:half:2] + column[half:])
+
+class StoryTimeSeries:
+    """
+    Rolling in-memory time series for the stories the refresher sees
+
+    Memory is bounded twice over: each story keeps at most max_samples
+    samples, older ones thinned out by downsampling, and at most max_stories
+    stories are tracked, the least recently updated evicted first.
+    """
+
+    def __init__(self, max_stories: int = 5000, max_samples: int = 240):
+        self.max_stories = max_stories
+        self.max_samples = max_samples
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _offset(self, timestamp: float) -> int:
+        return max(0, int(timestamp) - EPOCH)
+
+    def record(self, stories, timestamp: Optional[float] = None, ranked: bool = True):
+        """Add one sample per story; ranked=False keeps ranks from other feeds out"""
+        t = self._offset(timestamp or time.time())
+        with self._lock:
+            for story in stories:
+                series = self._series.get(story.id)
+                if series is None:
+                    series = self._series[story.id] = StorySeries()
+                else:
+                    self._series.move_to_end(story.id)
+                series.append(t, story.points, story.rank if ranked else 0, story.comment_count)
+                if len(series) > self.max_samples:
+                    series.downsample()
+            while len(self._series) > self.max_stories:
+                self._series.popitem(last=False)
+
+    def samples(self, story_id: str) -> List[dict]:
+        """Every sample kept for a story, oldest first"""
+        with self._lock:
+            series = self._series.get(story_id)
+            if series is None:
+                return []
+            return [{'time': EPOCH + t, 'points': p, 'rank': r or None, 'comments': c}
+                    for t, p, r, c in zip(series.times, series.points, series.ranks, series.comments)]
+
+    @staticmethod
+    def _velocity(series: StorySeries, since: int):
+        """(points/hour, comments/hour, start index) across the window, or None"""
+        last = len(series.times) - 1
+        start = min(bisect_left(series.times, since), last - 1)
+        if start < 0:
+            return None
+        hours = (series.times[last] - series.times[start]) / 3600
+        return ((series.points[last] - series.points[start]) / hours,
+                (series.comments[last] - series.comments[start]) / hours,
+                start)
+
+    def velocity(self, story_id: str, window: float = 3600) -> Optional[dict]:
+        """Points and comments per hour over the last window seconds, plus rank movement"""
+        since = self._offset(time.time() - window)
+        with self._lock:
+            series = self._series.get(story_id)
+            # Like rising(), a story not sampled inside the window has no velocity
+            if series is None or series.times[-1] < since:
+                return None
+            result = self._velocity(series, since)
+            if result is None:
+                return None
+            points_per_hour, comments_per_hour, start = result
+            ranks = [rank for rank in series.ranks[start:] if rank]
+        return {
+            'points_per_hour': round(points_per_hour, 1),
+            'comments_per_hour': round(comments_per_hour, 1),
+            'rank_change': ranks[0] - ranks[-1] if ranks else 0,  # positive = moved up
+            'best_rank': min(ranks) if ranks else None,
+            'ranks': ranks
+        }
+
+    def rising(self, limit: int = 30, window: float = 3600) -> List[dict]:
+        """Stories gaining points fastest over the last window seconds"""
+        since = self._offset(time.time() - window)
+        velocity = self._velocity
+        scored = []
+        with self._lock:
+            for story_id, series in self._series.items():
+                # Skip stories not sampled inside the window
+                if len(series.times) < 2 or series.times[-1] < since:
+                    continue
+                result = velocity(series, since)
+                if result[0] > 0:
+                    scored.append((result[0], story_id, series.points[-1]))
+        scored.sort(reverse=True)
+        return [{'story_id': story_id, 'points_per_hour': round(rate, 1), 'points': points}
+                for rate, story_id, points in scored[:limit]]
+
+    def stats(self) -> dict:
+        """Tracked stories, samples and approximate array memory"""
+        with self._lock:
+            samples = sum(len(series) for series in self._series.values())
+        return {'stories': len(self._series), 'samples': samples, 'bytes': samples * 14}
+
+# Global time series store
+story_timeseries = StoryTimeSeries()
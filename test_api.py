@@ -2,7 +2,14 @@
 # Simple test script for API endpoints
 
 from app import app
+from http_cache import CachedPayload, PageCache, negotiate
 import json
+import threading
+import time
+
+def test_import_starts_nothing():
+    assert not any(thread.name == 'feed-refresher' for thread in threading.enumerate())
+    print("✓ Importing the app started no feed refresher")
 
 def test_api():
     with app.test_client() as client:
@@ -11,6 +18,15 @@ def test_api():
         if response.status_code == 200:
             data = json.loads(response.data)
             print(f"✓ API returned {data['count']} stories, success: {data['success']}")
+
+            # Revalidating with the ETag skips the body entirely
+            etag = response.headers.get('ETag')
+            if etag:
+                cached = client.get('/api/stories', headers={'If-None-Match': etag})
+                if cached.status_code == 304:
+                    print("✓ API answered 304 for a matching ETag")
+                else:
+                    print(f"✗ API returned {cached.status_code} for a matching ETag")
         else:
             print(f"✗ API failed with status {response.status_code}")
         
@@ -22,5 +38,48 @@ def test_api():
         else:
             print(f"✗ Health check failed with status {response.status_code}")
 
+def test_negotiate():
+    payload = CachedPayload.build(json.dumps({'stories': ['x'] * 500}))
+    status, headers, body = negotiate(payload, 'gzip, deflate')
+    assert status == 200 and headers['Content-Encoding'] == 'gzip' and body == payload.gzip_body
+    status, headers, body = negotiate(payload, 'gzip;q=0')
+    assert status == 200 and 'Content-Encoding' not in headers and body == payload.body
+    status, _, body = negotiate(payload, 'gzip', headers['ETag'])
+    assert status == 304 and body == b''
+    print("✓ Raw header negotiation matches payload_response")
+
+def test_page_cache_slots():
+    cache = PageCache()
+    started = threading.Event()
+
+    def slow_build():
+        started.set()
+        time.sleep(0.5)
+        return CachedPayload.build('slow')
+
+    thread = threading.Thread(target=lambda: cache.get('zh-CN', 1, slow_build))
+    thread.start()
+    started.wait(1)
+    began = time.time()
+    assert cache.get('es', 1, lambda: CachedPayload.build('fast')).body == b'fast'
+    assert time.time() - began < 0.2
+    thread.join()
+    assert cache.get('zh-CN', 1, slow_build).body == b'slow' and cache.hits == 1
+    print("✓ A slow render only blocks its own page")
+
+    def hit_many():
+        for _ in range(2000):
+            cache.get('es', 1, slow_build)
+    threads = [threading.Thread(target=hit_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.hits == 1 + 8 * 2000 and cache.misses == 2
+    print("✓ Hit and miss counters don't lose concurrent updates")
+
 if __name__ == '__main__':
-    test_api()
\ No newline at end of file
+    test_import_starts_nothing()
+    test_api()
+    test_negotiate()
+    test_page_cache_slots()
\ No newline at end of file
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Test comment thread parsing, paging and caching
+
+import os
+import threading
+import time
+from comments import CommentCache, CommentTreeBuilder, render_page
+from data_parser import ItemPageParser
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'benchmarks', 'fixtures', 'item_1.html')
+STORY_ID = '42100000'
+
+def parse_fixture(chunk_size=4096):
+    with open(FIXTURE, 'rb') as f:
+        data = f.read()
+    parser = ItemPageParser()
+    builder = CommentTreeBuilder(STORY_ID)
+    for start in range(0, len(data), chunk_size):
+        for comment in parser.feed(data[start:start + chunk_size]):
+            builder.add(*comment)
+    for comment in parser.close():
+        builder.add(*comment)
+    return builder.build(parser.title)
+
+def test_comment_tree():
+    tree = parse_fixture()
+    assert len(tree) == 200 and tree.title == "Thread 1 & friends"
+    for index in range(len(tree)):
+        parent = tree.parents[index]
+        assert parent == -1 or tree.depths[parent] == tree.depths[index] - 1
+        assert all(tree.depths[i] > tree.depths[index] for i in range(index + 1, tree.ends[index]))
+    assert '<script>' not in tree.text and 'reply?id' not in tree.text
+    print(f"✓ Parsed {len(tree)} comments into a flat tree ({tree.nbytes()} bytes)")
+
+    pages = [render_page(tree, page, per_page=50, max_depth=100) for page in range(1, 10)]
+    assert all(len(page.rows) <= 50 for page in pages)
+    seen = [row.id for page in pages[:pages[0].page_count] for row in page.rows]
+    assert seen == list(tree.ids)
+    print(f"✓ {pages[0].page_count} pages of at most 50 cover the thread in order")
+
+    parent = next(i for i in range(len(tree)) if tree.descendants(i) > 1 and tree.depths[i] == 0)
+    folded = render_page(tree, 1, per_page=len(tree), collapsed={tree.ids[parent]}, max_depth=100)
+    assert len(folded.rows) == len(tree) - tree.descendants(parent)
+    subtree = render_page(tree, 1, root=tree.ids[parent])
+    assert subtree.total == tree.descendants(parent) + 1 and subtree.rows[0].depth == 0
+    print("✓ Collapsed and subtree views skip and select whole subtrees")
+
+def test_comment_cache():
+    calls = []
+
+    def loader(story_id):
+        calls.append(story_id)
+        time.sleep(0.1)
+        tree = parse_fixture()
+        tree.story_id = story_id
+        return tree
+
+    cache = CommentCache(loader=loader, max_comments=450, ttl=60)
+    threads = [threading.Thread(target=cache.get, args=('1',)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ['1'] and len(cache.get('1')) == 200
+    print("✓ Concurrent requests for one thread load it once")
+
+    cache.get('2')
+    cache.get('3')
+    assert cache.stats()['trees'] == 2 and cache.stats()['comments'] == 400
+    print("✓ Oldest thread evicted past the comment budget")
+
+    # A slow upstream delays the request by at most the timeout
+    release = threading.Event()
+    slow = CommentCache(loader=lambda story_id: release.wait(5) and loader(story_id))
+    started = time.time()
+    assert slow.get('4', timeout=0.05) is None and slow.loading('4')
+    assert time.time() - started < 1
+    release.set()
+    assert len(slow.get('4')) == 200 and not slow.loading('4')
+    print("✓ Cold thread loaded in the background with a bounded wait")
+
+    # Loads are capped, and a failed id isn't fetched again until missing_ttl passes
+    release.clear()
+    failures = []
+    capped = CommentCache(loader=lambda story_id: release.wait(5) and failures.append(story_id),
+                          max_loads=1, missing_ttl=60)
+    assert capped.get('5', timeout=0) is None and capped.loading('5')
+    assert capped.get('6', timeout=0) is None and not capped.loading('6')
+    release.set()
+    assert capped.get('5') is None and capped.get('5') is None
+    assert failures == ['5'] and not capped.loading('5')
+    print("✓ Comment loads bounded and failed ids remembered")
+
+def test_comments_route():
+    from app import app
+    from comments import comment_cache
+    comment_cache._store(parse_fixture())
+    with app.test_client() as client:
+        response = client.get(f'/comments?id={STORY_ID}&p=2')
+        assert response.status_code == 200 and b'Page 2 of' in response.data
+        assert client.get('/comments?id=abc').status_code == 404
+    print("✓ /comments renders a page of a cached thread")
+
+    release = threading.Event()
+    loader, timeout = comment_cache._loader, app.config['COMMENT_FETCH_TIMEOUT']
+    comment_cache._loader = lambda story_id: release.wait(5) and None
+    app.config['COMMENT_FETCH_TIMEOUT'] = 0.05
+    try:
+        with app.test_client() as client:
+            response = client.get('/comments?id=424242')
+            assert response.status_code == 200 and b'still loading' in response.data
+    finally:
+        release.set()
+        comment_cache._loader = loader
+        app.config['COMMENT_FETCH_TIMEOUT'] = timeout
+    print("✓ /comments shows a loading state while a cold thread is fetched")
+
+if __name__ == '__main__':
+    test_comment_tree()
+    test_comment_cache()
+    test_comments_route()
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+# Shared helpers for the test scripts
+
+from models import Story
+
+def make_story(story_id, rank=1, points=10, comments=0, title=None, author="pg", domain=""):
+    """A Story with defaults for every field a test doesn't care about"""
+    return Story(id=story_id, rank=rank, title=title or f"Story {story_id}",
+                 url=f"https://{domain or 'example.com'}/", domain=domain, points=points,
+                 author=author, time_ago="1 hour ago", comment_count=comments)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# Test the historical snapshot store behind /past
+
+import os
+import tempfile
+from history_store import HistoryStore, day_of
+from test_helpers import make_story
+
+def test_history_store():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'data', 'history.sqlite3')
+        store = HistoryStore(path, flush_interval=0)
+        assert not os.path.exists(os.path.dirname(path))
+        print("✓ Constructing the store left the disk alone")
+        day = '2024-06-01'
+        morning = 1717232400  # 2024-06-01 09:00 UTC
+        assert day_of(morning) == day
+
+        store.record([make_story('1', 1, 50, domain="Example.com"), make_story('2', 2, 10, domain="Example.com")], fetched_at=morning)
+        store.record([make_story('2', 1, 120, domain="Example.com"), make_story('3', 2, 5, domain="Example.com")], fetched_at=morning + 3600)
+        store.record([make_story('4', 1, 999, domain="Example.com")], fetched_at=morning + 60, feed='newest')
+        store.flush()
+
+        top = store.top_stories(day)
+        print(f"✓ {len(top)} top stories for {day}: {[(s.id, s.points) for s in top]}")
+        assert [s.id for s in top] == ['2', '1', '3']  # newest feed doesn't count
+        assert top[0].points == 120 and top[0].rank == 1
+        assert store.top_stories('2024-06-02') == []
+        assert store.story_days('2') == [day]
+        assert store.days_for_domain('example.com') == [day]
+        assert store.stats()['snapshots'] == 3
+        print("✓ History indexes answered day, story and domain queries")
+
+if __name__ == '__main__':
+    test_history_store()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Test story ingestion from the JSON API against the local mock server
+
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+import hn_api
+from data_parser import extract_domain, parse_stories
+from hn_api import ApiIngester, item_fields
+from mock_hn import start_server
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'benchmarks', 'fixtures', 'frontpage_1.html')
+
+def test_item_fields():
+    ask = item_fields({'id': 1, 'title': 'Ask HN: x', 'by': 'pg', 'score': 5, 'time': 0})
+    assert ask[2] == 'item?id=1' and ask[3] == ''
+    assert extract_domain('item?id=1') == '' and extract_domain('//www.example.com/a') == 'example.com'
+    job = item_fields({'id': 2, 'type': 'job', 'title': 'Hiring', 'url': 'https://example.com/jobs'})
+    assert job[3] == 'example.com' and job[4] == 0 and job[5] == ''
+    assert item_fields({'id': 3, 'deleted': True}) is None
+    print("✓ Text posts, jobs and deleted items mapped like the HTML parser")
+
+def test_load_feeds():
+    server, mock = start_server()
+    base_url = hn_api.HN_API_BASE_URL
+    hn_api.HN_API_BASE_URL = f"http://127.0.0.1:{server.server_port}/v0/"
+    try:
+        ingester = ApiIngester(max_workers=4)
+        stories = ingester.load_feeds(['news'], 30)['news']
+        with open(FIXTURE, encoding='utf-8') as f:
+            expected = parse_stories(f.read())
+        assert [(s.id, s.title, s.url, s.domain, s.points, s.author, s.comment_count) for s in stories] == \
+               [(s.id, s.title, s.url, s.domain, s.points, s.author, s.comment_count) for s in expected]
+        print(f"✓ API stories match the parsed page ({len(stories)} stories)")
+
+        requests = mock.requests
+        assert ingester.load_feeds(['news'], 30) == {'news': None}
+        assert mock.requests - requests == 2  # Id list and updates.json only
+        print("✓ Unchanged feed skipped without fetching items")
+
+        mock.churn(200)
+        changed = [s for s in ingester.load_feeds(['news'], 30)['news']
+                   if s.points != {e.id: e for e in expected}[s.id].points]
+        assert changed
+        print(f"✓ {len(changed)} updated stories picked up from updates.json")
+
+        # A cold single-feed load keeps the other feeds' items cached
+        mock.updates = []
+        ingester = ApiIngester(max_workers=4)
+        ingester.load_feeds(['news', 'jobs'], 30)
+        items = ingester.stats()['items']
+        ingester.load_feeds(['jobs'], 30, force=True)
+        assert ingester.stats()['items'] == items
+        requests = mock.requests
+        assert ingester.load_feeds(['news', 'jobs'], 30) == {'news': None, 'jobs': None}
+        assert mock.requests - requests == 3
+        print("✓ Loading one feed left the other feeds' items cached")
+
+        # Ages follow the clock even when nothing upstream changed
+        clock = hn_api.time
+        hn_api.time = types.SimpleNamespace(time=lambda: clock.time() + 86400)
+        try:
+            jobs = ingester.load_feeds(['jobs'], 30)['jobs']
+        finally:
+            hn_api.time = clock
+        assert jobs and all('day' in story.time_ago for story in jobs)
+        print("✓ Unchanged feed rebuilt once its displayed ages moved on")
+    finally:
+        hn_api.HN_API_BASE_URL = base_url
+        server.shutdown()
+
+if __name__ == '__main__':
+    test_item_fields()
+    test_load_feeds()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Test the metrics registry, /metrics and the non-blocking /health
+
+import threading
+import time
+from metrics import Registry, ShardedMetric
+
+def test_sharded_metrics():
+    registry = Registry()
+    hits = registry.counter('test_hits_total', 'Hits', ['kind'])
+    latency = registry.histogram('test_latency_seconds', 'Latency', ['stage'], buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            hits.inc('a')
+            latency.observe(0.5, 'fetch')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    hits.inc('b', amount=2)
+    assert hits.collect() == {('a',): 8000, ('b',): 2}
+    assert len(hits._shards) == 1  # Exited threads folded into the retired total
+    assert latency.collect()[('fetch',)][:3] == [0, 8000, 0]
+
+    text = registry.render()
+    assert 'test_hits_total{kind="a"} 8000' in text
+    assert 'test_latency_seconds_bucket{stage="fetch",le="1"} 8000' in text
+    assert 'test_latency_seconds_bucket{stage="fetch",le="+Inf"} 8000' in text
+    assert 'test_latency_seconds_count{stage="fetch"} 8000' in text
+    print("✓ Per-thread counts add up and render in the Prometheus format")
+
+    class Unmerged(ShardedMetric):
+        pass
+    try:
+        Unmerged('test_unmerged', 'No _add')
+        assert False, "a metric without _add() was constructed"
+    except TypeError:
+        print("✓ Metrics without _add() are rejected when constructed")
+
+def test_metrics_endpoint():
+    from app import app
+    from story_cache import FeedRefresher, feed_caches
+    with app.test_client() as client:
+        started = time.time()
+        response = client.get('/health')
+        assert time.time() - started < 1 and response.status_code in (200, 503)
+        assert 'feeds' in response.get_json()
+        print(f"✓ Health answered without fetching: {response.get_json()['status']}")
+
+        class FailingIngester:
+            def load_feeds(self, feeds, count, force=False):
+                return {feed: [] for feed in feeds}
+
+        refresher = FeedRefresher({'jobs': feed_caches['jobs']}, ingester=FailingIngester())
+        try:
+            assert refresher.refresh_all() == {'jobs': False}
+            assert client.get('/health').get_json()['feeds']['jobs']['error']
+            refresher.ingester.load_feeds = lambda feeds, count, force=False: {feed: None for feed in feeds}
+            refresher.refresh_all()
+            assert client.get('/health').get_json()['feeds']['jobs']['error'] is None
+        finally:
+            feed_caches['jobs'].last_error = None
+        print("✓ A failing feed refresh shows up in /health until the next good check")
+
+        text = client.get('/metrics').get_data(as_text=True)
+        assert 'hn_http_requests_total{route="/health",method="GET",status=' in text
+        assert '# TYPE hn_stage_duration_seconds histogram' in text
+        assert 'hn_translation_cache_hit_ratio' in text
+        print("✓ /metrics exposes route, stage and cache metrics")
+
+if __name__ == '__main__':
+    test_sharded_metrics()
+    test_metrics_endpoint()
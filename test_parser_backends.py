@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# Test that every parser backend produces the same stories
+
+import os
+from data_parser import PARSER_BACKENDS, parse_stories
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'benchmarks', 'fixtures', 'frontpage_1.html')
+
+def test_parser_backends():
+    with open(FIXTURE, encoding='utf-8') as f:
+        html_content = f.read()
+
+    reference = [story.to_dict() for story in parse_stories(html_content, backend='bs4')]
+    print(f"✓ bs4 parsed {len(reference)} stories")
+    assert reference
+
+    for name in PARSER_BACKENDS:
+        result = [story.to_dict() for story in parse_stories(html_content, backend=name)]
+        if result == reference:
+            print(f"✓ {name} output matches bs4")
+        else:
+            print(f"✗ {name} output differs from bs4")
+        assert result == reference
+
+if __name__ == '__main__':
+    test_parser_backends()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Test on-demand request profiling and the admin listing
+
+import logging
+import os
+import tempfile
+import time
+from profiling import RequestProfiler, redact_access_logs
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+def test_request_profiler():
+    profile_dir = tempfile.mkdtemp(prefix='profiles-')
+    profiler = RequestProfiler(token='secret', profile_dir=profile_dir, keep=1)
+    assert profiler.start('wrong') is None and profiler.start(None) is None
+
+    for path, seconds in (('/slow', 0.05), ('/fast', 0.01)):
+        active = profiler.start('secret')
+        busy(seconds)
+        profiler.record('GET', path, 200, seconds, active)
+    profiler.record('GET', '/unprofiled', 200, 0.02)
+
+    slowest = profiler.slowest()
+    assert [entry.path for entry in slowest] == ['/slow', '/unprofiled', '/fast']
+    assert profiler.profile_path(slowest[0].profile_id, '.prof') is None  # Past keep, deleted
+    folded = profiler.profile_path(slowest[2].profile_id, '.folded')
+    with open(folded, encoding='utf-8') as f:
+        assert any(line.split(';')[0].endswith('(busy)') for line in f)
+    assert len(os.listdir(profile_dir)) == 2
+    print(f"✓ Profiles written and pruned, top function: {slowest[2].top_functions[0]['function']}")
+
+def test_admin_profiles():
+    from app import app
+    from profiling import request_profiler
+    request_profiler.token = 'secret'
+    request_profiler.profile_dir = tempfile.mkdtemp(prefix='profiles-')
+    try:
+        with app.test_client() as client:
+            client.get('/login?_profile=secret')
+            assert client.get('/admin/profiles').status_code == 404
+            data = client.get('/admin/profiles?profiled=true', headers={'X-Profile': 'secret'}).get_json()
+            assert data['count'] == 1 and data['requests'][0]['path'] == '/login'
+            assert any('(login)' in function['function'] for function in data['requests'][0]['top_functions'])
+            assert client.get(data['requests'][0]['files']['prof'] + '?_profile=secret').status_code == 200
+        print("✓ Admin listing links the profile of a token-triggered request")
+    finally:
+        request_profiler.token = ''
+
+def test_access_log_redaction():
+    records = []
+    handler = logging.Handler()
+    handler.emit = lambda record: records.append(record.getMessage())
+    access_logger = logging.getLogger('test.access')
+    access_logger.addHandler(handler)
+    access_logger.setLevel(logging.INFO)
+    redact_access_logs(('test.access',))
+    access_logger.info('"%s" %s %s', 'GET /?lang=ja&_profile=secret&p=2 HTTP/1.1', 200, '-')
+    access_logger.removeHandler(handler)
+    assert records == ['"GET /?lang=ja&_profile=<redacted>&p=2 HTTP/1.1" 200 -']
+    print("✓ Profiling token redacted from access log lines")
+
+if __name__ == '__main__':
+    test_request_profiler()
+    test_admin_profiles()
+    test_access_log_redaction()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# Test the full-text search index
+
+import time
+from search_index import SearchIndex, tokenize
+from test_helpers import make_story
+
+def test_search_index():
+    assert tokenize("Rust数据库") == ['rust', '数据', '据库']
+
+    index = SearchIndex()
+    now = time.time()
+    index.add_stories([
+        make_story('1', title="A fast database written in Rust", points=500),
+        make_story('2', title="Rust database internals", points=5),
+        make_story('3', title="Postgres tips", author="dang", domain="postgresql.org"),
+    ], seen_at=now)
+
+    results = [doc.story_id for doc, _ in index.search("rust database", now=now)]
+    print(f"✓ 'rust database' matched {results}")
+    assert results == ['1', '2']  # Both match; points break the near tie
+    assert [doc.story_id for doc, _ in index.search("dang")] == ['3']
+    assert [doc.story_id for doc, _ in index.search("postgresql")] == ['3']
+    assert index.search("rust postgres") == []
+
+    index.add_translation('3', 'zh-CN', "Postgres 技巧")
+    assert [doc.story_id for doc, _ in index.search("技巧")] == ['3']
+    index.add(make_story('3', title="MySQL tips", author="dang"), seen_at=now + 1)
+    assert index.search("技巧") == [] and index.search("mysql")
+    print("✓ Translations indexed and edited titles reindexed")
+
+if __name__ == '__main__':
+    test_search_index()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Test background story cache refresh
+
+import os
+import threading
+import time
+import scraper
+from story_cache import FeedRefresher, StoryCache
+from test_helpers import make_story
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'benchmarks', 'fixtures', 'frontpage_1.html')
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers or {})
+        return self.responses.pop(0)
+
+def test_story_cache():
+    results = [[make_story('1', 1), make_story('2', 2)], [], None]
+
+    def loader():
+        result = results.pop(0)
+        if result is None:
+            raise RuntimeError("network down")
+        return result
+
+    cache = StoryCache(loader, initial_wait=5)
+    stories = cache.get_stories()
+    print(f"✓ Cold cache loaded {len(stories)} stories")
+    assert len(stories) == 2
+    version = cache.snapshot.version
+
+    # An empty fetch and a failing fetch both keep the last good snapshot
+    assert cache.refresh() is False
+    assert cache.refresh() is False
+    assert cache.snapshot.version == version
+    assert len(cache.get_stories()) == 2
+    print("✓ Failed refreshes kept the last good snapshot")
+
+    # Async refresh returns immediately
+    results.append([make_story('3', 1)])
+    started = time.time()
+    assert cache.refresh_async() is True
+    assert time.time() - started < 0.5
+    for _ in range(50):
+        if cache.snapshot.version > version:
+            break
+        time.sleep(0.01)
+    assert [s.id for s in cache.get_stories()] == ['3']
+    print("✓ Async refresh swapped in the new snapshot")
+
+def test_translation_carry_over():
+    cache = StoryCache(lambda: [])
+    first = [make_story('1', 1), make_story('2', 2)]
+    first[0].set_translated_title('译 一')
+    first[1].set_translated_title('译 二')
+    first[1].set_translated_title('訳 二', 'ja')
+    first.append(make_story('3', 3))
+    first[2].set_translated_title(first[2].title)  # Translates to itself, still a translation
+    cache.install(first)
+
+    second = [make_story('1', 1), make_story('2', 2), make_story('3', 3)]
+    second[0].title = 'Edited title'
+    snapshots = []
+    cache.add_listener(snapshots.append)
+    cache.install(second)
+
+    assert second[0].translated_title is None
+    assert second[1].translations == {'zh-CN': '译 二', 'ja': '訳 二'}
+    assert second[2].translated_title == second[2].title
+    assert snapshots and snapshots[0].stories is second
+    print("✓ Unchanged stories kept their translations, the edited story did not")
+
+def test_conditional_refresh():
+    with open(FIXTURE, encoding='utf-8') as f:
+        html_content = f.read()
+
+    session = FakeSession([
+        FakeResponse(200, html_content, {'ETag': '"v1"'}),
+        FakeResponse(304),
+        FakeResponse(200, html_content, {'ETag': '"v2"'}),
+    ])
+    previous_session = scraper._session
+    scraper._session = session
+    scraper.reset_validators()
+    try:
+        cache = StoryCache(lambda: [], name='news')
+        refresher = FeedRefresher({'news': cache}, pages=1)
+
+        assert refresher.refresh_all() == {'news': True}
+        version = cache.snapshot.version
+        print(f"✓ First fetch installed v{version}")
+
+        # 304 and an identical body both keep the snapshot without reparsing
+        assert refresher.refresh_all() == {'news': False}
+        assert session.requests[1].get('If-None-Match') == '"v1"'
+        assert refresher.refresh_all() == {'news': False}
+        assert cache.snapshot.version == version
+        print("✓ Unchanged pages skipped the parse")
+    finally:
+        scraper._session = previous_session
+        scraper.reset_validators()
+
+def test_refresh_async_single_flight():
+    refresher = FeedRefresher({})
+    release = threading.Event()
+    calls = []
+    refresher.refresh_all = lambda: (calls.append(1), release.wait(5))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(refresher.refresh_async())) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+    assert results.count(True) == 1
+    time.sleep(0.1)
+    assert calls == [1] and refresher.refresh_async()
+    print("✓ Concurrent refresh_async calls started one refresh")
+
+if __name__ == '__main__':
+    test_story_cache()
+    test_translation_carry_over()
+    test_conditional_refresh()
+    test_refresh_async_single_flight()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# Test per-story time series and velocity metrics
+
+import time
+from story_timeseries import StoryTimeSeries
+from test_helpers import make_story
+
+def test_story_timeseries():
+    series = StoryTimeSeries(max_stories=3, max_samples=8)
+    now = time.time()
+    for minute in range(0, 60, 10):
+        series.record([make_story('fast', 10 - minute // 10, 10 + minute * 2, minute),
+                       make_story('slow', 20, 10 + minute // 10)], now - 3000 + minute * 60)
+
+    velocity = series.velocity('fast')
+    print(f"✓ Fast story: {velocity['points_per_hour']} points/hour, ranks {velocity['ranks']}")
+    assert velocity['points_per_hour'] == 120.0
+    assert velocity['rank_change'] == 5 and velocity['best_rank'] == 5
+    assert [entry['story_id'] for entry in series.rising()] == ['fast', 'slow']
+
+    stale = StoryTimeSeries()
+    stale.record([make_story('old', 1, 10)], now - 7200)
+    stale.record([make_story('old', 1, 50)], now - 6600)
+    assert stale.velocity('old') is None and stale.rising() == []
+    print("✓ Stories last sampled before the window have no velocity")
+
+    # Bounded memory: samples are downsampled, old stories evicted
+    for minute in range(60, 120):
+        series.record([make_story('fast', 1, 200 + minute)], now - 3000 + minute * 60)
+    assert len(series.samples('fast')) <= 8
+    series.record([make_story(str(i), 1, 1) for i in range(3)], now)
+    assert series.samples('fast') == [] and series.stats()['stories'] == 3
+    print("✓ Samples downsampled and least recently updated stories evicted")
+
+if __name__ == '__main__':
+    test_story_timeseries()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# Test translation progress endpoints
+
+import os
+import tempfile
+import time
+from app import app
+from test_helpers import make_story
+from translation_backends import LocalStubBackend, TranslationBackend, get_backend
+from translation_store import TranslationStore
+from translator import TokenBucket, TranslationService, translator_service
+
+def test_translation_events():
+    service = TranslationService(store=TranslationStore(':memory:'))
+    service._apply_translation(make_story('1'), '故事 1')
+    service._apply_translation(make_story('2'), '故事 2')
+
+    events, complete = service.events_since(1)
+    assert complete and [event['story_id'] for event in events] == ['2']
+    print(f"✓ Resuming from version 1 returned {len(events)} event")
+
+    events, complete = service.events_since(99)
+    assert not complete
+    print("✓ Cursor from before a restart asks for a resync")
+
+    service._apply_translation(make_story('3'), 'Historia 3', 'es')
+    assert service.language_version('zh-CN') == 2 and service.language_version('es') == 1
+    print("✓ Page versions move per language")
+
+def test_translation_progress():
+    service = TranslationService(store=TranslationStore(':memory:'))
+    stories = [make_story('1'), make_story('2'), make_story('3')]
+    assert service.progress(stories) == (0, 3)
+
+    service._apply_translation(stories[0], '故事 1')
+    service._apply_translation(stories[0], '故事 1')  # Re-translation doesn't count twice
+    service._apply_translation(make_story('2'), '故事 2')  # Same id, other snapshot
+    assert service.progress(stories) == (1, 3)
+    print("✓ Progress counter tracks translations of the current stories")
+
+def test_translation_store():
+    store = TranslationStore(':memory:', max_entries=2, memory_entries=1)
+    store.put('Hello  world', 'auto', 'zh-CN', '你好世界')
+    assert store.get('Hello world', 'auto', 'zh-CN') == '你好世界'  # Whitespace-normalized key
+    assert store.get('Hello world', 'auto', 'ja') is None
+    print(f"✓ Translation store hits and misses: {store.stats()}")
+
+    store.put('a', 'auto', 'zh-CN', 'A')
+    store.put('b', 'auto', 'zh-CN', 'B')
+    store.trim()
+    assert store.get('a', 'auto', 'zh-CN') == 'A'
+    assert store._connect().execute('SELECT COUNT(*) FROM translations').fetchone()[0] == 2
+    print("✓ Translation store evicted down to its size bound")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'data', 'translations.sqlite3')
+        lazy = TranslationStore(path)
+        assert not os.path.exists(os.path.dirname(path))
+        lazy.put('a', 'auto', 'zh-CN', 'A')
+        assert os.path.exists(path)
+    print("✓ Translation store opened its database on first use")
+
+    # Hits only note last_used in memory; the next write stores it
+    store = TranslationStore(':memory:', memory_entries=1)
+    store.put('old', 'auto', 'zh-CN', '旧')
+    store.put('new', 'auto', 'zh-CN', '新')
+    conn = store._connect()
+    conn.execute('UPDATE translations SET last_used = 0')
+    assert store.get('old', 'auto', 'zh-CN') == '旧'
+    assert conn.execute("SELECT MAX(last_used) FROM translations").fetchone()[0] == 0
+    store.put('other', 'auto', 'zh-CN', '别的')
+    used = dict(conn.execute('SELECT translated, last_used FROM translations').fetchall())
+    assert used['旧'] > 0 and used['新'] == 0
+    print("✓ Cache hits update last_used in batches, not on every read")
+
+class FakeTranslator:
+    """Stands in for GoogleTranslator; prefixes every line of the payload"""
+
+    def __init__(self, merge_lines=False):
+        self.payloads = []
+        self.merge_lines = merge_lines
+
+    def translate(self, payload):
+        self.payloads.append(payload)
+        time.sleep(0.01)
+        if self.merge_lines:
+            return ' '.join(f"译 {line}" for line in payload.split('\n'))
+        return '\n'.join(f"译 {line}" for line in payload.split('\n'))
+
+def make_service(translator):
+    service = TranslationService(store=TranslationStore(':memory:'))
+    service._get_translator = lambda target_lang, source_lang: translator
+    service.rate_limiter = TokenBucket(rate=1000, capacity=100)
+    return service
+
+def test_translation_queue():
+    translator = FakeTranslator()
+    service = make_service(translator)
+    service.worker_count = 1
+    stories = [make_story(str(i)) for i in range(6)]
+
+    queued = service.translate_stories_smart(stories, priority_count=2)
+    duplicate = service.translate_stories_smart(stories, priority_count=2)
+    service.wait_until_idle()
+    print(f"✓ Queued {queued} stories, duplicate request queued {duplicate}")
+    assert queued == 6 and duplicate == 0
+    assert all(story.translated_title == f"译 {story.title}" for story in stories)
+    assert set(translator.payloads[0].split('\n')) <= {'Story 0', 'Story 1'}
+    print(f"✓ Priority stories translated first, {len(translator.payloads)} upstream requests")
+
+def test_multi_language():
+    service = make_service(FakeTranslator())
+    stories = [make_story(str(i)) for i in range(4)]
+
+    service.translate_stories_smart(stories, priority_count=1, lang='ja')
+    service.wait_until_idle()
+    assert service.progress(stories, 'ja') == (4, 4)
+    assert service.progress(stories, 'zh-CN') == (0, 4)
+    assert stories[0].get_translation('ja') and stories[0].translated_title is None
+
+    events, complete = service.events_since(0, 'zh-CN')
+    assert complete and events == []
+    print("✓ Japanese translations are kept apart from Chinese ones")
+
+    with app.test_client() as client:
+        response = client.get('/api/translation-status?lang=xx')
+        assert response.status_code == 400
+    print("✓ Unsupported language rejected")
+
+def test_translate_batch():
+    translator = FakeTranslator()
+    service = make_service(translator)
+    titles = [f"Title number {i}" for i in range(30)]
+    assert service.translate_batch(titles) == [f"译 {title}" for title in titles]
+    assert len(translator.payloads) == 1
+    assert service.translate_batch(titles[:3]) == [f"译 {title}" for title in titles[:3]]
+    assert len(translator.payloads) == 1  # Answered from the store
+    print("✓ 30 titles translated in one request")
+
+    # Replies that don't split back into lines fall back to one request per title
+    translator = FakeTranslator(merge_lines=True)
+    service = make_service(translator)
+    assert service.translate_batch(titles[:3]) == [f"译 {title}" for title in titles[:3]]
+    assert len(translator.payloads) == 4
+    print("✓ Unsplittable batch fell back to per-title requests")
+
+    class BrokenTranslator:
+        def translate(self, payload):
+            raise RuntimeError('upstream down')
+
+    service = make_service(BrokenTranslator())
+    assert service.translate_batch(titles[:3]) == [None, None, None]
+    stories = [make_story(str(i)) for i in range(3)]
+    service.translate_stories_smart(stories, priority_count=1)
+    service.wait_until_idle()
+    assert service.progress(stories) == (0, 3) and stories[0].translated_title is None
+    print("✓ Failed translations come back as None and leave stories untranslated")
+
+def test_untranslatable_titles():
+    class EchoTranslator:
+        def translate(self, payload):
+            return payload
+
+    service = make_service(EchoTranslator())
+    stories = [make_story(str(i)) for i in range(3)]
+    assert service.translate_stories_smart(stories, priority_count=1) == 3
+    service.wait_until_idle()
+    assert service.progress(stories) == (3, 3)
+    assert service.translate_stories_smart(stories, priority_count=1) == 0
+    assert stories[0].get_display_title(True) == stories[0].title
+    print("✓ Titles that translate to themselves count as done and aren't requeued")
+
+def test_stub_backend():
+    assert get_backend('stub', 'auto', 'ja') is get_backend('stub', 'auto', 'ja')
+    assert get_backend('stub', 'auto', 'ja') is not get_backend('stub', 'auto', 'de')
+
+    backend = LocalStubBackend('auto', 'ja', latency=0, failure_rate=0)
+    assert backend.translate('one\ntwo') == '[ja] one\n[ja] two'
+    flaky = LocalStubBackend('auto', 'ja', latency=0, failure_rate=0.5)
+    outcomes = []
+    for _ in range(2):
+        try:
+            flaky.translate('same text')
+            outcomes.append(True)
+        except RuntimeError:
+            outcomes.append(False)
+    assert outcomes[0] == outcomes[1]
+    print("✓ Stub backend is cached per language pair and deterministic")
+
+    class Incomplete(TranslationBackend):
+        name = 'incomplete'
+    try:
+        Incomplete()
+        assert False, "a backend without translate() was constructed"
+    except TypeError:
+        print("✓ Backends without translate() are rejected when constructed")
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    elapsed = time.monotonic() - started
+    print(f"✓ Token bucket paced 6 requests in {elapsed:.2f}s")
+    assert elapsed >= 0.09
+
+def test_translation_stream():
+    max_duration = app.config['SSE_MAX_STREAM_SECONDS']
+    app.config['SSE_MAX_STREAM_SECONDS'] = 0
+    with app.test_client() as client:
+        try:
+            response = client.get('/api/translations/stream',
+                                  headers={'Last-Event-ID': str(translator_service.version)})
+            body = response.data.decode('utf-8')
+        finally:
+            app.config['SSE_MAX_STREAM_SECONDS'] = max_duration
+        if response.mimetype == 'text/event-stream' and 'event: progress' in body:
+            print("✓ Translation stream sent a progress event")
+        else:
+            print("✗ Translation stream missing progress event")
+        assert response.mimetype == 'text/event-stream'
+
+if __name__ == '__main__':
+    test_translation_events()
+    test_translation_progress()
+    test_translation_store()
+    test_translation_queue()
+    test_multi_language()
+    test_translate_batch()
+    test_untranslatable_titles()
+    test_stub_backend()
+    test_token_bucket()
+    test_translation_stream()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Test user profile parsing and the profile cache
+
+import threading
+import time
+from data_parser import parse_user_profile
+from models import UserProfile
+from users import UserCache
+
+PROFILE_PAGE = """<html><body><table><tr><td><table border="0">
+<tr class="athing" id="pg"><td valign="top">user:</td><td timestamp="1160418092"><a href="user?id=pg" class="hnuser">pg</a></td></tr>
+<tr><td valign="top">created:</td><td><a href="front?day=2006-10-09&amp;birth=pg">October 9, 2006</a></td></tr>
+<tr><td valign="top">karma:</td><td>157316</td></tr>
+<tr><td valign="top">about:</td><td>Bug fixer.<p><a href="https://example.com">site</a><script>x()</script></td></tr>
+<tr><td></td><td><a href="submitted?id=pg"><u>submissions</u></a></td></tr>
+</table></td></tr></table></body></html>"""
+
+def test_parse_user_profile():
+    profile = parse_user_profile(PROFILE_PAGE, 'pg')
+    assert profile.exists and profile.karma == 157316 and profile.created == "October 9, 2006"
+    assert profile.created_at == 1160418092 and '<script>' not in profile.about
+    assert not parse_user_profile("<html><body>No such user.</body></html>", 'nobody').exists
+    print("✓ Profile page parsed, unknown users detected")
+
+def test_user_cache():
+    calls = []
+
+    def loader(username):
+        calls.append(username)
+        time.sleep(0.1)
+        return UserProfile(username=username, karma=1, exists=username != 'ghost')
+
+    cache = UserCache(loader=loader, max_entries=2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('pg'))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ['pg'] and all(profile.karma == 1 for profile in results)
+    assert cache.get('pg') is results[0] and len(calls) == 1
+    print(f"✓ 10 concurrent misses made one fetch ({cache.stats()})")
+
+    assert not cache.get('ghost').exists
+    cache.get('ghost')
+    assert calls.count('ghost') == 1
+    cache.get('dang')
+    assert cache.stats()['entries'] == 2 and cache.get('pg', timeout=1) is not results[0]
+    print("✓ Unknown users cached, oldest profile evicted")
+
+def test_user_route():
+    from app import app
+    with app.test_client() as client:
+        assert client.get('/user/not a name!').status_code == 404
+    print("✓ Invalid usernames are rejected without a fetch")
+
+if __name__ == '__main__':
+    test_parse_user_profile()
+    test_user_cache()
+    test_user_route()
@@ -0,0 +1,89 @@
+# Translation backends
+from abc import ABC, abstractmethod
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class TranslationBackend(ABC):
+    """One translation engine for a fixed language pair"""
+
+    name = 'base'
+
+    def __init__(self, source_lang: str = 'auto', target_lang: str = 'zh-CN'):
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+
+    @abstractmethod
+    def translate(self, text: str) -> str:
+        """Translate text; may contain newline-separated lines which must be kept"""
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate via deep-translator"""
+
+    name = 'google'
+
+    def __init__(self, source_lang='auto', target_lang='zh-CN'):
+        super().__init__(source_lang, target_lang)
+        from deep_translator import GoogleTranslator
+        self._translator = GoogleTranslator(source=source_lang, target=target_lang)
+
+    def translate(self, text):
+        return self._translator.translate(text)
+
+class LocalStubBackend(TranslationBackend):
+    """
+    Deterministic offline stand-in for load tests and benchmarks
+
+    Each line comes back as "[<target>] <line>". Latency is a fixed cost per
+    request plus a cost per character, and failures are picked from a hash
+    of the text, so the same input always fails or succeeds the same way.
+    """
+
+    name = 'stub'
+
+    def __init__(self, source_lang='auto', target_lang='zh-CN', latency: float = None,
+                 per_char_latency: float = None, failure_rate: float = None):
+        super().__init__(source_lang, target_lang)
+        self.latency = latency if latency is not None else float(
+            os.environ.get('TRANSLATION_STUB_LATENCY', 0.05))
+        self.per_char_latency = per_char_latency if per_char_latency is not None else float(
+            os.environ.get('TRANSLATION_STUB_PER_CHAR_LATENCY', 0))
+        self.failure_rate = failure_rate if failure_rate is not None else float(
+            os.environ.get('TRANSLATION_STUB_FAILURE_RATE', 0))
+        self.requests = 0
+
+    def translate(self, text):
+        self.requests += 1
+        time.sleep(self.latency + self.per_char_latency * len(text))
+        if self.failure_rate:
+            bucket = int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+            if bucket < self.failure_rate:
+                raise RuntimeError("Simulated upstream failure")
+        return '\n'.join(f"[{self.target_lang}] {line}" for line in text.split('\n'))
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    LocalStubBackend.name: LocalStubBackend,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_backend(name: str, source_lang: str = 'auto', target_lang: str = 'zh-CN') -> TranslationBackend:
+    """Shared backend instance for a language pair, created on first use"""
+    key = (name, source_lang, target_lang)
+    backend = _instances.get(key)
+    if backend is None:
+        with _instances_lock:
+            backend = _instances.get(key)
+            if backend is None:
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown translation backend '{name}'")
+                backend = BACKENDS[name](source_lang, target_lang)
+                _instances[key] = backend
+                logger.info(f"Created {name} translation backend for {source_lang} -> {target_lang}")
+    return backend
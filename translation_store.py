@@ -0,0 +1,197 @@
+# Persistent translation cache shared across processes
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share one cache entry"""
+    text = unicodedata.normalize('NFC', text)
+    return ' '.join(text.split())
+
+def translation_key(text: str, source_lang: str, target_lang: str) -> str:
+    """Stable cache key for a text and language pair"""
+    raw = f"{source_lang}\0{target_lang}\0{normalize_text(text)}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class TranslationStore:
+    """
+    Two-tier translation cache: an in-process LRU in front of SQLite.
+
+    The SQLite file runs in WAL mode so every worker process can read it
+    while another one writes, and writes are single INSERT OR REPLACE
+    statements, so concurrent workers caching the same title never race.
+    The table is kept under max_entries by evicting the least recently used
+    rows. Lookups never write: the last_used times of hits are collected in
+    memory and written in one transaction with the next put, or once
+    TOUCH_FLUSH_SIZE hits or TOUCH_FLUSH_SECONDS have gone by. A path of
+    ':memory:' gives each thread its own throwaway database, which is only
+    useful for tests.
+    """
+
+    TOUCH_FLUSH_SIZE = 500
+    TOUCH_FLUSH_SECONDS = 60
+
+    def __init__(self, path: str, max_entries: int = 50000, memory_entries: int = 2000):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._local = threading.local()
+        self._puts_since_trim = 0
+        self._touched = {}  # key -> last hit time not yet written to disk
+        self._touched_since = time.time()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        """One connection per thread, opened on first use; sqlite3 connections aren't shareable"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            if self.path != ':memory:':
+                conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._create_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _create_schema(conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                translated TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)')
+
+    def _remember(self, key, translated):
+        with self._memory_lock:
+            self._memory[key] = translated
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, text: str, source_lang: str = 'auto', target_lang: str = 'zh-CN') -> Optional[str]:
+        """Cached translation of text, or None"""
+        key = translation_key(text, source_lang, target_lang)
+        with self._memory_lock:
+            translated = self._memory.get(key)
+            if translated is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self._touched[key] = time.time()
+        if translated is not None:
+            self._maybe_flush_touches()
+            return translated
+
+        try:
+            row = self._connect().execute('SELECT translated FROM translations WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Translation store read failed: {e}")
+            row = None
+
+        with self._memory_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._touched[key] = time.time()
+        self._remember(key, row[0])
+        self._maybe_flush_touches()
+        return row[0]
+
+    def _maybe_flush_touches(self):
+        if (len(self._touched) >= self.TOUCH_FLUSH_SIZE
+                or time.time() - self._touched_since >= self.TOUCH_FLUSH_SECONDS):
+            self.flush_touches()
+
+    def flush_touches(self):
+        """Write the collected last_used times of cache hits in one transaction"""
+        with self._memory_lock:
+            touched, self._touched = self._touched, {}
+            self._touched_since = time.time()
+        if not touched:
+            return
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN')
+            conn.executemany('UPDATE translations SET last_used = ? WHERE key = ?',
+                             [(used, key) for key, used in touched.items()])
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            logger.error(f"Translation store last_used update failed: {e}")
+            try:
+                conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+
+    def put(self, text: str, source_lang: str, target_lang: str, translated: str):
+        """Cache a translation in memory and on disk"""
+        key = translation_key(text, source_lang, target_lang)
+        self._remember(key, translated)
+        self.flush_touches()
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO translations (key, source_lang, target_lang, translated, last_used) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, source_lang, target_lang, translated, time.time()))
+        except sqlite3.Error as e:
+            logger.error(f"Translation store write failed: {e}")
+            return
+
+        # Checking the table size on every write would cost a full count
+        self._puts_since_trim += 1
+        if self._puts_since_trim >= 100:
+            self._puts_since_trim = 0
+            self.trim()
+
+    def trim(self):
+        """Evict least recently used rows beyond max_entries"""
+        self.flush_touches()
+        try:
+            conn = self._connect()
+            count = conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute('DELETE FROM translations WHERE key IN '
+                             '(SELECT key FROM translations ORDER BY last_used LIMIT ?)', (excess,))
+                logger.info(f"Evicted {excess} translations from the store")
+        except sqlite3.Error as e:
+            logger.error(f"Translation store trim failed: {e}")
+
+    def clear(self):
+        """Drop every cached translation"""
+        with self._memory_lock:
+            self._memory.clear()
+            self._touched.clear()
+        self._connect().execute('DELETE FROM translations')
+
+    def stats(self) -> dict:
+        """Hit/miss counters for both tiers"""
+        with self._memory_lock:
+            memory_hits, disk_hits, misses = self.memory_hits, self.disk_hits, self.misses
+            memory_entries = len(self._memory)
+        lookups = memory_hits + disk_hits + misses
+        return {
+            'memory_hits': memory_hits,
+            'disk_hits': disk_hits,
+            'misses': misses,
+            'hit_ratio': round((memory_hits + disk_hits) / lookups, 3) if lookups else 0,
+            'memory_entries': memory_entries
+        }
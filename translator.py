@@ -1,30 +1,110 @@
 # Translation service module
-from deep_translator import GoogleTranslator
+from translation_backends import get_backend
+from translation_store import TranslationStore
+from metrics import stage_latency
+import itertools
 import logging
+import os
+import queue
 import time
 import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Optional, List, Tuple
 from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter
+
+    Each acquire() reserves a token under the lock and then sleeps outside
+    it for however long that token takes to refill, so concurrent callers
+    are spaced out to the configured rate without serializing on the lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, waiting until it is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+DEFAULT_LANGUAGE = 'zh-CN'
+
+# Target languages offered in the UI and accepted by the lang= parameter
+SUPPORTED_LANGUAGES = {
+    'zh-CN': '简体中文',
+    'zh-TW': '繁體中文',
+    'ja': '日本語',
+    'ko': '한국어',
+    'de': 'Deutsch',
+    'fr': 'Français',
+    'es': 'Español',
+}
+
+# Queue bands: interactive priority titles, the rest of a request, prewarm
+PRIORITY_BAND, BACKGROUND_BAND, PREWARM_BAND = 0, 1, 2
+
+class LanguageQueue:
+    """Work queue, in-flight set, workers and progress counter for one target language"""
+
+    def __init__(self, lang: str):
+        self.lang = lang
+        # (band, rank, seq, story)
+        self.queue = queue.PriorityQueue()
+        # (story id, title) queued or being translated -> newer copies of that story
+        # from later snapshots, which get the translation too when it lands
+        self.inflight = {}
+        self.workers = []
+        # Progress of the story list most recently asked about, kept incrementally
+        self.tracked_stories = None
+        self.tracked_by_id = {}
+        self.translated_count = 0
+
 class TranslationService:
-    """Translation service using Google Translate API via deep-translator"""
+    """Translation service on a pluggable backend (Google Translate by default)"""
+
+    # Google rejects payloads over 5000 characters
+    MAX_BATCH_CHARS = 4500
+    MAX_BATCH_ITEMS = 50
     
-    def __init__(self):
-        self.translator = GoogleTranslator(source='auto', target='zh-CN')
-        self.cache = {}  # Simple in-memory cache
-        self.last_request_time = 0
-        self.min_request_interval = 0.1  # Minimum 100ms between requests
+    def __init__(self, store: Optional[TranslationStore] = None, backend: Optional[str] = None):
+        self.backend = backend or os.environ.get('TRANSLATION_BACKEND', 'google')
+        # Persistent cache shared by all workers and restarts
+        self.cache = store or TranslationStore(
+            os.environ.get('TRANSLATION_CACHE_PATH', 'instance/translations.sqlite3'),
+            max_entries=int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', 50000)))
+        # Upstream request budget shared by every worker thread
+        self.rate_limiter = TokenBucket(
+            rate=float(os.environ.get('TRANSLATION_RATE', 10)),
+            capacity=float(os.environ.get('TRANSLATION_BURST', 5)))
+        self.worker_count = int(os.environ.get('TRANSLATION_WORKERS', 4))
+        self.batch_size = int(os.environ.get('TRANSLATION_BATCH_SIZE', 30))
+        self._languages: Dict[str, LanguageQueue] = {}
+        self._sequence = itertools.count()
+        self._inflight_lock = threading.Lock()
+        self.version = 0  # Bumped whenever a story translation lands
+        self._language_versions: Dict[str, int] = {}  # lang -> translations landed in it
+        self._events = deque(maxlen=1000)  # Recent translation events, oldest first
+        self._events_changed = threading.Condition()
+        self._listeners = []  # Called with (story, lang, translated_title) after each translation
     
     def _rate_limit(self):
-        """Simple rate limiting to avoid hitting API limits"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last)
-        self.last_request_time = time.time()
+        """Wait for an upstream request token"""
+        self.rate_limiter.acquire()
     
     def translate_text(self, text: str, target_lang: str = 'zh-CN', source_lang: str = 'auto') -> Optional[str]:
         """
@@ -41,178 +121,341 @@ class TranslationService:
         if not text or not text.strip():
             return text
             
-        # Create cache key
-        cache_key = f"{text}:{source_lang}:{target_lang}"
-        
         # Check cache first
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cached = self.cache.get(text, source_lang, target_lang)
+        if cached is not None:
+            return cached
         
         try:
             # Rate limiting
             self._rate_limit()
             
-            # Create translator with specific languages if different from default
-            if target_lang != 'zh-CN' or source_lang != 'auto':
-                translator = GoogleTranslator(source=source_lang, target=target_lang)
-            else:
-                translator = self.translator
-            
             # Perform translation
-            translated_text = translator.translate(text)
+            with stage_latency.time('translate'):
+                translated_text = self._get_translator(target_lang, source_lang).translate(text)
             
+            if not translated_text:
+                logger.warning(f"Empty translation for text '{text[:50]}...'")
+                return None
+
             # Cache the result
-            self.cache[cache_key] = translated_text
+            self.cache.put(text, source_lang, target_lang, translated_text)
             
             logger.info(f"Translated: '{text[:50]}...' -> '{translated_text[:50]}...'")
             return translated_text
             
         except Exception as e:
             logger.error(f"Translation failed for text '{text[:50]}...': {e}")
-            return text  # Return original text if translation fails
+            return None
     
     def translate_story_title(self, title: str) -> str:
         """Translate story title to Chinese"""
         return self.translate_text(title) or title
     
+    def translate_batch(self, texts: List[str], target_lang: str = 'zh-CN',
+                        source_lang: str = 'auto') -> List[Optional[str]]:
+        """
+        Translate many texts with as few upstream requests as possible
+
+        Cached texts are answered from the store. The rest are packed into
+        newline-delimited payloads of up to MAX_BATCH_CHARS, one request
+        each, and the reply is split back line by line. If a reply doesn't
+        split into the expected number of lines that chunk falls back to
+        per-text requests.
+
+        Returns:
+            Translations in input order; None where translation failed, so a
+            failure is never mistaken for a translation
+        """
+        results = list(texts)
+        pending = []
+        for index, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+            cached = self.cache.get(text, source_lang, target_lang)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append(index)
+
+        for chunk in self._pack_batches([texts[index] for index in pending]):
+            indexes = [pending.pop(0) for _ in chunk]
+            translated = self._translate_packed(chunk, target_lang, source_lang)
+            if translated is None:
+                logger.warning(f"Batch of {len(chunk)} didn't split cleanly, translating one by one")
+                translated = [self.translate_text(text, target_lang, source_lang) for text in chunk]
+            else:
+                for text, translated_text in zip(chunk, translated):
+                    self.cache.put(text, source_lang, target_lang, translated_text)
+            for index, translated_text in zip(indexes, translated):
+                results[index] = translated_text
+        return results
+
+    def _pack_batches(self, texts: List[str]) -> List[List[str]]:
+        """Split texts into chunks that fit in one upstream request"""
+        chunks, current, size = [], [], 0
+        for text in texts:
+            length = len(text) + 1  # plus the separator
+            if current and (size + length > self.MAX_BATCH_CHARS or len(current) >= self.MAX_BATCH_ITEMS):
+                chunks.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += length
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _translate_packed(self, texts: List[str], target_lang: str, source_lang: str) -> Optional[List[str]]:
+        """One upstream request for several texts; None if the reply can't be split back"""
+        if len(texts) == 1:
+            translated_text = self.translate_text(texts[0], target_lang, source_lang)
+            return [translated_text] if translated_text else None
+
+        payload = '\n'.join(' '.join(text.split()) for text in texts)
+        try:
+            self._rate_limit()
+            with stage_latency.time('translate'):
+                translated = self._get_translator(target_lang, source_lang).translate(payload)
+        except Exception as e:
+            logger.error(f"Batch translation of {len(texts)} texts failed: {e}")
+            return None
+
+        lines = [line.strip() for line in (translated or '').split('\n') if line.strip()]
+        if len(lines) != len(texts):
+            return None
+        logger.info(f"Translated {len(texts)} texts in one request")
+        return lines
+
+    def _get_translator(self, target_lang: str, source_lang: str):
+        """Backend instance for a language pair, shared across calls"""
+        return get_backend(self.backend, source_lang, target_lang)
+
     def translate_batch_with_pause(self, texts: List[str], batch_size: int = 3, pause_seconds: float = 0.1) -> List[Tuple[int, str]]:
         """
-        Translate multiple texts in batches with pauses to prevent overload
-        
-        Args:
-            texts: List of texts to translate
-            batch_size: Number of texts to translate in each batch
-            pause_seconds: Seconds to pause between batches
-            
+        Translate multiple texts; kept for older callers
+
+        Pacing is now done by the shared rate limiter, so batch_size and
+        pause_seconds are ignored and the texts are packed by translate_batch.
+
         Returns:
             List of tuples (index, translated_text)
         """
-        results = []
-        
-        # Process texts in batches
-        for batch_start in range(0, len(texts), batch_size):
-            batch_end = min(batch_start + batch_size, len(texts))
-            batch_texts = texts[batch_start:batch_end]
-            
-            logger.info(f"Translating batch {batch_start//batch_size + 1}: items {batch_start+1}-{batch_end}")
-            
-            # Translate current batch
-            for i, text in enumerate(batch_texts):
-                actual_index = batch_start + i
-                try:
-                    translated_text = self.translate_text(text)
-                    results.append((actual_index, translated_text))
-                    logger.info(f"Batch progress: {actual_index+1}/{len(texts)} completed")
-                except Exception as e:
-                    logger.error(f"Translation failed for index {actual_index}: {e}")
-                    results.append((actual_index, text))  # Return original text
-            
-            # Pause between batches (except for the last batch)
-            if batch_end < len(texts):
-                logger.info(f"Pausing {pause_seconds}s before next batch...")
-                time.sleep(pause_seconds)
-        
-        # Sort results by index to maintain order
-        results.sort(key=lambda x: x[0])
-        return results
+        return [(index, translated if translated is not None else text)
+                for index, (text, translated) in enumerate(zip(texts, self.translate_batch(texts)))]
     
-    def translate_stories_smart(self, stories, priority_count: int = 10):
+    def translate_stories_smart(self, stories, priority_count: int = 10,
+                                lang: str = DEFAULT_LANGUAGE) -> int:
         """
-        Smart translation with priority and deduplication
-        
+        Queue untranslated stories, the first priority_count ahead of everything else
+
+        Stories already queued or being translated are skipped, so repeated
+        clicks don't start duplicate work.
+
         Args:
-            stories: List of story objects
+            stories: List of story objects, in display order
             priority_count: Number of priority stories to translate first
+            lang: Target language code
+
+        Returns:
+            Number of stories newly queued
         """
+        return self._enqueue(stories, lang, priority_count, BACKGROUND_BAND)
+
+    def prewarm(self, stories, languages: List[str]) -> int:
+        """Queue translations of a new snapshot behind any interactive work"""
+        return sum(self._enqueue(stories, lang, 0, PREWARM_BAND) for lang in languages)
+
+    def _enqueue(self, stories, lang, priority_count, band) -> int:
         if not stories:
-            return
+            return 0
         
         # Filter out already translated stories
-        untranslated_stories = [story for story in stories if not story.translated_title]
+        untranslated_stories = [story for story in stories if not story.get_translation(lang)]
         
         if not untranslated_stories:
-            logger.info("All stories already translated")
-            return
-        
-        # Split into priority and remaining
-        priority_stories = untranslated_stories[:priority_count]
-        remaining_stories = untranslated_stories[priority_count:]
-        
-        # Start priority translation in background thread for faster response
-        if priority_stories:
-            logger.info(f"Starting priority translation for {len(priority_stories)} stories")
-            self._translate_priority_async(priority_stories)
-        
-        # Translate remaining stories in background
-        if remaining_stories:
-            logger.info(f"Starting background translation for {len(remaining_stories)} remaining stories")
-            self._translate_background(remaining_stories)
-    
-    def _translate_priority_async(self, stories):
-        """
-        Translate priority stories asynchronously with immediate updates
-        """
-        def priority_translate():
+            logger.info(f"All stories already translated ({lang})")
+            return 0
+
+        language = self._language(lang)
+        self._ensure_workers(language)
+        queued = 0
+        with self._inflight_lock:
+            for position, story in enumerate(untranslated_stories):
+                key = (story.id, story.title)
+                if key in language.inflight:
+                    language.inflight[key].append(story)
+                    continue
+                language.inflight[key] = []
+                item_band = PRIORITY_BAND if position < priority_count else band
+                language.queue.put((item_band, position, next(self._sequence), story))
+                queued += 1
+
+        logger.info(f"Queued {queued} stories for translation to {lang} "
+                    f"({min(priority_count, queued)} priority, queue depth {language.queue.qsize()})")
+        return queued
+
+    def languages(self) -> List[str]:
+        """Languages that have been asked for since startup"""
+        return list(self._languages)
+
+    def queue_depth(self, lang: Optional[str] = None) -> int:
+        """Number of stories waiting for a translation worker"""
+        if lang is not None:
+            language = self._languages.get(lang)
+            return language.queue.qsize() if language else 0
+        return sum(language.queue.qsize() for language in list(self._languages.values()))
+
+    def _language(self, lang: str) -> LanguageQueue:
+        """Queue and progress state for a language, created on first use"""
+        language = self._languages.get(lang)
+        if language is None:
+            with self._inflight_lock:
+                language = self._languages.setdefault(lang, LanguageQueue(lang))
+        return language
+
+    def _ensure_workers(self, language: LanguageQueue):
+        """Start a language's long-lived worker threads the first time it gets work"""
+        with self._inflight_lock:
+            if language.workers:
+                return
+            for number in range(self.worker_count):
+                worker = threading.Thread(target=self._worker, args=(language,),
+                                          name=f'translator-{language.lang}-{number}', daemon=True)
+                worker.start()
+                language.workers.append(worker)
+            logger.info(f"Started {self.worker_count} translation workers for {language.lang}")
+
+    def _next_batch(self, language: LanguageQueue):
+        """Block for the next story, then take more from the same band without waiting"""
+        first = language.queue.get()
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = language.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] != first[0]:
+                # Lower-priority work waits for its own batch
+                language.queue.put(item)
+                language.queue.task_done()
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self, language: LanguageQueue):
+        lang = language.lang
+        while True:
+            batch = self._next_batch(language)
             try:
-                logger.info(f"Priority translation started for {len(stories)} stories")
-                for i, story in enumerate(stories):
-                    try:
-                        # Create unique cache key using story ID
-                        cache_key = f"{story.id}:{story.title}:zh-CN"
-                        
-                        if cache_key in self.cache:
-                            translated_title = self.cache[cache_key]
-                        else:
-                            translated_title = self.translate_text(story.title)
-                            self.cache[cache_key] = translated_title
-                        
-                        story.set_translated_title(translated_title)
-                        logger.info(f"Priority {i+1}/{len(stories)}: '{story.title[:30]}...' -> '{translated_title[:30]}...'")
-                        
-                        # Add a small delay to allow for smoother updates
-                        time.sleep(0.05)  # 50ms delay between priority translations
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to translate priority story {i+1}: {e}")
-                
-                logger.info(f"Priority translation completed for {len(stories)} stories")
+                pending = [item for item in batch if not item[3].get_translation(lang)]
+                titles = self.translate_batch([item[3].title for item in pending], target_lang=lang)
+                for (band, position, _, story), translated_title in zip(pending, titles):
+                    # Failures (None) stay untranslated and are retried later; a title that
+                    # translates to itself (names, acronyms) is a finished translation
+                    if translated_title:
+                        self._apply_translation(story, translated_title, lang)
+                        with self._inflight_lock:
+                            followers = language.inflight.get((story.id, story.title), [])
+                        for follower in followers:
+                            if follower is not story and not follower.get_translation(lang):
+                                self._apply_translation(follower, translated_title, lang)
+                band_name = ('Priority', 'Background', 'Prewarm')[batch[0][0]]
+                logger.info(f"{band_name} batch of {len(pending)} stories translated to {lang}")
             except Exception as e:
-                logger.error(f"Priority translation failed: {e}")
-        
-        # Start priority translation thread
-        thread = threading.Thread(target=priority_translate, daemon=True)
-        thread.start()
-        return thread
-    
-    def _translate_background(self, stories):
-        """
-        Translate stories in background thread with batch processing and pauses
-        """
-        def background_translate():
+                logger.error(f"Failed to translate batch of {len(batch)} stories to {lang}: {e}")
+            finally:
+                with self._inflight_lock:
+                    for item in batch:
+                        language.inflight.pop((item[3].id, item[3].title), None)
+                for _ in batch:
+                    language.queue.task_done()
+
+    def wait_until_idle(self):
+        """Block until every queued translation has been processed"""
+        for language in list(self._languages.values()):
+            language.queue.join()
+
+    def _apply_translation(self, story, translated_title: str, lang: str = DEFAULT_LANGUAGE):
+        """Store a finished story translation, record it as an event and wake listeners"""
+        with self._events_changed:
+            language = self._languages.get(lang)
+            if (language is not None and not story.get_translation(lang)
+                    and language.tracked_by_id.get(story.id) is story):
+                language.translated_count += 1
+            story.set_translated_title(translated_title, lang)
+            self.version += 1
+            self._language_versions[lang] = self._language_versions.get(lang, 0) + 1
+            self._events.append({
+                'version': self.version,
+                'lang': lang,
+                'story_id': story.id,
+                'original_title': story.title,
+                'translated_title': translated_title
+            })
+            self._events_changed.notify_all()
+
+        for callback in self._listeners:
             try:
-                logger.info(f"Starting background translation for {len(stories)} stories")
-                titles = [story.title for story in stories]
-                
-                # Use batch translation with pauses
-                results = self.translate_batch_with_pause(titles, batch_size=3, pause_seconds=0.1)
-                
-                # Update stories with translations
-                for index, translated_title in results:
-                    if index < len(stories):
-                        # Create unique cache key
-                        cache_key = f"{stories[index].id}:{stories[index].title}:zh-CN"
-                        self.cache[cache_key] = translated_title
-                        stories[index].set_translated_title(translated_title)
-                
-                logger.info(f"Background translation completed for {len(stories)} stories")
+                callback(story, lang, translated_title)
             except Exception as e:
-                logger.error(f"Background translation failed: {e}")
-        
-        # Start background thread
-        thread = threading.Thread(target=background_translate, daemon=True)
-        thread.start()
-        return thread
-    
+                logger.error(f"Translation listener failed: {e}")
+
+    def language_version(self, lang: str) -> int:
+        """Translations landed in one language; pages in other languages don't depend on it"""
+        return self._language_versions.get(lang, 0)
+
+    def add_listener(self, callback):
+        """Call callback(story, lang, translated_title) whenever a translation lands"""
+        self._listeners.append(callback)
+
+    def events_since(self, version: int, lang: Optional[str] = None) -> Tuple[List[dict], bool]:
+        """
+        Translation events recorded after a version cursor, optionally for one language
+
+        Returns (events, complete). complete is False when the cursor is older
+        than the retained log, in which case the caller should resync from
+        the full story state instead.
+        """
+        with self._events_changed:
+            if version > self.version:
+                # Cursor from before a restart
+                return [], False
+            events = [event for event in self._events
+                      if event['version'] > version and (lang is None or event['lang'] == lang)]
+            oldest = self._events[0]['version'] if self._events else self.version + 1
+            complete = version >= oldest - 1 or version >= self.version
+            return events, complete
+
+    def progress(self, stories, lang: str = DEFAULT_LANGUAGE) -> Tuple[int, int]:
+        """
+        (translated_count, total) for a story list in one language
+
+        The list is counted once when it is first seen (i.e. once per
+        snapshot); after that the count is kept up to date as translations
+        land, so status checks are O(1).
+        """
+        language = self._language(lang)
+        with self._events_changed:
+            if stories is not language.tracked_stories:
+                language.tracked_stories = stories
+                language.tracked_by_id = {story.id: story for story in stories}
+                language.translated_count = sum(1 for story in stories if story.get_translation(lang))
+            return language.translated_count, len(stories)
+
+    def wait_for_events(self, version: int, timeout: float = 15,
+                        lang: Optional[str] = None) -> Tuple[List[dict], int]:
+        """
+        Block until a translation newer than version lands, or timeout
+
+        Returns (events, cursor); cursor advances past events for other
+        languages too, so callers filtering by lang don't spin on them.
+        """
+        with self._events_changed:
+            self._events_changed.wait_for(lambda: self.version > version, timeout=timeout)
+            cursor = self.version
+        events, _ = self.events_since(version, lang)
+        return [event for event in events if event['version'] <= cursor], cursor
+
     def clear_cache(self):
         """Clear translation cache"""
         self.cache.clear()
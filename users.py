@@ -0,0 +1,104 @@
+# User profiles: upstream fetch behind a TTL LRU cache with single-flight loads
+from collections import OrderedDict
+from typing import Dict, Optional
+import logging
+import os
+import re
+import threading
+import time
+
+from data_parser import parse_user_profile
+from models import UserProfile
+from scraper import fetch_user_page
+
+logger = logging.getLogger(__name__)
+
+# HN usernames are 2-15 letters, digits, dashes and underscores
+USERNAME_RE = re.compile(r'^[A-Za-z0-9_-]{2,15}$')
+
+def load_user_profile(username: str) -> Optional[UserProfile]:
+    """Fetch and parse a profile; None if the page couldn't be fetched"""
+    html_content = fetch_user_page(username)
+    if html_content is None:
+        return None
+    return parse_user_profile(html_content, username)
+
+class UserCache:
+    """
+    Fetched user profiles, least recently used evicted past max_entries
+
+    A profile is fresh for ttl seconds; after that it is still served while
+    one background reload replaces it. Unknown users are remembered for
+    missing_ttl so repeated lookups of a bad name don't go upstream either.
+    Concurrent misses for the same user share one fetch: the first request
+    starts it, and every request waits at most `timeout` for it, so a slow
+    upstream delays a page by a bounded amount while the fetch carries on.
+    """
+
+    def __init__(self, loader=load_user_profile, max_entries: int = 2000,
+                 ttl: float = 600, missing_ttl: float = 60):
+        self._loader = loader
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self._profiles: OrderedDict = OrderedDict()
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+
+    def _expired(self, profile: UserProfile) -> bool:
+        ttl = self.ttl if profile.exists else self.missing_ttl
+        return time.time() - profile.fetched_at > ttl
+
+    def _load(self, username: str, event: threading.Event):
+        try:
+            profile = self._loader(username)
+            if profile is not None:
+                profile.fetched_at = time.time()
+                with self._lock:
+                    self._profiles[username] = profile
+                    self._profiles.move_to_end(username)
+                    while len(self._profiles) > self.max_entries:
+                        self._profiles.popitem(last=False)
+        except Exception as e:
+            logger.error(f"Profile load failed for {username}: {e}")
+        finally:
+            with self._lock:
+                self._loading.pop(username, None)
+            event.set()
+
+    def get(self, username: str, timeout: float = 5) -> Optional[UserProfile]:
+        """Profile of a user, fetching it if needed; None if it isn't available in time"""
+        with self._lock:
+            profile = self._profiles.get(username)
+            if profile is not None:
+                self._profiles.move_to_end(username)
+            event = self._loading.get(username)
+            if event is None and (profile is None or self._expired(profile)):
+                event = self._loading[username] = threading.Event()
+                self.fetches += 1
+                threading.Thread(target=self._load, args=(username, event),
+                                 name='user-fetch', daemon=True).start()
+            elif profile is None:
+                self.coalesced += 1
+            if profile is not None:
+                self.hits += 1
+                return profile
+            self.misses += 1
+
+        event.wait(timeout)
+        with self._lock:
+            return self._profiles.get(username)
+
+    def stats(self) -> dict:
+        """Cache size and hit/fetch counters"""
+        return {'entries': len(self._profiles), 'hits': self.hits, 'misses': self.misses,
+                'coalesced': self.coalesced, 'fetches': self.fetches}
+
+# Global user profile cache
+user_cache = UserCache(
+    max_entries=int(os.environ.get('USER_CACHE_MAX_ENTRIES', 2000)),
+    ttl=float(os.environ.get('USER_CACHE_TTL', 600)))